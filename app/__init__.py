@@ -5,6 +5,8 @@ from flask_login import LoginManager
 from flask_mail import Mail
 import os
 from dotenv import load_dotenv
+from .server import cpu_default_workers
+from . import change_feed, lifecycle, live_feed, template_cache, tenancy  # noqa: F401 (lifecycle: counters listener)
 
 # Load environment variables
 load_dotenv()
@@ -19,6 +21,130 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-please-change')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///transparansee.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # SQLite write-ahead log: readers and backups never block writers (creates -wal/-shm files next to the db).
+    # On by default; SQLITE_WAL=0 turns it off (e.g. a database on a network filesystem), and then
+    # /public-logs and /public-records are rendered in full instead of streamed (utils/streaming.py)
+    app.config['SQLITE_WAL'] = os.getenv('SQLITE_WAL', '1') == '1'
+
+    # Read replica for anonymous public pages (see database.py). It is skipped while its
+    # heartbeat is older than REPLICA_MAX_LAG_SECONDS (checked every REPLICA_CHECK_SECONDS).
+    # Local setup: DATABASE_REPLICA_URL=sqlite:///replica.db and 'flask replica sync --every 30'
+    if os.getenv('DATABASE_REPLICA_URL'):
+        app.config['SQLALCHEMY_BINDS'] = {'replica': os.getenv('DATABASE_REPLICA_URL')}
+    app.config['REPLICA_MAX_LAG_SECONDS'] = int(os.getenv('REPLICA_MAX_LAG_SECONDS', 120))
+    app.config['REPLICA_CHECK_SECONDS'] = 5
+
+    # Background jobs: {'job_name': 'minute hour day month weekday'}
+    # Run them with 'flask jobs scheduler' (override in instance/jobs.cron)
+    app.config['SCHEDULER_JOBS'] = {
+        'overdue_sweep': '5 0 * * *',         # Nightly, just after midnight
+        'deadline_reminders': '0 7 * * *',    # Every morning at 7:00
+        'refresh_aggregates': '*/5 * * * *',  # Every 5 minutes
+        'archive_logs': '30 2 * * *',         # Nightly at 2:30
+        'publish_static': '* * * * *',        # Every minute (unchanged pages are skipped)
+        'reconcile_budgets': '15 3 * * *',    # Nightly at 3:15
+        'send_emails': '* * * * *',           # Every minute (drains the email outbox)
+        'purge_uploads': '20 * * * *',        # Hourly (abandoned resumable uploads)
+        'replica_heartbeat': '* * * * *',     # Every minute (read replica lag)
+        'backup_database': '0 2 * * *',       # Nightly at 2:00 (online snapshot)
+    }
+
+    # System logs older than this are moved to compressed files in instance/log_archive
+    app.config['LOG_RETENTION_DAYS'] = int(os.getenv('LOG_RETENTION_DAYS', 180))
+    app.config['LOG_ARCHIVE_DIR'] = os.path.join(app.instance_path, 'log_archive')
+    # Admin audit log viewer: logs per page (keyset pages, newest first)
+    app.config['AUDIT_LOGS_PER_PAGE'] = 50
+
+    # Database snapshots ('flask backup', app/services/backup_service.py): where, how many are kept,
+    # and the size of each copy step (pages) and pause after it, during which writers get in
+    app.config['BACKUP_DIR'] = os.getenv('BACKUP_DIR', os.path.join(app.instance_path, 'backups'))
+    app.config['BACKUP_KEEP'] = int(os.getenv('BACKUP_KEEP', 14))
+    app.config['BACKUP_PAGES_PER_STEP'] = 256
+    app.config['BACKUP_STEP_SLEEP'] = 0.01
+    app.config['BACKUP_MAX_RESTARTS'] = 10
+
+    # Static HTML copy of the public pages ('flask publish-static'), served by the reverse proxy
+    app.config['STATIC_SNAPSHOT_DIR'] = os.getenv('STATIC_SNAPSHOT_DIR', os.path.join(app.instance_path, 'static_site'))
+
+    # Public comments: page size, and per-IP write limit (burst of N, refilled over M seconds).
+    # The default in-memory store keeps one bucket per worker process, so the real limit
+    # is N x workers; set RATE_LIMIT_STORE to a shared store for an exact one (utils/rate_limit.py)
+    app.config['COMMENTS_PER_PAGE'] = 20
+    app.config['COMMENT_RATE_LIMIT'] = (5, 60)
+
+    # Reverse proxies in front of the app (e.g. 1 for nginx -> gunicorn) whose X-Forwarded-For/
+    # -Proto/-Host headers are trusted. Without this, behind nginx every visitor has nginx's
+    # address and shares one rate-limit bucket. Leave 0 when clients reach the app directly.
+    app.config['TRUSTED_PROXIES'] = int(os.getenv('TRUSTED_PROXIES', 0))
+
+    # Bulk-imported users get a one-time link to set their password, valid this long
+    app.config['SET_PASSWORD_LINK_HOURS'] = 72
+
+    # Uploads: largest request body Flask will accept (forms, and each chunk of a resumable upload)
+    app.config['MAX_CONTENT_LENGTH'] = 8 * 1024 * 1024
+    # Resumable uploads (/uploads): largest file, unfinished files, and how long they are kept
+    app.config['UPLOAD_MAX_SIZE'] = 25 * 1024 * 1024
+    app.config['UPLOAD_TEMP_DIR'] = os.path.join(app.instance_path, 'uploads')
+    app.config['UPLOAD_EXPIRY_HOURS'] = 24
+
+    # Uploaded media (app/storage.py): 'local' (MEDIA_ROOT on this server) or 's3' (any S3-compatible bucket)
+    app.config['MEDIA_STORAGE'] = os.getenv('MEDIA_STORAGE', 'local')
+    app.config['MEDIA_ROOT'] = os.getenv('MEDIA_ROOT', os.path.join(app.root_path, 'static'))
+    app.config['MEDIA_URL'] = os.getenv('MEDIA_URL')                  # None = Flask's /static URL
+    app.config['MEDIA_S3_BUCKET'] = os.getenv('MEDIA_S3_BUCKET')
+    app.config['MEDIA_S3_PREFIX'] = os.getenv('MEDIA_S3_PREFIX', '')
+    app.config['MEDIA_S3_ENDPOINT'] = os.getenv('MEDIA_S3_ENDPOINT')  # e.g. http://minio:9000; None = AWS
+    app.config['MEDIA_S3_REGION'] = os.getenv('MEDIA_S3_REGION')
+    app.config['MEDIA_PUBLIC_URL'] = os.getenv('MEDIA_PUBLIC_URL')    # CDN / public bucket; None = presigned links
+    app.config['MEDIA_URL_EXPIRES'] = int(os.getenv('MEDIA_URL_EXPIRES', 3600))
+
+    # Production server ('flask serve', see app/server.py and benchmarks/serve_tuning.md)
+    app.config['SERVER_BIND'] = os.getenv('SERVER_BIND', '127.0.0.1:8000')
+    app.config['SERVER_WORKERS'] = int(os.getenv('SERVER_WORKERS', 0)) or cpu_default_workers()
+    app.config['SERVER_THREADS'] = int(os.getenv('SERVER_THREADS', 4))            # > 1 = threaded workers
+    app.config['SERVER_MAX_REQUESTS'] = int(os.getenv('SERVER_MAX_REQUESTS', 1000))  # Recycle a worker after N
+    app.config['SERVER_MAX_REQUESTS_JITTER'] = int(os.getenv('SERVER_MAX_REQUESTS_JITTER', 100))
+    app.config['SERVER_TIMEOUT'] = int(os.getenv('SERVER_TIMEOUT', 60))
+    app.config['SERVER_GRACEFUL_TIMEOUT'] = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))
+    app.config['SERVER_KEEPALIVE'] = int(os.getenv('SERVER_KEEPALIVE', 5))
+    app.config['SERVER_PRELOAD'] = os.getenv('SERVER_PRELOAD', '1') == '1'
+
+    # Live public log feed (app/live_feed.py): open streams per process (each holds a thread, so by
+    # default at most half of them), how long one stays open, the browser's reconnect delay,
+    # keep-alive interval, and how often commits made by other processes are checked
+    app.config['LIVE_FEED_MAX_CLIENTS'] = (int(os.getenv('LIVE_FEED_MAX_CLIENTS', 0))
+                                           or max(1, app.config['SERVER_THREADS'] // 2))
+    app.config['LIVE_FEED_MAX_SECONDS'] = 300
+    app.config['LIVE_FEED_RETRY_MS'] = 3000
+    app.config['LIVE_FEED_KEEPALIVE_SECONDS'] = 20
+    app.config['LIVE_FEED_POLL_SECONDS'] = 3
+
+    # Barangays hosted on this deployment (app/tenancy.py): {'slug': {'name': ..., overrides}},
+    # usually kept in instance/tenants.json. Each gets its own database and folders under
+    # TENANTS_ROOT/<slug>/, and is found by subdomain (<slug>.TENANT_BASE_DOMAIN) or path (/<slug>/...)
+    app.config['TENANTS'] = {}
+    app.config['TENANT_RESOLUTION'] = os.getenv('TENANT_RESOLUTION', 'subdomain')
+    app.config['TENANT_BASE_DOMAIN'] = os.getenv('TENANT_BASE_DOMAIN')
+    app.config['TENANTS_ROOT'] = os.getenv('TENANTS_ROOT', os.path.join(app.instance_path, 'tenants'))
+    app.config['TENANT'] = os.getenv('TENANT')  # Tenant for CLI commands (e.g. TENANT=poblacion flask backup create)
+
+    # Delta sync for offline clients (GET /sync): changes sent per response
+    app.config['SYNC_PAGE_SIZE'] = 500
+
+    # Compiled templates kept between restarts (app/template_cache.py); '' = compile in every process
+    app.config['TEMPLATE_CACHE_DIR'] = os.getenv('TEMPLATE_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache'))
+
+    # Response compression (app/utils/compression.py): {mimetype: (gzip level, brotli quality)}
+    app.config['COMPRESS_RESPONSES'] = os.getenv('COMPRESS_RESPONSES', '1') == '1'  # 0 if nginx compresses
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    app.config['COMPRESS_TYPES'] = {
+        'text/html': (6, 5),
+        'application/json': (6, 5),
+        'text/csv': (6, 5),
+        'text/css': (9, 9),
+        'text/javascript': (9, 9),
+        'application/javascript': (9, 9),
+    }
 
     # --- 2. EMAIL CONFIGURATION ---
     app.config['MAIL_SERVER'] = 'smtp.gmail.com'
@@ -29,9 +155,18 @@ def create_app():
     app.config['MAIL_DEFAULT_SENDER'] = 'sh4wntolentino@gmail.com'
 
     # --- 3. INITIALIZE EXTENSIONS ---
+    tenancy.init_app(app)  # Before the database: adds each tenant's database as a bind
     db.init_app(app)
+    if app.config['SQLITE_WAL']:
+        from .database import enable_wal
+        with app.app_context():
+            for key, engine in db.engines.items():
+                if key != 'replica' and engine.dialect.name == 'sqlite':
+                    enable_wal(engine)
     Migrate(app, db)
     mail.init_app(app)
+    live_feed.init_app(app)
+    template_cache.init_app(app)
     
     # --- 4. LOGIN MANAGER ---
     login_manager = LoginManager()
@@ -50,19 +185,43 @@ def create_app():
     from .routes.admin_routes import admin_bp
     from .routes.request_routes import request_bp
     from .routes.associate_routes import associate_bp
+    from .routes.upload_routes import upload_bp
+    from .routes.sync_routes import sync_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(request_bp) 
     app.register_blueprint(associate_bp, url_prefix='/associate')
+    app.register_blueprint(upload_bp, url_prefix='/uploads')
+    app.register_blueprint(sync_bp, url_prefix='/sync')
+
+    # Links to uploaded media in templates
+    from .storage import media_url, profile_pic_url
+    app.jinja_env.globals.update(media_url=media_url, profile_pic_url=profile_pic_url)
+
+    # --- 6. RESPONSE COMPRESSION ---
+    from .utils.compression import CompressionMiddleware
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, app.config)
+
+    # Outermost, so tenancy, compression and the views all see the visitor's address and host
+    if app.config['TRUSTED_PROXIES']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
+
+    # --- 7. CLI COMMANDS ---
+    from .commands import register_commands
+    register_commands(app)
 
-    # --- 6. CREATE DATABASE TABLES ---
+    # --- 8. CREATE DATABASE TABLES ---
     with app.app_context():
         # REMOVED 'Vote' from this list because you are using 'AdminVote'
-        from .models import User, Request, Project, SystemLog, AdminVote, ProjectUpdate
+        from .models import (User, Request, Project, SystemLog, AdminVote, ProjectUpdate, JobRun, CachedAggregate,
+                             SpendRollup, ReleaseRollup, EmailOutbox, ChangeLog, ReplicaHeartbeat, StatusCount)
         
         db.create_all()
+        tenancy.create_tenant_tables(app)
         print("✅ Database tables checked/created successfully!")
 
     return app
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""
+Change feed for the offline field clients (GET /sync?since=<seq>).
+
+Every INSERT, UPDATE and DELETE on the synced tables is recorded in
+'change_log' by SQLite triggers, so nothing is missed whatever wrote it: the
+ORM, the Core bulk statements of the council and budget services, the
+scheduler's sweeps or another process. Each row keeps only its LATEST change:
+an update replaces the row's entry with a new, higher seq.
+
+SQLite runs one write transaction at a time, so seqs become visible in
+commit order and a client's 'since' never skips a change that commits later.
+"""
+from sqlalchemy import event, text
+
+from .database import db
+
+# Synced tables: entity type -> (table, primary key column)
+TRACKED = {
+    'request': ('requests', 'request_id'),
+    'project': ('projects', 'project_id'),
+    'project_update': ('project_updates', 'update_id'),
+    'admin_vote': ('admin_votes', 'vote_id'),
+    'project_comment': ('project_comments', 'comment_id'),
+}
+
+_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS change_log_{table}_{event} AFTER {EVENT} ON {table}
+BEGIN
+    DELETE FROM change_log WHERE entity_type = '{entity}' AND entity_id = {row}.{pk};
+    INSERT INTO change_log (entity_type, entity_id, op, changed_at)
+    VALUES ('{entity}', {row}.{pk}, '{op}', CURRENT_TIMESTAMP);
+END
+"""
+
+
+def _triggers():
+    """(name, CREATE TRIGGER statement) for every synced table and write."""
+    for entity, (table, pk) in TRACKED.items():
+        for event_name, row, op in (('insert', 'NEW', 'upsert'), ('update', 'NEW', 'upsert'),
+                                    ('delete', 'OLD', 'delete')):
+            yield (f"change_log_{table}_{event_name}",
+                   _TRIGGER.format(table=table, event=event_name, EVENT=event_name.upper(),
+                                   entity=entity, row=row, pk=pk, op=op))
+
+
+def install(connection, backfill=False):
+    """
+    Creates the triggers (if missing). With backfill, every existing row is
+    recorded once, so a first sync (since=0) downloads everything.
+    """
+    if connection.dialect.name != 'sqlite':
+        raise RuntimeError("The change feed triggers are written for SQLite.")
+    for _, ddl in _triggers():
+        connection.execute(text(ddl))
+    if backfill:
+        for entity, (table, pk) in TRACKED.items():
+            connection.execute(text(
+                f"INSERT INTO change_log (entity_type, entity_id, op, changed_at) "
+                f"SELECT '{entity}', {pk}, 'upsert', CURRENT_TIMESTAMP FROM {table} ORDER BY {pk}"))
+
+
+def uninstall(connection):
+    for name, _ in _triggers():
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_after_create_all(metadata, connection, tables=(), **kw):
+    # db.create_all() (run by create_app) creates change_log on an existing database before
+    # 'flask db upgrade' gets to it: record the rows that are already there in that case
+    if connection.dialect.name == 'sqlite':
+        install(connection, backfill=any(table.name == 'change_log' for table in tables))
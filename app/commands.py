@@ -0,0 +1,292 @@
+import mimetypes
+import os
+import time
+
+import click
+from flask.cli import AppGroup
+
+
+def register_commands(app):
+    from . import jobs  # noqa: F401 (registers the jobs with the scheduler)
+
+    # --- SCHEDULED JOBS ---
+    jobs_cli = AppGroup('jobs', help='Run and inspect background jobs.')
+
+    @jobs_cli.command('list')
+    def list_jobs():
+        """Show every job, its schedule and its last run."""
+        from .scheduler import JOBS, load_schedule
+        from .models import JobRun
+
+        schedule = load_schedule(app)
+        for name in sorted(JOBS):
+            last = JobRun.query.filter_by(job_name=name).order_by(JobRun.run_id.desc()).first()
+            cron = schedule[name].expression if name in schedule else '(manual)'
+            last_run = f"{last.started_at:%Y-%m-%d %H:%M} {last.status}" if last else 'never'
+            click.echo(f"{name:<22} {cron:<16} last run: {last_run}")
+
+    @jobs_cli.command('run')
+    @click.argument('name')
+    def run_one(name):
+        """Run a single job right now."""
+        from .scheduler import JOBS, run_job
+
+        if name not in JOBS:
+            raise click.BadParameter(f"Unknown job '{name}'. Choose from: {', '.join(sorted(JOBS))}")
+        run = run_job(name)
+        click.echo(f"{run.job_name}: {run.status} - {run.message}")
+
+    @jobs_cli.command('scheduler')
+    def scheduler():
+        """Start the standalone scheduler loop (run it as its own process)."""
+        from .scheduler import run_forever
+        run_forever(app)
+
+    @jobs_cli.command('history')
+    @click.option('--limit', default=20, show_default=True)
+    def history(limit):
+        """Show the most recent job runs."""
+        from .models import JobRun
+
+        for run in JobRun.query.order_by(JobRun.run_id.desc()).limit(limit):
+            click.echo(f"#{run.run_id} {run.started_at:%Y-%m-%d %H:%M:%S} {run.job_name:<22} "
+                       f"{run.status:<8} {run.message or ''}")
+
+    app.cli.add_command(jobs_cli)
+
+    # --- STATIC SNAPSHOT ---
+    @app.cli.command('publish-static')
+    @click.option('--out', default=None, help='Output folder (default: STATIC_SNAPSHOT_DIR).')
+    @click.option('--force', is_flag=True, help='Re-render every page, even unchanged ones.')
+    def publish_static(out, force):
+        """Render the public pages to static HTML (only pages whose data changed)."""
+        from .services.static_publisher import StaticPublisher
+
+        publisher = StaticPublisher(out, app) if out else StaticPublisher.from_app(app)
+        rendered, skipped, removed = publisher.publish(force=force)
+        click.echo(f"Published to {publisher.output_folder}: "
+                   f"{rendered} rendered, {skipped} unchanged, {removed} removed.")
+
+    # --- MEDIA STORAGE ---
+    media_cli = AppGroup('media', help='Manage uploaded files (profile pictures, receipts, site photos).')
+
+    @media_cli.command('push')
+    @click.option('--source', default=None, help='Local folder to copy from (default: app/static).')
+    def push_media(source):
+        """Copy existing local uploads into the configured storage (e.g. when moving to S3)."""
+        from .storage import LocalStorage, get_storage
+
+        local = LocalStorage(source or os.path.join(app.root_path, 'static'))
+        storage = get_storage(app)
+        copied = skipped = 0
+        for prefix in ('profile_pics', 'project_updates'):
+            for key in local.keys(prefix):
+                if storage.exists(key):
+                    skipped += 1
+                    continue
+                with local.open(key) as f:
+                    storage.save(key, f, mimetypes.guess_type(key)[0])
+                copied += 1
+        click.echo(f"Copied {copied} file(s); {skipped} already there.")
+
+    app.cli.add_command(media_cli)
+
+    # --- READ REPLICA ---
+    replica_cli = AppGroup('replica', help='Read replica for the public pages.')
+
+    @replica_cli.command('sync')
+    @click.option('--every', type=int, default=None, help='Keep syncing, every N seconds.')
+    def sync_replica(every):
+        """Copy the primary SQLite database into the replica (DATABASE_REPLICA_URL)."""
+        from .database import db, copy_sqlite_database
+        from .models import ReplicaHeartbeat
+
+        if 'replica' not in db.engines:
+            raise click.ClickException("No replica configured (set DATABASE_REPLICA_URL).")
+        while True:
+            # The copy carries a fresh heartbeat, so the app knows how old the replica is
+            ReplicaHeartbeat.beat()
+            db.session.commit()
+            try:
+                seconds = copy_sqlite_database(db.engines[None], db.engines['replica'])
+            except RuntimeError as e:
+                raise click.ClickException(str(e))
+            click.echo(f"Replica synced in {seconds * 1000:.0f} ms.")
+            if not every:
+                break
+            time.sleep(every)
+
+    @replica_cli.command('status')
+    def replica_status():
+        """Show the replica's lag and whether public pages read from it."""
+        from .database import db, replica_lag
+
+        if 'replica' not in db.engines:
+            raise click.ClickException("No replica configured (set DATABASE_REPLICA_URL).")
+        lag = replica_lag(db.engines['replica'])
+        limit = app.config['REPLICA_MAX_LAG_SECONDS']
+        if lag is None:
+            click.echo("Replica has no heartbeat yet: public pages read from the primary.")
+        else:
+            state = 'in use' if lag <= limit else 'too far behind, public pages read from the primary'
+            click.echo(f"Replica lag: {lag:.0f} s (limit {limit} s) - {state}.")
+
+    app.cli.add_command(replica_cli)
+
+    # --- BACKUPS ---
+    backup_cli = AppGroup('backup', help='Online snapshots of the database.')
+
+    @backup_cli.command('create')
+    def create_backup():
+        """Take a snapshot now (the site keeps running)."""
+        from .services.backup_service import BackupService, BackupError
+
+        try:
+            backup = BackupService.from_app(app).create()
+        except BackupError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"{backup['name']}.db.gz: {backup['database_size'] / 2**20:.1f} MiB database, "
+                   f"{backup['size'] / 2**20:.1f} MiB compressed, sha256 {backup['sha256'][:16]}...")
+        if backup['mode'] == 'wal-snapshot':
+            impact = "writers were never blocked"
+        else:
+            impact = f"writers waited at most {backup['longest_step_ms']:.0f} ms"
+        click.echo(f"Copied in {backup['copy_seconds']:.2f} s ({backup['mode']}, {backup['steps']} steps, "
+                   f"{backup['restarts']} restart(s)); {impact}. Total {backup['total_seconds']:.2f} s.")
+
+    @backup_cli.command('list')
+    def list_backups():
+        """Show the kept snapshots, newest first."""
+        from .services.backup_service import BackupService
+
+        service = BackupService.from_app(app)
+        for name in service.names():
+            backup = service.manifest(name)
+            click.echo(f"{name}  {backup['size'] / 2**20:8.1f} MiB  {backup['total_seconds']:6.2f} s  "
+                       f"{backup['mode']}, longest step {backup['longest_step_ms']:.0f} ms")
+
+    @backup_cli.command('verify')
+    @click.argument('name', required=False)
+    @click.option('--output', default=None, help='Keep the restored database at this path.')
+    def verify_backup(name, output):
+        """Check that a snapshot (default: the newest) restores: checksum, integrity, row counts."""
+        from .services.backup_service import BackupService, BackupError
+
+        try:
+            backup = BackupService.from_app(app).verify(name, output)
+        except BackupError as e:
+            raise click.ClickException(str(e))
+        rows = sum(backup['tables'].values())
+        click.echo(f"{backup['name']}: OK ({len(backup['tables'])} tables, {rows} rows)"
+                   + (f", restored to {output}" if output else "") + ".")
+
+    app.cli.add_command(backup_cli)
+
+    # --- TENANTS ---
+    tenants_cli = AppGroup('tenants', help='Barangays hosted on this deployment (see app/tenancy.py).')
+
+    @tenants_cli.command('list')
+    def list_tenants():
+        """Show every tenant, its database and the size of that database."""
+        from .database import db
+        from .tenancy import bind_key
+
+        if not app.config['TENANTS']:
+            click.echo("No tenants configured (add them to instance/tenants.json).")
+        for slug, entry in app.config['TENANTS'].items():
+            url = db.engines[bind_key(slug)].url
+            size = os.path.getsize(url.database) / 2**20 if url.database and os.path.exists(url.database) else 0
+            click.echo(f"{slug:<20} {entry.get('name', ''):<30} {size:8.1f} MiB  "
+                       f"{url.render_as_string(hide_password=True)}")
+
+    @tenants_cli.command('upgrade')
+    @click.argument('slugs', nargs=-1)
+    def upgrade_tenants(slugs):
+        """Apply the database migrations to every tenant's database (or the given ones)."""
+        import flask_migrate
+        from sqlalchemy import inspect
+        from .database import db
+        from .tenancy import bind_key, tenant_context
+
+        unknown = set(slugs) - set(app.config['TENANTS'])
+        if unknown:
+            raise click.BadParameter(f"Unknown tenant(s): {', '.join(sorted(unknown))}")
+        for slug in slugs or app.config['TENANTS']:
+            with tenant_context(app, slug):
+                if inspect(db.engines[bind_key(slug)]).has_table('alembic_version'):
+                    flask_migrate.upgrade()
+                    click.echo(f"{slug}: upgraded.")
+                else:
+                    # New database: its tables were just created from the models, at the newest revision
+                    flask_migrate.stamp()
+                    click.echo(f"{slug}: new database, stamped at the newest revision.")
+
+    app.cli.add_command(tenants_cli)
+
+    # --- TEMPLATES ---
+    templates_cli = AppGroup('templates', help='Compiled template cache (see app/template_cache.py).')
+
+    @templates_cli.command('warm')
+    def warm_templates():
+        """Compile every template into the bytecode cache (run at deploy time)."""
+        from . import template_cache
+
+        if not app.config['TEMPLATE_CACHE_DIR']:
+            raise click.ClickException("The template cache is off (TEMPLATE_CACHE_DIR is empty).")
+        loaded, seconds, errors = template_cache.warm(app)
+        click.echo(f"{loaded} template(s) ready in {seconds * 1000:.0f} ms, cached in {app.config['TEMPLATE_CACHE_DIR']}.")
+        for name, error in errors:
+            click.echo(f"  {name}: {error}", err=True)
+        if errors:
+            raise click.ClickException(f"{len(errors)} template(s) failed to compile.")
+
+    @templates_cli.command('clear')
+    def clear_templates():
+        """Empty the bytecode cache (it is refilled on the next renders)."""
+        from . import template_cache
+
+        template_cache.clear(app)
+        click.echo("Template cache cleared.")
+
+    app.cli.add_command(templates_cli)
+
+    # --- STATUS COUNTERS ---
+    lifecycle_cli = AppGroup('lifecycle', help='Request and project statuses (see app/lifecycle.py).')
+
+    @lifecycle_cli.command('recount')
+    def recount_statuses():
+        """Rebuild the per-status counters from the requests and projects tables."""
+        from . import lifecycle
+        from .database import db
+
+        lifecycle.recount(db.session.connection())
+        db.session.commit()
+        for entity in lifecycle.MACHINES:
+            counts = ', '.join(f"{status} {n}" for status, n in sorted(lifecycle.counts(entity).items()))
+            click.echo(f"{entity}: {counts}")
+
+    app.cli.add_command(lifecycle_cli)
+
+    # --- PRODUCTION SERVER ---
+    @app.cli.command('serve')
+    @click.option('--bind', default=None, help='host:port or unix:/path (default: SERVER_BIND).')
+    @click.option('--workers', type=int, default=None, help='Worker processes (default: SERVER_WORKERS).')
+    @click.option('--threads', type=int, default=None, help='Threads per worker (default: SERVER_THREADS).')
+    @click.option('--max-requests', type=int, default=None,
+                  help='Restart a worker after this many requests; 0 = never (default: SERVER_MAX_REQUESTS).')
+    @click.option('--max-requests-jitter', type=int, default=None,
+                  help='Random extra requests so workers do not all restart at once.')
+    @click.option('--timeout', type=int, default=None, help='Kill a worker silent for this many seconds.')
+    @click.option('--preload/--no-preload', default=None,
+                  help='Load the app once in the master before forking (default: SERVER_PRELOAD).')
+    @click.option('--pid', 'pidfile', default=None, help='Write the master PID here (for kill -HUP).')
+    def serve_command(bind, workers, threads, max_requests, max_requests_jitter, timeout, preload, pidfile):
+        """Run the app under gunicorn (pre-fork workers). 'kill -HUP <pid>' reloads gracefully."""
+        from .server import serve
+
+        try:
+            serve(app, bind=bind, workers=workers, threads=threads, max_requests=max_requests,
+                  max_requests_jitter=max_requests_jitter, timeout=timeout, preload_app=preload,
+                  pidfile=pidfile)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
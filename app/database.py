@@ -1,3 +1,162 @@
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, has_request_context, request, session
+from flask_login import current_user
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import DateTime, Select, event, literal, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .tenancy import bind_key, current_tenant
+
+
+class RoutingSession(Session):
+    """
+    Sends every statement of a tenant's request (see tenancy.py) to that
+    tenant's database. Without a tenant, the SELECTs of a request marked with
+    @replica_reads go to the read replica (the 'replica' bind, set by
+    DATABASE_REPLICA_URL); everything else - flushes, INSERT/UPDATE/DELETE,
+    other requests - uses the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        tenant = current_tenant() if bind is None else None
+        if tenant:
+            return self._db.engines[bind_key(tenant)]
+        # The mark is kept on the request, not the session: a streamed page's
+        # generator runs after the view's session was removed, with a new one
+        if (bind is None and isinstance(clause, Select) and not self._flushing
+                and has_request_context() and request.environ.get('transparansee.read_replica')):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def insert_for(model):
+    """
+    INSERT statement for the current database that supports upserts, e.g.
+    insert_for(Model).values(...).on_conflict_do_update(index_elements=[...], set_={...})
+    """
+    dialect = db.session.get_bind().dialect.name
+    return (postgresql if dialect == 'postgresql' else sqlite).insert(model)
+
+
+def enable_wal(engine):
+    """
+    Puts a SQLite database in write-ahead-log mode: readers (pages, backups) no
+    longer block writers, and a backup can copy one consistent snapshot.
+    """
+    @event.listens_for(engine, 'connect')
+    def set_journal_mode(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+
+# {engine: True if its readers block writers}: the journal mode lives in the database file
+_blocking_readers = {}
+
+
+def readers_block_writers():
+    """
+    True if an open read on the database this request's SELECTs go to (primary,
+    replica or tenant) stops every writer from committing: SQLite outside WAL
+    mode, where a reader holds a SHARED lock until its transaction ends.
+    """
+    engine = db.session.get_bind(clause=select(literal(1)))
+    if engine.dialect.name != 'sqlite':
+        return False
+    if engine not in _blocking_readers:
+        with engine.connect() as connection:
+            mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+        _blocking_readers[engine] = mode.lower() != 'wal'
+    return _blocking_readers[engine]
+
+
+# --- READ REPLICA ---
+
+# {replica engine: (checked at (monotonic), usable)}: the lag is checked every REPLICA_CHECK_SECONDS per process
+_replica_checks = {}
+_replica_lock = threading.Lock()
+
+
+def replica_lag(engine):
+    """
+    Seconds since the primary's last heartbeat reached the replica ('replica_heartbeat'
+    table, written by the heartbeat job and 'flask replica sync'). None if the
+    replica has no heartbeat yet or cannot be read.
+    """
+    query = text("SELECT beat_at FROM replica_heartbeat WHERE heartbeat_id = 1").columns(beat_at=DateTime)
+    try:
+        with engine.connect() as connection:
+            beat_at = connection.execute(query).scalar()
+    except SQLAlchemyError as e:
+        current_app.logger.warning("Read replica unavailable: %s", e.__class__.__name__)
+        return None
+    return None if beat_at is None else (datetime.utcnow() - beat_at).total_seconds()
+
+
+def replica_usable():
+    """True if a replica is configured and no further behind than REPLICA_MAX_LAG_SECONDS."""
+    engine = db.engines.get('replica')
+    if engine is None:
+        return False
+
+    now = time.monotonic()
+    checked_at, usable = _replica_checks.get(engine, (None, False))
+    if checked_at is None or now - checked_at > current_app.config['REPLICA_CHECK_SECONDS']:
+        with _replica_lock:
+            checked_at, usable = _replica_checks.get(engine, (None, False))
+            if checked_at is None or now - checked_at > current_app.config['REPLICA_CHECK_SECONDS']:
+                lag = replica_lag(engine)
+                usable = lag is not None and lag <= current_app.config['REPLICA_MAX_LAG_SECONDS']
+                if not usable:
+                    current_app.logger.warning("Read replica skipped (lag: %s s)", lag)
+                _replica_checks[engine] = (now, usable)
+    return usable
+
+
+def stick_to_primary():
+    """
+    After an anonymous visitor wrote something (e.g. a comment), their next pages
+    read from the primary until the replica has surely caught up, so they see it.
+    """
+    session['primary_until'] = time.time() + current_app.config['REPLICA_MAX_LAG_SECONDS']
+
+
+def replica_reads(f):
+    """
+    Lets an anonymous GET of a public page read from the replica. Signed-in users
+    stay on the primary, so officials always see their own changes at once. So do
+    the static publisher's renders: it decides what changed from the primary.
+    Tenants have no replica.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if (request.method in ('GET', 'HEAD') and not current_user.is_authenticated
+                and not request.environ.get('transparansee.snapshot') and not current_tenant()
+                and session.get('primary_until', 0) < time.time() and replica_usable()):
+            request.environ['transparansee.read_replica'] = True
+        return f(*args, **kwargs)
+    return decorated_function
+
 
-db = SQLAlchemy()
+def copy_sqlite_database(source, target):
+    """
+    Copies one SQLite database (engine) into another with SQLite's backup API,
+    while both stay online. Readers of 'target' wait until the copy is complete
+    instead of seeing half of it. Returns the seconds it took.
+    """
+    if source.dialect.name != 'sqlite' or target.dialect.name != 'sqlite':
+        raise RuntimeError("Only SQLite databases can be copied this way; use the database's own replication.")
+    started = time.monotonic()
+    source_connection, target_connection = source.raw_connection(), target.raw_connection()
+    try:
+        source_connection.driver_connection.backup(target_connection.driver_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
+    return time.monotonic() - started
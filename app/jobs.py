@@ -0,0 +1,140 @@
+"""
+Background jobs run by the scheduler (see app/scheduler.py).
+Each job returns a one-line summary that is stored in 'job_runs'.
+"""
+from collections import defaultdict
+from datetime import date
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import func, not_
+from sqlalchemy.orm import contains_eager
+
+from . import mail
+from .database import db
+from .models import Project, Request, ReplicaHeartbeat
+from .scheduler import job
+from .services.aggregate_service import AggregateService
+from .services.backup_service import BackupService
+from .services.budget_service import BudgetService
+from .services.log_archive_service import LogArchiveService
+from .services.outbox_service import OutboxService
+from .services.rollup_service import RollupService
+from .services.static_publisher import StaticPublisher
+from .services.upload_service import UploadService
+
+
+@job('overdue_sweep')
+def overdue_sweep():
+    """Marks every Ongoing project that passed its End Date as overdue, and unmarks the rest."""
+    newly_overdue = Project.query\
+        .filter(Project.is_overdue, Project.overdue_since.is_(None))\
+        .update({Project.overdue_since: date.today()}, synchronize_session=False)
+    # Completed since, or its End Date was moved back out (no End Date counts as not overdue)
+    no_longer_overdue = Project.query\
+        .filter(Project.overdue_since.isnot(None), not_(func.coalesce(Project.is_overdue, False)))\
+        .update({Project.overdue_since: None}, synchronize_session=False)
+    db.session.commit()
+    return f"Marked {newly_overdue} project(s) as overdue, cleared {no_longer_overdue}."
+
+
+@job('deadline_reminders')
+def deadline_reminders():
+    """Sends each associate ONE email listing all their projects that end soon."""
+    urgent_projects = Project.query.join(Request)\
+        .options(contains_eager(Project.request).joinedload(Request.requester))\
+        .filter(Project.is_urgent)\
+        .order_by(Project.days_left).all()
+
+    # Group by the associate who owns the project
+    by_owner = defaultdict(list)
+    for p in urgent_projects:
+        by_owner[p.request.requester].append(p)
+
+    sent = 0
+    for owner, projects in by_owner.items():
+        lines = [f"- {p.request.project_title}: ends {p.end_date:%b %d, %Y} ({p.days_left} day(s) left)"
+                 for p in projects]
+        try:
+            msg = Message("Project Deadline Reminder", recipients=[owner.email])
+            msg.body = (f"Hello {owner.name},\n\nThe following projects are nearing their deadline:\n\n"
+                        + "\n".join(lines)
+                        + "\n\nPlease post your final updates before the End Date.")
+            mail.send(msg)
+            sent += 1
+        except Exception as e:
+            # Same fallback as 'Forgot Password' when SMTP is not configured
+            print(f"EMAIL ERROR: {e}")
+            print(f"DEV MODE - REMINDER FOR {owner.username}:\n" + "\n".join(lines))
+
+    return f"Sent {sent} of {len(by_owner)} reminder email(s) for {len(urgent_projects)} project(s)."
+
+
+@job('refresh_aggregates')
+def refresh_aggregates():
+    """Rebuilds every cached dashboard aggregate."""
+    for key in AggregateService.BUILDERS:
+        AggregateService.refresh(key)
+    return f"Refreshed: {', '.join(AggregateService.BUILDERS)}"
+
+
+@job('archive_logs')
+def archive_logs():
+    """Moves system logs older than LOG_RETENTION_DAYS into the monthly archive files."""
+    retention_days = current_app.config['LOG_RETENTION_DAYS']
+    moved = LogArchiveService.from_app().archive(retention_days)
+    return f"Archived {moved} log(s) older than {retention_days} days."
+
+
+@job('publish_static')
+def publish_static():
+    """Re-renders the static snapshot of the public pages (changed pages only)."""
+    rendered, skipped, removed = StaticPublisher.from_app().publish()
+    return f"Snapshot: {rendered} rendered, {skipped} unchanged, {removed} removed."
+
+
+@job('rebuild_rollups')
+def rebuild_rollups():
+    """Recomputes the spend/release rollup tables from scratch (normally kept up to date incrementally)."""
+    rows = RollupService.rebuild()
+    return f"Rebuilt rollups from {rows} update/project row(s)."
+
+
+@job('reconcile_budgets')
+def reconcile_budgets():
+    """Re-checks every project's remaining fund against its posted expenses and fixes drift."""
+    checked, corrected = BudgetService.reconcile()
+    if corrected:
+        return f"Checked {checked} ledger(s); corrected projects {', '.join(map(str, corrected))}."
+    return f"Checked {checked} ledger(s); all balanced."
+
+
+@job('send_emails')
+def send_emails():
+    """Sends the emails waiting in the outbox (e.g. welcome emails from a user import)."""
+    sent, failed = OutboxService.send_pending()
+    return f"Sent {sent} email(s); gave up on {failed}."
+
+
+@job('purge_uploads')
+def purge_uploads():
+    """Deletes resumable uploads that were abandoned, or finished but never attached to an update."""
+    hours = current_app.config['UPLOAD_EXPIRY_HOURS']
+    removed = UploadService.from_app().purge(hours * 3600)
+    return f"Removed {removed} upload(s) older than {hours} hours."
+
+
+@job('replica_heartbeat')
+def replica_heartbeat():
+    """Stamps the heartbeat the read replica's lag is measured with."""
+    ReplicaHeartbeat.beat()
+    db.session.commit()
+    return "Heartbeat written."
+
+
+@job('backup_database')
+def backup_database():
+    """Takes a compressed online snapshot of the database and drops the oldest ones."""
+    backup = BackupService.from_app().create()
+    return (f"{backup['name']}: {backup['size'] / 2**20:.1f} MiB in {backup['total_seconds']:.1f} s "
+            f"({backup['mode']}, longest step {backup['longest_step_ms']:.0f} ms, {backup['restarts']} restart(s)).")
@@ -0,0 +1,142 @@
+"""
+The statuses a request and a project go through, and how many are in each.
+
+    request:  Pending --> Approved    (the Captain approves; a project is opened)
+                      --> Rejected
+    project:  Ongoing --> Completed
+
+Every status change goes through this module: it refuses a transition that
+is not in the table above (InvalidTransition) and updates 'status_counts' in
+the SAME transaction as the change, so a count anywhere in the app is one
+primary-key read (count('request', 'Pending')) instead of a COUNT(*) scan.
+
+'flask lifecycle recount' rebuilds the counters from the tables; it is also
+done automatically when db.create_all() creates 'status_counts' on a database
+that already has rows.
+"""
+from sqlalchemy import delete, event, func, insert, literal, select, update
+
+from .database import db, insert_for
+from .models import Request, Project, StatusCount
+from .services.rollup_service import RollupService
+
+
+class InvalidTransition(Exception):
+    """A status change the lifecycle does not allow (e.g. Rejected -> Approved)."""
+    pass
+
+
+# entity: (status column, initial status, {status: statuses it may move to})
+MACHINES = {
+    'request': (Request.status, 'Pending', {
+        'Pending': {'Approved', 'Rejected'},
+        'Approved': set(),
+        'Rejected': set(),
+    }),
+    'project': (Project.current_status, 'Ongoing', {
+        'Ongoing': {'Completed'},
+        'Completed': set(),
+    }),
+}
+
+
+def check(entity, old, new):
+    """Raises InvalidTransition unless 'entity' may go from status 'old' to 'new'."""
+    if new not in MACHINES[entity][2].get(old, ()):
+        raise InvalidTransition(f"A {entity} cannot go from '{old}' to '{new}'.")
+
+
+def _bump(entity, status, delta):
+    if not delta:
+        return
+    stmt = insert_for(StatusCount).values(entity=entity, status=status, count=delta)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=['entity', 'status'],
+                                                  set_={'count': StatusCount.count + stmt.excluded.count}))
+
+
+# --- TRANSITIONS ---
+
+def submit(*requests):
+    """New requests (not added to the session yet): they start as 'Pending'."""
+    for req in requests:
+        req.status = MACHINES['request'][1]
+    _bump('request', MACHINES['request'][1], len(requests))
+
+
+def decide(request_ids, status):
+    """
+    Moves the given Pending requests to 'Approved' or 'Rejected' with one guarded
+    UPDATE. Requests another session decided meanwhile are left alone. Returns
+    the set of ids moved: only those may get a project, a log, a success message.
+    """
+    check('request', 'Pending', status)
+    if not request_ids:
+        return set()
+    moved = set(db.session.scalars(
+        update(Request)
+        .where(Request.request_id.in_(request_ids), Request.status == 'Pending')
+        .values(status=status)
+        .returning(Request.request_id),
+        execution_options={'synchronize_session': 'fetch'}))
+    _bump('request', 'Pending', -len(moved))
+    _bump('request', status, len(moved))
+    return moved
+
+
+def open_projects(rows):
+    """Sets the initial status on new project rows (dicts for a bulk insert) and counts them. Returns the rows."""
+    for row in rows:
+        row['current_status'] = MACHINES['project'][1]
+    _bump('project', MACHINES['project'][1], len(rows))
+    return rows
+
+
+def transition(project, status):
+    """
+    Moves one project to 'status' (e.g. 'Completed'), with its release rollup.
+    The UPDATE is guarded by the status it was read with: if another session
+    moved the project meanwhile, nothing is counted twice and InvalidTransition
+    is raised (with 'project' refreshed to the status it really has).
+    """
+    old = project.current_status
+    check('project', old, status)
+    moved = db.session.execute(
+        update(Project)
+        .where(Project.project_id == project.project_id, Project.current_status == old)
+        .values(current_status=status)).rowcount
+    if moved != 1:
+        db.session.refresh(project, ['current_status'])
+        raise InvalidTransition(f"The project is already {project.current_status}.")
+    RollupService.move_release(project, old, status)
+    _bump('project', old, -1)
+    _bump('project', status, 1)
+
+
+# --- COUNTS ---
+
+def count(entity, status):
+    row = db.session.get(StatusCount, (entity, status))
+    return row.count if row else 0
+
+
+def counts(entity):
+    """{status: count} for every status of 'entity' (0 for the empty ones)."""
+    found = dict(db.session.query(StatusCount.status, StatusCount.count).filter(StatusCount.entity == entity))
+    return {status: found.get(status, 0) for status in MACHINES[entity][2]}
+
+
+def recount(connection):
+    """Rebuilds 'status_counts' from the requests and projects tables (on a Core connection)."""
+    connection.execute(delete(StatusCount.__table__))
+    for entity, (column, _, _) in MACHINES.items():
+        connection.execute(insert(StatusCount.__table__).from_select(
+            ['entity', 'status', 'count'],
+            select(literal(entity), column, func.count()).group_by(column)))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _recount_after_create_all(metadata, connection, tables=(), **kw):
+    # db.create_all() (run by create_app) creates status_counts on an existing database
+    # before 'flask db upgrade' gets to it: count the rows that are already there
+    if any(table.name == 'status_counts' for table in tables):
+        recount(connection)
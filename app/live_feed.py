@@ -0,0 +1,179 @@
+"""
+Live feed of the public transparency logs (Server-Sent Events).
+
+Every commit that wrote a SystemLog (ORM add or Core bulk insert) wakes the
+LogHub of this process; each connected browser's stream then reads the new
+public logs from the database, after the last id it sent (Last-Event-ID on a
+reconnect). With several gunicorn workers a commit in another process is
+noticed by a light poll (one MAX(log_id) query every LIVE_FEED_POLL_SECONDS,
+only while someone is connected).
+
+Each open stream holds one worker thread, so the number per process is capped
+(LIVE_FEED_MAX_CLIENTS) and streams are closed after LIVE_FEED_MAX_SECONDS;
+browsers reconnect by themselves and resume where they stopped.
+
+Each tenant (see tenancy.py) has its own hub, woken only by its own commits.
+"""
+import json
+import threading
+import time
+
+from flask import Response, current_app, get_template_attribute, has_app_context, stream_with_context
+from sqlalchemy import event, func
+
+from . import read_models
+from .database import db
+from .models import SystemLog
+from .tenancy import current_tenant, tenant_cache, tenant_context
+
+
+# Logs sent per query; a bigger backlog is sent in several rounds
+BATCH = 100
+
+
+class LogHub:
+    """Wakes waiting streams when new logs are committed."""
+
+    def __init__(self, app, tenant, poll_seconds, max_clients):
+        self.app = app
+        self.tenant = tenant
+        self.poll_seconds = poll_seconds
+        self.max_clients = max_clients
+        self.version = 0
+        self.clients = 0
+        self._latest_seen = None
+        self._cond = threading.Condition()
+        self._poller = None
+
+    def notify(self):
+        with self._cond:
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait(self, version, timeout):
+        """Blocks until something was committed after 'version' was read (or timeout). Returns the new version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def connect(self):
+        """Registers one stream. False if this process already serves max_clients."""
+        with self._cond:
+            if self.clients >= self.max_clients:
+                return False
+            self.clients += 1
+            if self.poll_seconds and (self._poller is None or not self._poller.is_alive()):
+                self._poller = threading.Thread(target=self._poll, name='log-feed-poller', daemon=True)
+                self._poller.start()
+            return True
+
+    def disconnect(self):
+        with self._cond:
+            self.clients -= 1
+
+    def _poll(self):
+        # Catches commits made by OTHER processes; stops when the last stream closes
+        while self.clients > 0:
+            time.sleep(self.poll_seconds)
+            with tenant_context(self.app, self.tenant):
+                latest = db.session.query(func.max(SystemLog.log_id)).scalar()
+                db.session.remove()
+            if latest != self._latest_seen:
+                self._latest_seen = latest
+                self.notify()
+
+
+def init_app(app):
+    app.extensions['log_hub'] = {}  # {tenant: LogHub}
+
+
+def get_hub():
+    """The hub of the current tenant (created on first use)."""
+    app = current_app._get_current_object()
+    return tenant_cache('log_hub', lambda: LogHub(app, current_tenant(), app.config['LIVE_FEED_POLL_SECONDS'],
+                                                  app.config['LIVE_FEED_MAX_CLIENTS']), app)
+
+
+# --- COMMIT HOOKS ---
+
+@event.listens_for(db.session, 'after_flush')
+def _track_flushed_logs(session, flush_context):
+    if any(isinstance(obj, SystemLog) for obj in session.new):
+        session.info['system_logs_written'] = True
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _track_bulk_logs(orm_execute_state):
+    # e.g. db.session.execute(insert(SystemLog), [...]) in the council and import services
+    mapper = orm_execute_state.bind_mapper
+    if orm_execute_state.is_insert and mapper is not None and mapper.class_ is SystemLog:
+        orm_execute_state.session.info['system_logs_written'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _wake_streams(session):
+    if session.info.pop('system_logs_written', False) and has_app_context():
+        hub = current_app.extensions.get('log_hub', {}).get(current_tenant())
+        if hub is not None:
+            hub.notify()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_logs(session):
+    session.info.pop('system_logs_written', None)
+
+
+# --- STREAM ---
+
+def latest_log_id():
+    return db.session.query(func.max(SystemLog.log_id)).scalar() or 0
+
+
+def new_public_logs(after_id, limit=BATCH):
+    """[(tab, LogRow)] for public logs with log_id > after_id, oldest first."""
+    tab_of = {action: tab for tab, actions in SystemLog.PUBLIC_ACTIONS.items() for action in actions}
+    query = SystemLog.query.filter(SystemLog.log_id > after_id, SystemLog.action_type.in_(tab_of))\
+        .order_by(SystemLog.log_id).limit(limit)
+    return [(tab_of[log.action_type], log) for log in read_models.iter_system_logs(query)]
+
+
+def _event(log_id, data):
+    return f"id: {log_id}\nevent: log\ndata: {json.dumps(data)}\n\n"
+
+
+def event_stream(last_id):
+    """The text/event-stream response for one browser."""
+    config = current_app.config
+    hub = get_hub()
+
+    def generate():
+        nonlocal last_id
+        if not hub.connect():
+            # Full: ask the browser to come back later instead of holding a thread
+            yield "retry: 30000\n\n"
+            return
+        try:
+            rows = {tab: get_template_attribute('main/_log_rows.html', f'{tab}_row')
+                    for tab in SystemLog.PUBLIC_ACTIONS}
+            yield f"retry: {config['LIVE_FEED_RETRY_MS']}\n\n"
+            closes_at = time.monotonic() + config['LIVE_FEED_MAX_SECONDS']
+            while time.monotonic() < closes_at:
+                # Read the version BEFORE querying: a commit during the query wakes the next wait
+                version = hub.version
+                logs = new_public_logs(last_id)
+                db.session.close()  # Don't hold a connection (or a read snapshot) while idle
+                for tab, log in logs:
+                    last_id = log.log_id
+                    yield _event(log.log_id, {'tab': tab, 'action': log.action_type, 'amount': log.amount,
+                                                    'html': str(rows[tab](log))})
+                if len(logs) == BATCH:
+                    continue  # More waiting
+                if hub.wait(version, config['LIVE_FEED_KEEPALIVE_SECONDS']) == version:
+                    yield ": keepalive\n\n"  # Keeps proxies from closing an idle connection
+        finally:
+            hub.disconnect()
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
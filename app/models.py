@@ -1,6 +1,10 @@
-from .database import db
-from datetime import datetime, date
+import hashlib
+
+from .database import db, insert_for
+from datetime import datetime, date, timedelta
 from flask_login import UserMixin
+from sqlalchemy import select, func, and_, cast, Integer
+from sqlalchemy.ext.hybrid import hybrid_property
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(UserMixin, db.Model):
@@ -36,6 +40,43 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    # --- ONE-TIME SET-PASSWORD LINKS (users created by a bulk import) ---
+
+    # Matches no password: such a user can only log in after using their link
+    UNUSABLE_PASSWORD = '!'
+
+    @staticmethod
+    def _link_serializer():
+        from flask import current_app
+        from itsdangerous import URLSafeTimedSerializer
+        from .tenancy import current_tenant
+
+        # User ids are per tenant database: a link from one barangay is useless in another
+        return URLSafeTimedSerializer(current_app.secret_key, salt=f"set-password:{current_tenant() or ''}")
+
+    @staticmethod
+    def _password_fingerprint(password_hash):
+        return hashlib.sha256(password_hash.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def set_password_token(cls, user_id, password_hash):
+        """Token for the set-password link. It stops working once the password changes (so: once used)."""
+        return cls._link_serializer().dumps({'user_id': user_id, 'pw': cls._password_fingerprint(password_hash)})
+
+    @classmethod
+    def from_set_password_token(cls, token, max_age):
+        """The user a set-password token was made for, or None if it is forged, expired or already used."""
+        from itsdangerous import BadSignature
+
+        try:
+            data = cls._link_serializer().loads(token, max_age=max_age)
+        except BadSignature:
+            return None
+        user = db.session.get(cls, data['user_id'])
+        if user is None or data['pw'] != cls._password_fingerprint(user.password_hash):
+            return None
+        return user
+
 class Request(db.Model):
     __tablename__ = 'requests'
 
@@ -68,6 +109,33 @@ class AdminVote(db.Model):
     vote = db.Column(db.String(10), nullable=False) # 'Approve' or 'Reject'
     remarks = db.Column(db.String(255))
 
+    # One vote per council member per request (re-voting updates it)
+    __table_args__ = (
+        db.UniqueConstraint('request_id', 'admin_id', name='uq_admin_votes_request_admin'),
+    )
+
+# --- DEADLINE RULES ---
+# Shared by the Project hybrids below and read_models.ProjectRow, so the
+# badges agree wherever a project is shown
+
+# Number of days before a project's deadline counts as "urgent"
+URGENT_WINDOW_DAYS = 7
+
+def days_between(end_date, today):
+    """Days from 'today' until the End Date (negative once it has passed), None without one."""
+    if end_date is None:
+        return None
+    return (end_date - today).days
+
+def deadline_overdue(status, end_date, today):
+    """Still 'Ongoing' but past its End Date."""
+    return status == 'Ongoing' and end_date is not None and today > end_date
+
+def deadline_urgent(status, end_date, today):
+    """'Ongoing' and ending within the urgent window."""
+    return (status == 'Ongoing' and end_date is not None
+            and 0 <= days_between(end_date, today) <= URGENT_WINDOW_DAYS)
+
 class Project(db.Model):
     __tablename__ = 'projects'
 
@@ -77,16 +145,66 @@ class Project(db.Model):
     current_status = db.Column(db.String(50), nullable=False)
     given_fund = db.Column(db.Float, nullable=False)
     approval_date = db.Column(db.DateTime, default=datetime.now) # <--- UPDATED to System Time
+    overdue_since = db.Column(db.Date, nullable=True) # Set by the nightly overdue sweep
+    comment_count = db.Column(db.Integer, default=0, nullable=False, server_default='0') # Kept in step by post_comment
+
+    # Budget ledger: given_fund minus every posted expense (see BudgetService). Starts at given_fund.
+    remaining_fund = db.Column(db.Float, nullable=False, server_default='0',
+                               default=lambda ctx: ctx.get_current_parameters()['given_fund'])
 
     updates = db.relationship('ProjectUpdate', backref='project', lazy=True)
-    comments = db.relationship('ProjectComment', backref='project', lazy=True, order_by="desc(ProjectComment.timestamp)")
+    # 'dynamic' so pages can be sliced in SQL: project.comments.limit(20).offset(40)
+    comments = db.relationship('ProjectComment', backref='project', lazy='dynamic', order_by="desc(ProjectComment.timestamp)")
+
+    URGENT_WINDOW_DAYS = URGENT_WINDOW_DAYS
+
+    # --- DEADLINE HELPERS (usable in Python AND in SQL queries) ---
+    # On an instance these read 'self.request'; on the class they build SQL
+    # expressions, e.g. Project.query.filter(Project.is_overdue).count()
+
+    @hybrid_property
+    def end_date(self):
+        """The deadline of the request this project was created from."""
+        return self.request.end_date if self.request else None
+
+    @end_date.expression
+    def end_date(cls):
+        return select(Request.end_date)\
+            .where(Request.request_id == cls.request_id)\
+            .correlate_except(Request)\
+            .scalar_subquery()
+
+    @hybrid_property
+    def days_left(self):
+        """Days until the End Date (negative once the deadline has passed)."""
+        return days_between(self.end_date, date.today())
 
-    @property
+    @days_left.expression
+    def days_left(cls):
+        # SQLite only: julianday() turns both dates into day numbers so the difference is in days
+        # (PostgreSQL would subtract the dates directly). Only the reminder job's ORDER BY uses it.
+        return cast(func.julianday(cls.end_date) - func.julianday(date.today()), Integer)
+
+    @hybrid_property
     def is_overdue(self):
         """Returns True if the project is still 'Ongoing' but passed its End Date."""
-        if self.current_status == 'Ongoing' and self.request.end_date:
-            return date.today() > self.request.end_date
-        return False
+        return deadline_overdue(self.current_status, self.end_date, date.today())
+
+    @is_overdue.expression
+    def is_overdue(cls):
+        return and_(cls.current_status == 'Ongoing', cls.end_date < date.today())
+
+    @hybrid_property
+    def is_urgent(self):
+        """Returns True if the project is 'Ongoing' and ends within the urgent window."""
+        return deadline_urgent(self.current_status, self.end_date, date.today())
+
+    @is_urgent.expression
+    def is_urgent(cls):
+        today = date.today()
+        return and_(cls.current_status == 'Ongoing',
+                    cls.end_date >= today,
+                    cls.end_date <= today + timedelta(days=cls.URGENT_WINDOW_DAYS))
 
 class ProjectUpdate(db.Model):
     __tablename__ = 'project_updates'
@@ -111,9 +229,45 @@ class SystemLog(db.Model):
     
     action_type = db.Column(db.String(50), nullable=False) # e.g., 'Login', 'Vote'
     target_change = db.Column(db.String(50)) # e.g., 'Request #5'
-    details = db.Column(db.String(50))
+    details = db.Column(db.String(255)) # Human-readable summary (display only)
     timestamp = db.Column(db.DateTime, default=datetime.now) # <--- UPDATED to System Time
 
+    # Structured data (use these instead of parsing 'details')
+    entity_type = db.Column(db.String(20)) # 'user', 'request', 'project'
+    entity_id = db.Column(db.Integer)
+    amount = db.Column(db.Float) # Money involved, e.g. an expense or an approved fund
+    payload = db.Column(db.JSON) # Extra fields, e.g. {'update_type': 'expense', 'title': ...}
+
+    __table_args__ = (
+        db.Index('ix_system_logs_entity', 'entity_type', 'entity_id'),
+        # Audit viewer: newest-first keyset pages, filters, and facet counts that never touch the table
+        db.Index('ix_system_logs_time', 'timestamp', 'log_id'),
+        db.Index('ix_system_logs_action_time', 'action_type', 'timestamp', 'log_id'),
+        db.Index('ix_system_logs_actor_time', 'actor_id', 'timestamp', 'log_id'),
+        db.Index('ix_system_logs_target', 'target_change', 'timestamp'),
+    )
+
+    # Actions shown on the public transparency logs page (and its live feed), per tab
+    PUBLIC_ACTIONS = {
+        'staff': ['Create User', 'Delete User', 'Deactivate User', 'Update User', 'Register', 'Register Staff'],
+        'fund': ['Create Request', 'Vote Cast', 'Council Vote', 'Approve Request', 'Reject Request', 'Finalize Request'],
+        # Checking for both 'Update Project' and 'Project Update' to be safe
+        'project': ['Update Project', 'Project Update'],
+    }
+
+    @classmethod
+    def expense_total(cls, project_id=None):
+        """Sum of expenses reported through 'Project Update' logs (optionally for one project)."""
+        from .services.log_archive_service import LogArchiveService
+
+        query = db.session.query(func.coalesce(func.sum(cls.amount), 0.0))\
+            .filter(cls.action_type == 'Project Update', cls.entity_type == 'project')
+        if project_id is not None:
+            query = query.filter(cls.entity_id == project_id)
+
+        # Logs moved to the archive still count (their totals are kept in the manifest)
+        return query.scalar() + LogArchiveService.from_app().expense_total(project_id)
+
 class ProjectComment(db.Model):
     __tablename__ = 'project_comments'
 
@@ -127,3 +281,106 @@ class ProjectComment(db.Model):
     # Relationship to project
     # Note: We can access project.comments if we add a backref to Project, or just query it directly.
     # Let's add a backref to Project for convenience.
+
+
+class JobRun(db.Model):
+    __tablename__ = 'job_runs'
+
+    run_id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(50), nullable=False, index=True)
+
+    status = db.Column(db.String(20), default='Running', nullable=False) # 'Running', 'Success', 'Failed'
+    message = db.Column(db.String(255))
+    started_at = db.Column(db.DateTime, default=datetime.now)
+    finished_at = db.Column(db.DateTime)
+
+class CachedAggregate(db.Model):
+    __tablename__ = 'cached_aggregates'
+
+    key = db.Column(db.String(50), primary_key=True) # e.g., 'fund_totals'
+    value = db.Column(db.JSON, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+class SpendRollup(db.Model):
+    """Expenses per project per day and per month (kept up to date on every ProjectUpdate)."""
+    __tablename__ = 'spend_rollups'
+
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.project_id'), primary_key=True)
+    period = db.Column(db.String(5), primary_key=True) # 'day' or 'month'
+    period_start = db.Column(db.Date, primary_key=True) # The day, or the 1st of the month
+
+    total = db.Column(db.Float, default=0.0, nullable=False)
+    update_count = db.Column(db.Integer, default=0, nullable=False)
+
+class ReleaseRollup(db.Model):
+    """Funds released per approval month, split by the project's current status."""
+    __tablename__ = 'release_rollups'
+
+    month = db.Column(db.Date, primary_key=True) # 1st of the approval month
+    status = db.Column(db.String(50), primary_key=True) # 'Ongoing', 'Completed'
+
+    total = db.Column(db.Float, default=0.0, nullable=False)
+    project_count = db.Column(db.Integer, default=0, nullable=False)
+
+class EmailOutbox(db.Model):
+    """Emails waiting to be sent by the 'send_emails' job (so requests never wait on SMTP)."""
+    __tablename__ = 'email_outbox'
+
+    email_id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(50), nullable=False)
+    subject = db.Column(db.String(100), nullable=False)
+    body = db.Column(db.Text, nullable=False) # Cleared once sent (may hold an initial password)
+
+    status = db.Column(db.String(20), default='Queued', nullable=False, index=True) # 'Queued', 'Sent', 'Failed'
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    sent_at = db.Column(db.DateTime)
+
+class ChangeLog(db.Model):
+    """
+    The latest change of every synced row (see change_feed.py), written by
+    database triggers. 'seq' grows with every write, so a client that stored
+    the highest seq it saw only has to ask for the rows after it.
+    """
+    __tablename__ = 'change_log'
+
+    seq = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False) # 'request', 'project', 'project_update', ...
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(6), nullable=False) # 'upsert' or 'delete'
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+    __table_args__ = (
+        db.UniqueConstraint('entity_type', 'entity_id', name='uq_change_log_entity'),
+        # AUTOINCREMENT: a seq is never handed out twice, even after its row was replaced
+        {'sqlite_autoincrement': True},
+    )
+
+class ReplicaHeartbeat(db.Model):
+    """
+    One row, stamped on the primary every minute. Its age on the read replica is
+    the replication lag (see database.replica_usable).
+    """
+    __tablename__ = 'replica_heartbeat'
+
+    heartbeat_id = db.Column(db.Integer, primary_key=True) # Always 1
+    beat_at = db.Column(db.DateTime, nullable=False) # UTC
+
+    @classmethod
+    def beat(cls):
+        """Stamps the heartbeat with the current time (in the caller's transaction)."""
+        stmt = insert_for(cls).values(heartbeat_id=1, beat_at=datetime.utcnow())
+        db.session.execute(stmt.on_conflict_do_update(index_elements=['heartbeat_id'],
+                                                      set_={'beat_at': stmt.excluded.beat_at}))
+
+class StatusCount(db.Model):
+    """
+    How many requests / projects are in each status, kept by lifecycle.py in the
+    same transaction as every status change, so counts are one primary-key read.
+    """
+    __tablename__ = 'status_counts'
+
+    entity = db.Column(db.String(20), primary_key=True) # 'request' or 'project'
+    status = db.Column(db.String(50), primary_key=True) # e.g. 'Pending', 'Ongoing'
+    count = db.Column(db.Integer, default=0, nullable=False)
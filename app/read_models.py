@@ -0,0 +1,271 @@
+"""
+Lightweight, read-only rows for pages that only DISPLAY data.
+
+They are filled from column-only queries (no ORM identity map, no change
+tracking, no lazy loading), so a listing costs a fraction of the memory of
+loading full entities and is built from a fixed number of round-trips.
+Attribute names match the ORM models, so templates and exports work with either.
+"""
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import func, case
+
+from .database import db
+from .models import (User, Project, Request, ProjectUpdate, SystemLog, AdminVote,
+                     days_between, deadline_overdue, deadline_urgent)
+
+
+class Row:
+    """Base for read models: fields may be given by position or by name; missing ones are None."""
+
+    __slots__ = ()
+
+    def __init__(self, *values, **named):
+        for field in self.__slots__:
+            setattr(self, field, None)
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+        for field, value in named.items():
+            setattr(self, field, value)
+
+    @classmethod
+    def from_row(cls, row, **extra):
+        """Builds one from a SQLAlchemy Row whose column labels match the field names."""
+        return cls(**row._mapping, **extra)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {getattr(self, self.__slots__[0])}>"
+
+
+class UserRow(Row):
+    __slots__ = ('user_id', 'username', 'name', 'role', 'occupation', 'address', 'pic_path', 'is_active')
+
+
+class VoteRow(Row):
+    __slots__ = ('request_id', 'admin_id', 'vote', 'remarks', 'admin')
+
+
+class RequestRow(Row):
+    __slots__ = ('request_id', 'project_title', 'submission_date', 'fund_amount', 'status', 'end_date',
+                 'reason', 'project_site', 'requester', 'votes', 'approve_count', 'reject_count', 'user_voted')
+
+
+class ProjectRow(Row):
+    """Same deadline helpers as Project, computed from the joined request's End Date."""
+
+    __slots__ = ('project_id', 'current_status', 'given_fund', 'remaining_fund', 'total_expenses', 'request',
+                 'approval_date')
+
+    @property
+    def end_date(self):
+        return self.request.end_date
+
+    @property
+    def days_left(self):
+        return days_between(self.end_date, date.today())
+
+    @property
+    def is_overdue(self):
+        return deadline_overdue(self.current_status, self.end_date, date.today())
+
+    @property
+    def is_urgent(self):
+        return deadline_urgent(self.current_status, self.end_date, date.today())
+
+
+class LogRow(Row):
+    """A system log from the hot table (see ArchivedLog for archived ones)."""
+
+    __slots__ = ('log_id', 'actor_id', 'action_type', 'target_change', 'details', 'timestamp',
+                 'entity_type', 'entity_id', 'amount', 'payload', 'actor')
+
+
+# --- SHARED LOOK-UPS ---
+
+BATCH_SIZE = 500
+
+def batches(rows, size=BATCH_SIZE):
+    """Groups an iterable of rows into lists of at most 'size'."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+USER_COLUMNS = (User.user_id, User.username, User.name, User.role, User.occupation, User.address,
+                User.pic_path, User.is_active)
+
+def users_by_id(user_ids):
+    """{user_id: UserRow} for the given ids, in one query."""
+    if not user_ids:
+        return {}
+    rows = db.session.query(*USER_COLUMNS).filter(User.user_id.in_(set(user_ids)))
+    return {row.user_id: UserRow.from_row(row) for row in rows}
+
+def votes_by_request(request_ids):
+    """{request_id: [VoteRow, ...]} with each voter's name, in one query."""
+    votes = defaultdict(list)
+    if not request_ids:
+        return votes
+    rows = db.session.query(AdminVote.request_id, AdminVote.admin_id, AdminVote.vote, AdminVote.remarks,
+                            User.name.label('admin_name'))\
+        .join(User, User.user_id == AdminVote.admin_id)\
+        .filter(AdminVote.request_id.in_(request_ids))\
+        .order_by(AdminVote.vote_id)
+    for row in rows:
+        votes[row.request_id].append(VoteRow(row.request_id, row.admin_id, row.vote, row.remarks,
+                                             UserRow(user_id=row.admin_id, name=row.admin_name)))
+    return votes
+
+
+# --- PAGES ---
+
+def associate_dashboard(user_id):
+    """
+    Everything the associate dashboard shows, in ONE query:
+    requests LEFT JOIN projects LEFT JOIN (expenses grouped by project).
+    Returns (requests newest first, projects closest deadline first).
+    """
+    # Only this associate's updates are grouped
+    spent = db.session.query(ProjectUpdate.project_id, func.sum(ProjectUpdate.expenses).label('spent'))\
+        .join(Project, Project.project_id == ProjectUpdate.project_id)\
+        .join(Request, Request.request_id == Project.request_id)\
+        .filter(Request.requested_by_user_id == user_id)\
+        .group_by(ProjectUpdate.project_id).subquery()
+
+    rows = db.session.query(
+            Request.request_id, Request.project_title, Request.submission_date,
+            Request.fund_amount, Request.status, Request.end_date,
+            Project.project_id, Project.current_status, Project.given_fund, Project.remaining_fund,
+            func.coalesce(spent.c.spent, 0.0))\
+        .outerjoin(Project, Project.request_id == Request.request_id)\
+        .outerjoin(spent, spent.c.project_id == Project.project_id)\
+        .filter(Request.requested_by_user_id == user_id)\
+        .order_by(Request.submission_date.desc(), Request.request_id.desc())\
+        .all()
+
+    requests, projects = [], []
+    for row in rows:
+        req = RequestRow(*row[:6])
+        requests.append(req)
+        if row[6] is not None:
+            projects.append(ProjectRow(*row[6:], req))
+
+    # Closest deadline first (projects without one last)
+    projects.sort(key=lambda p: (p.days_left is None, p.days_left or 0))
+    return requests, projects
+
+
+def public_records(deadline=None):
+    """
+    Captain, members, projects (optionally only overdue/urgent) and every request
+    with its votes, for the public records page. Projects and requests are
+    generators read from the database in batches (see iter_public_projects and
+    iter_public_requests), so the page can be streamed.
+    """
+    users = [UserRow.from_row(row) for row in db.session.query(*USER_COLUMNS).order_by(User.user_id)]
+    captain = next((u for u in users if u.role == 'super_admin'), None)
+    members = [u for u in users if u.role != 'super_admin']
+    return captain, members, iter_public_projects(deadline), iter_public_requests()
+
+
+def iter_public_projects(deadline=None, batch_size=BATCH_SIZE):
+    query = db.session.query(
+            Project.project_id, Project.current_status, Project.given_fund, Project.approval_date,
+            Request.request_id, Request.project_title, Request.reason, Request.project_site, Request.end_date)\
+        .join(Request, Request.request_id == Project.request_id)
+    if deadline == 'overdue':
+        query = query.filter(Project.is_overdue)
+    elif deadline == 'urgent':
+        query = query.filter(Project.is_urgent)
+
+    for row in query.order_by(Project.approval_date.desc()).yield_per(batch_size):
+        yield ProjectRow(project_id=row.project_id, current_status=row.current_status, given_fund=row.given_fund,
+                         approval_date=row.approval_date,
+                         request=RequestRow(request_id=row.request_id, project_title=row.project_title,
+                                            reason=row.reason, project_site=row.project_site,
+                                            end_date=row.end_date))
+
+
+def iter_public_requests(batch_size=BATCH_SIZE):
+    """Every request (newest first) with its votes; one votes query per batch."""
+    rows = db.session.query(
+            Request.request_id, Request.project_title, Request.submission_date, Request.fund_amount,
+            Request.status, Request.end_date, Request.reason, Request.project_site)\
+        .order_by(Request.submission_date.desc()).yield_per(batch_size)
+    for batch in batches(rows, batch_size):
+        votes = votes_by_request([row.request_id for row in batch])
+        for row in batch:
+            yield RequestRow.from_row(row, votes=votes.get(row.request_id, []))
+
+
+def pending_requests(voter_id):
+    """
+    Pending requests for the council page with the requester, vote counts and
+    the given admin's own vote. Three queries, however many requests are pending.
+    """
+    rows = db.session.query(
+            Request.request_id, Request.project_title, Request.submission_date, Request.fund_amount,
+            Request.status, Request.end_date, Request.reason, Request.project_site,
+            User.user_id, User.name, User.role)\
+        .join(User, User.user_id == Request.requested_by_user_id)\
+        .filter(Request.status == 'Pending')\
+        .order_by(Request.request_id).all()
+    request_ids = [row.request_id for row in rows]
+
+    counts, my_votes = {}, {}
+    if request_ids:
+        counts = {row.request_id: (row.approvals, row.rejections) for row in db.session.query(
+            AdminVote.request_id,
+            func.count(case((AdminVote.vote == 'Approve', 1))).label('approvals'),
+            func.count(case((AdminVote.vote == 'Reject', 1))).label('rejections'))
+            .filter(AdminVote.request_id.in_(request_ids))
+            .group_by(AdminVote.request_id)}
+        my_votes = {row.request_id: VoteRow.from_row(row) for row in db.session.query(
+            AdminVote.request_id, AdminVote.admin_id, AdminVote.vote, AdminVote.remarks)
+            .filter(AdminVote.admin_id == voter_id, AdminVote.request_id.in_(request_ids))}
+
+    requests = []
+    for row in rows:
+        approve_count, reject_count = counts.get(row.request_id, (0, 0))
+        requests.append(RequestRow(
+            *row[:8],
+            requester=UserRow(user_id=row.user_id, name=row.name, role=row.role),
+            approve_count=approve_count, reject_count=reject_count,
+            user_voted=my_votes.get(row.request_id)))
+    return requests
+
+
+def system_logs(query):
+    """
+    Runs a SystemLog query as column rows (LogRow), each with its actor attached.
+    'query' may carry any filters/ordering on SystemLog.
+    """
+    return list(iter_system_logs(query))
+
+
+def iter_system_logs(query, batch_size=BATCH_SIZE):
+    """Same as system_logs(), but reads the rows in batches and yields them one by one."""
+    columns = [getattr(SystemLog, field) for field in LogRow.__slots__[:-1]]
+    actors = {}
+    for batch in batches(query.with_entities(*columns).yield_per(batch_size), batch_size):
+        logs = [LogRow(*row) for row in batch]
+        # Only look up actors not seen in an earlier batch
+        actors.update(users_by_id({log.actor_id for log in logs} - actors.keys()))
+        for log in logs:
+            log.actor = actors.get(log.actor_id)
+            yield log
+
+
+def project_export_rows():
+    """Named-tuple rows for the projects CSV export, streamed from the database in chunks."""
+    return db.session.query(Project.project_id, Request.project_title, Project.current_status,
+                            Project.given_fund, Project.approval_date, Request.project_site)\
+        .join(Request, Request.request_id == Project.request_id)\
+        .order_by(Project.project_id)\
+        .execution_options(yield_per=1000)
@@ -1,13 +1,19 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, Response, stream_with_context
+from flask import Blueprint, render_template, request, flash, redirect, url_for, Response, stream_with_context, jsonify
 from flask_login import login_required, current_user
-from datetime import datetime
+from datetime import datetime, timedelta
 from ..utils.decorators import admin_required
 from ..models import Project, Request, User, SystemLog, AdminVote # <--- Ensure AdminVote is imported
 from ..database import db
-from sqlalchemy import func
+from .. import lifecycle, read_models
+from ..services.aggregate_service import AggregateService
+from ..services.council_service import CouncilService
+from ..services.log_archive_service import LogArchiveService
+from ..services.user_import_service import UserImportService
+from ..storage import get_storage
+from sqlalchemy import func, case
+from sqlalchemy.orm import contains_eager
 import csv
 from io import StringIO
-import os
 import re 
 from werkzeug.utils import secure_filename
 from flask import current_app
@@ -21,38 +27,30 @@ def dashboard():
     if current_user.role not in ['admin', 'super_admin']:
         return redirect(url_for('main.index'))
 
-    # 1. Analytics (SQLAlchemy for basic counts)
-    total_projects = Project.query.count()
-    pending_requests = Request.query.filter_by(status='Pending').count()
-    
-    # --- REQUIREMENT: LAMBDA FUNCTIONS & DATA HANDLING ---
-    # Fetch all projects to process in Python
-    all_projects = Project.query.all()
-
-    # Demonstrating 'filter' with lambda: Get projects by status
-    ongoing_campaigns = list(filter(lambda p: p.current_status == 'Ongoing', all_projects))
-    completed_campaigns = list(filter(lambda p: p.current_status == 'Completed', all_projects))
-
-    # Demonstrating 'map' with lambda: Extract funds
-    # Demonstrating 'sum' (could use reduce): Calculate totals
-    ongoing_funds = sum(map(lambda p: p.given_fund, ongoing_campaigns))
-    completed_funds = sum(map(lambda p: p.given_fund, completed_campaigns))
-    
-    # -----------------------------------------------------
+    # 1. Analytics
+    # Fund totals are precomputed by the 'refresh_aggregates' job (see app/jobs.py)
+    # and only recomputed here if the cached copy is missing or stale.
+    totals = AggregateService.get('fund_totals')
 
-    total_funds = ongoing_funds + completed_funds # Or use the SQL Query methods
-    approved_projects = len(ongoing_campaigns) + len(completed_campaigns)
+    # Deadline counts are computed by the database in one query
+    overdue_projects, urgent_projects = db.session.query(
+        func.count(case((Project.is_overdue, 1))),
+        func.count(case((Project.is_urgent, 1)))
+    ).one()
 
     # 2. Recent Projects
-    projects = Project.query.join(Request).order_by(Project.approval_date.desc()).limit(5).all()
+    projects = Project.query.join(Request).options(contains_eager(Project.request))\
+        .order_by(Project.approval_date.desc()).limit(5).all()
 
     return render_template('admin/dashboard.html', 
-                           total_projects=total_projects,
-                           approved_projects=approved_projects,
-                           pending_requests=pending_requests,
-                           total_funds=total_funds,
-                           ongoing_funds=ongoing_funds,       # Added
-                           completed_funds=completed_funds,   # Added
+                           total_projects=totals['total_projects'],
+                           approved_projects=totals['approved_projects'],
+                           pending_requests=totals['pending_requests'],
+                           total_funds=totals['total_funds'],
+                           ongoing_funds=totals['ongoing_funds'],       # Added
+                           completed_funds=totals['completed_funds'],   # Added
+                           overdue_projects=overdue_projects,
+                           urgent_projects=urgent_projects,
                            projects=projects)
 
 @admin_bp.route('/requests')
@@ -61,15 +59,9 @@ def requests_list():
     if current_user.role not in ['admin', 'super_admin']:
         return redirect(url_for('main.index'))
 
-    # Fetch Pending Requests
-    requests = Request.query.filter_by(status='Pending').all()
-    
-    # Calculate Vote Counts for each request (For the Captain to see)
-    for req in requests:
-        req.approve_count = AdminVote.query.filter_by(request_id=req.request_id, vote='Approve').count()
-        req.reject_count = AdminVote.query.filter_by(request_id=req.request_id, vote='Reject').count()
-        # Check if CURRENT user has already voted
-        req.user_voted = AdminVote.query.filter_by(request_id=req.request_id, admin_id=current_user.user_id).first()
+    # Fetch Pending Requests with their requester, Vote Counts (for the Captain to see)
+    # and the CURRENT user's own vote, as lightweight read-only rows
+    requests = read_models.pending_requests(current_user.user_id)
 
     return render_template('admin/requests_list.html', requests=requests)
 
@@ -138,8 +130,7 @@ def register_official():
             filename = secure_filename(file.filename)
             import time
             unique_filename = f"{int(time.time())}_{filename}"
-            file_path = os.path.join(current_app.root_path, 'static', 'profile_pics', unique_filename)
-            file.save(file_path)
+            get_storage().save(f"profile_pics/{unique_filename}", file.stream, file.mimetype)
             pic_filename = unique_filename
 
         new_user = User(
@@ -149,13 +140,17 @@ def register_official():
         )
         new_user.set_password(password)
         db.session.add(new_user)
+        db.session.flush() # Assigns new_user.user_id for the log
         
         # Log it
         log = SystemLog(
             actor_id=current_user.user_id,
             action_type='Create User',
             target_change=f'Official: {name}',
-            details=f"Registered {occupation}: {name}. Address: {address}"
+            details=f"Registered {occupation}: {name}. Address: {address}",
+            entity_type='user',
+            entity_id=new_user.user_id,
+            payload={'role': role, 'occupation': occupation}
         )
         db.session.add(log)
         db.session.commit()
@@ -174,43 +169,22 @@ def vote_request(request_id):
         return redirect(url_for('admin.dashboard'))
 
     # 2. Get Data
-    req = Request.query.get_or_404(request_id)
+    Request.query.get_or_404(request_id)
     vote_value = request.form.get('vote') # 'Approve' or 'Reject'
     remarks = request.form.get('remarks')
 
-    # 3. Process Vote (Prevent Double Voting)
-    existing_vote = AdminVote.query.filter_by(request_id=request_id, admin_id=current_user.user_id).first()
+    # 3. Cast or update the vote (one vote per admin, enforced by the database) and log it
+    result, = CouncilService.cast_votes(current_user, [
+        {'request_id': request_id, 'vote': vote_value, 'remarks': remarks}])
+    db.session.commit()
 
-    if existing_vote:
-        existing_vote.vote = vote_value
-        existing_vote.remarks = remarks
+    if not result['ok']:
+        flash(result['message'], 'danger')
+    elif result['updated']:
         flash('Your vote has been updated.', 'info')
     else:
-        new_vote = AdminVote(
-            request_id=req.request_id,
-            admin_id=current_user.user_id,
-            vote=vote_value,
-            remarks=remarks
-        )
-        db.session.add(new_vote)
         flash('Vote cast successfully!', 'success')
 
-    # --- 4. LOGGING THE VOTE (This is the part you requested) ---
-    log_details = f"Voted: {vote_value}"
-    if remarks:
-        log_details += f" | Remarks: {remarks}"
-
-    log = SystemLog(
-        actor_id=current_user.user_id,
-        action_type='Council Vote',  # This tag appears in your Audit Trail
-        target_change=f'Request: {req.project_title}',
-        details=log_details
-    )
-    db.session.add(log)
-    # -------------------------------------------------------------
-
-    db.session.commit()
-
     return redirect(url_for('admin.requests_list'))
 
 @admin_bp.route('/requests/<int:request_id>/finalize', methods=['POST'])
@@ -221,51 +195,76 @@ def finalize_approval(request_id):
         flash('Only the Captain can finalize approvals.', 'danger')
         return redirect(url_for('admin.requests_list'))
 
-    req = Request.query.get_or_404(request_id)
+    Request.query.get_or_404(request_id)
     action = request.form.get('action') # 'Approve' or 'Reject'
-    
-    # Initialize log variables
-    log_action_type = ''
-    log_details = ''
-
-    if action == 'Approve':
-        req.status = 'Approved'
-        # Create Project
-        proj = Project(
-            request_id=req.request_id,
-            current_status='Ongoing',
-            given_fund=req.fund_amount,
-            approval_date=datetime.utcnow()
-        )
-        db.session.add(proj)
-        
-        # SET LOG TYPE TO 'Approve Request'
-        log_action_type = 'Approve Request'
-        log_details = f"Approved ₱{req.fund_amount:,.2f} for implementation."
-        
-        flash('Request officially APPROVED. Project created.', 'success')
 
+    # Creates the Project (if approved), updates the rollups and logs the decision
+    result, = CouncilService.finalize(current_user, [{'request_id': request_id, 'action': action}])
+    db.session.commit()
+
+    if not result['ok']:
+        flash(result['message'], 'danger')
+    elif action == 'Approve':
+        flash('Request officially APPROVED. Project created.', 'success')
     else:
-        req.status = 'Rejected'
-        
-        # SET LOG TYPE TO 'Reject Request'
-        log_action_type = 'Reject Request'
-        log_details = f"Request rejected by {current_user.name}."
-        
         flash('Request officially REJECTED.', 'warning')
 
-    # Log it with the specific Action Type
-    log = SystemLog(
-        actor_id=current_user.user_id,
-        action_type=log_action_type, # Now saves as 'Approve Request' or 'Reject Request'
-        target_change=f'Request: {req.project_title}',
-        details=log_details
-    )
-    db.session.add(log)
-    db.session.commit()
+    return redirect(url_for('admin.requests_list'))
 
+# --- BULK COUNCIL ACTIONS ---
+# Both accept either a form post from the requests list (checked 'request_ids'
+# plus one 'vote'/'action') or JSON: {"items": [{"request_id": 5, "vote": "Approve"}, ...]}.
+# Everything is saved in ONE transaction; JSON callers get one result per item.
+
+def _bulk_items(choice_field):
+    if request.is_json:
+        items = (request.get_json(silent=True) or {}).get('items') or []
+        return [item for item in items if isinstance(item, dict) and isinstance(item.get('request_id'), int)]
+    choice = request.form.get(choice_field)
+    remarks = request.form.get('remarks') or None
+    return [{'request_id': request_id, choice_field: choice, 'remarks': remarks}
+            for request_id in request.form.getlist('request_ids', type=int)]
+
+def _bulk_response(results, verb):
+    if request.is_json:
+        return jsonify({'results': results, 'succeeded': sum(r['ok'] for r in results)})
+
+    succeeded = [r for r in results if r['ok']]
+    if succeeded:
+        flash(f"{verb} {len(succeeded)} request(s).", 'success')
+    for r in results:
+        if not r['ok']:
+            flash(f"Request #{r['request_id']}: {r['message']}", 'danger')
+    if not results:
+        flash('No requests selected.', 'warning')
     return redirect(url_for('admin.requests_list'))
 
+@admin_bp.route('/requests/bulk-vote', methods=['POST'])
+@login_required
+def bulk_vote():
+    if current_user.role not in ['admin', 'super_admin']:
+        if request.is_json:
+            return jsonify({'error': 'Unauthorized access.'}), 403
+        flash('Unauthorized access.', 'danger')
+        return redirect(url_for('admin.dashboard'))
+
+    results = CouncilService.cast_votes(current_user, _bulk_items('vote'))
+    db.session.commit()
+    return _bulk_response(results, 'Voted on')
+
+@admin_bp.route('/requests/bulk-finalize', methods=['POST'])
+@login_required
+def bulk_finalize():
+    if current_user.role != 'super_admin':
+        if request.is_json:
+            return jsonify({'error': 'Only the Captain can finalize approvals.'}), 403
+        flash('Only the Captain can finalize approvals.', 'danger')
+        return redirect(url_for('admin.requests_list'))
+
+    results = CouncilService.finalize(current_user, _bulk_items('action'))
+    db.session.commit()
+    return _bulk_response(results, 'Finalized')
+
 @admin_bp.route('/export/csv')
 @login_required
 def export_csv():
@@ -282,17 +281,9 @@ def export_csv():
         data.seek(0)
         data.truncate(0)
 
-        # Write Project Data
-        projects = Project.query.join(Request).all()
-        for p in projects:
-            w.writerow((
-                p.project_id,
-                p.request.project_title,
-                p.current_status,
-                p.given_fund,
-                p.approval_date,
-                p.request.project_site
-            ))
+        # Write Project Data (plain column rows, fetched from the database in chunks)
+        for row in read_models.project_export_rows():
+            w.writerow(tuple(row))
             yield data.getvalue()
             data.seek(0)
             data.truncate(0)
@@ -343,12 +334,13 @@ def import_csv():
                     fund_amount=amount,
                     project_site=site,
                     reason=reason,
-                    status='Pending',
                     submission_date=datetime.now()
                 )
+                lifecycle.submit(new_req)
                 db.session.add(new_req)
                 count += 1
             
+            AggregateService.invalidate('fund_totals')
             db.session.commit()
             flash(f'Successfully imported {count} requests from CSV!', 'success')
             
@@ -358,15 +350,81 @@ def import_csv():
 
     return redirect(url_for('admin.dashboard'))
 
+@admin_bp.route('/import/users', methods=['POST'])
+@login_required
+def import_users():
+    if current_user.role not in ['admin', 'super_admin']:
+        return redirect(url_for('main.index'))
+
+    file = request.files.get('file')
+    if not file or not file.filename.lower().endswith('.csv'):
+        flash('Please upload a .csv file.', 'danger')
+        return redirect(url_for('admin.dashboard'))
+
+    try:
+        # Columns: name, role, occupation, address, email
+        stream = StringIO(file.stream.read().decode("utf-8-sig"), newline=None)
+        count, errors = UserImportService.from_app(current_user).run(stream)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error importing users: {str(e)}', 'danger')
+        return redirect(url_for('admin.dashboard'))
+
+    if count:
+        flash(f'Successfully imported {count} user(s). Welcome emails with a link to set their password are on the way.', 'success')
+    for error in errors[:10]:
+        flash(f'Skipped {error}', 'warning')
+    if len(errors) > 10:
+        flash(f'...and {len(errors) - 10} more skipped line(s).', 'warning')
+
+    return redirect(url_for('admin.dashboard'))
+
 @admin_bp.route('/system-logs')
 @login_required
 def system_logs():
     if current_user.role not in ['admin', 'super_admin']:
         return redirect(url_for('main.index'))
         
-    # Fetch all logs, newest first
-    logs = SystemLog.query.order_by(SystemLog.timestamp.desc()).all()
-    return render_template('admin/audit_logs.html', logs=logs)
+    # 1. Filters. The date range defaults to the retention window (only the hot table);
+    #    picking an older start date transparently reads the archived months too.
+    default_start = datetime.now() - timedelta(days=current_app.config['LOG_RETENTION_DAYS'])
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start') else default_start
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d') + timedelta(days=1) if request.args.get('end') else None
+    except ValueError:
+        flash('Invalid date format.', 'danger')
+        start, end = default_start, None
+    action = request.args.get('action') or None
+    actor_id = request.args.get('actor', type=int)
+    target = request.args.get('target', '').strip() or None
+
+    # 2. Keyset cursor: '<timestamp>_<log_id>' of the last log on the previous page
+    before = None
+    if request.args.get('before'):
+        try:
+            timestamp, log_id = request.args['before'].rsplit('_', 1)
+            before = (datetime.fromisoformat(timestamp), int(log_id))
+        except ValueError:
+            flash('Invalid page link, showing the newest logs.', 'warning')
+
+    # 3. One page (plus one row to know if there is a next page), and the facet counts
+    archive = LogArchiveService.from_app()
+    per_page = current_app.config['AUDIT_LOGS_PER_PAGE']
+    logs = list(archive.iter_fetch(start=start, end=end, action_types=[action] if action else None,
+                                   actor_id=actor_id, target=target, before=before, limit=per_page + 1))
+    next_cursor = None
+    if len(logs) > per_page:
+        logs = logs[:per_page]
+        next_cursor = f"{logs[-1].timestamp.isoformat()}_{logs[-1].log_id}"
+    facets = archive.facets(start=start, end=end, action_type=action, actor_id=actor_id, target=target)
+
+    # Filters kept in the facet and paging links
+    filters = {key: value for key, value in request.args.items() if key != 'before' and value}
+    return render_template('admin/audit_logs.html', logs=logs, facets=facets, filters=filters,
+                           action=action, actor_id=actor_id, target=target, start=start, end=end,
+                           next_cursor=next_cursor, first_page=before is None,
+                           archived_before=archive.archived_before)
 
 @admin_bp.route('/user/<int:user_id>/delete', methods=['POST'])
 @login_required
@@ -401,7 +459,10 @@ def delete_user(user_id):
         actor_id=current_user.user_id,
         action_type='Deactivate User',
         target_change=f'Member: {user_to_delete.name}', 
-        details=f"Reason: {reason}"
+        details=f"Reason: {reason}",
+        entity_type='user',
+        entity_id=user_to_delete.user_id,
+        payload={'reason': reason}
     )
     db.session.add(log)
     db.session.commit()
@@ -444,12 +505,7 @@ def register_associate():
             filename = secure_filename(file.filename)
             import time
             unique_filename = f"{int(time.time())}_{filename}"
-            
-            # Ensure folder exists
-            upload_path = os.path.join(current_app.root_path, 'static', 'profile_pics')
-            os.makedirs(upload_path, exist_ok=True)
-            
-            file.save(os.path.join(upload_path, unique_filename))
+            get_storage().save(f"profile_pics/{unique_filename}", file.stream, file.mimetype)
             pic_filename = unique_filename
 
         # 5. CREATE USER (Hardcoded role='associate')
@@ -466,13 +522,17 @@ def register_associate():
         )
         new_user.set_password(password)
         db.session.add(new_user)
+        db.session.flush() # Assigns new_user.user_id for the log
         
         # 6. Log it
         log = SystemLog(
             actor_id=current_user.user_id,
             action_type='Register Staff',
             target_change=f'Staff: {name}',
-            details=f"Registered by {current_user.name} ({current_user.role})"
+            details=f"Registered by {current_user.name} ({current_user.role})",
+            entity_type='user',
+            entity_id=new_user.user_id,
+            payload={'role': 'associate', 'occupation': occupation}
         )
         db.session.add(log)
         db.session.commit()
@@ -493,22 +553,26 @@ def complete_project(project_id):
     # 1. Get the Project
     project = Project.query.get_or_404(project_id)
     
-    # 2. Update Status
-    if project.current_status != 'Completed':
-        project.current_status = 'Completed'
-        
+    # 2. Update Status (and its release rollup and status counts)
+    try:
+        lifecycle.transition(project, 'Completed')
+    except lifecycle.InvalidTransition:
+        flash(f'Project is already {project.current_status.lower()}.', 'info')
+    else:
         # 3. Log the Action
         log = SystemLog(
             actor_id=current_user.user_id,
             action_type='Update Project',
             target_change=f'Project ID: {project.project_id}',
-            details=f"Marked project '{project.request.project_title}' as Completed."
+            details=f"Marked project '{project.request.project_title}' as Completed.",
+            entity_type='project',
+            entity_id=project.project_id,
+            payload={'status': 'Completed'}
         )
         db.session.add(log)
+        AggregateService.invalidate('fund_totals')
         db.session.commit()
         
         flash('Project marked as Completed successfully!', 'success')
-    else:
-        flash('Project is already completed.', 'info')
 
     return redirect(url_for('admin.dashboard'))
\ No newline at end of file
@@ -1,13 +1,17 @@
-import os
 import time
 from datetime import datetime, date
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app
+from flask import Blueprint, render_template, request, flash, redirect, url_for
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from sqlalchemy import func
 
 from ..models import Project, Request, ProjectUpdate, SystemLog
 from ..database import db
+from .. import read_models
+from ..services.budget_service import BudgetService
+from ..services.rollup_service import RollupService
+from ..services.upload_service import UploadService, UploadError
+from ..storage import get_storage
 
 associate_bp = Blueprint('associate', __name__)
 
@@ -23,38 +27,8 @@ def dashboard():
     if current_user.role in ['admin', 'super_admin']:
         return redirect(url_for('admin.dashboard'))
 
-    # 1. Fetch My Requests
-    my_requests = Request.query.filter_by(requested_by_user_id=current_user.user_id).order_by(Request.submission_date.desc()).all()
-    
-    # 2. Fetch My Active Projects
-    my_projects = Project.query.join(Request).filter(Request.requested_by_user_id == current_user.user_id).all()
-
-    # 3. Calculate Funds & Deadlines
-    today = datetime.utcnow().date()
-    
-    for p in my_projects:
-        # A. Calculate Remaining Fund
-        # Sum up the 'expenses' column for this project from the updates table
-        total_expenses = db.session.query(func.sum(ProjectUpdate.expenses))\
-            .filter(ProjectUpdate.project_id == p.project_id).scalar() or 0.0
-        
-        # Attach temporary variables to the project object (for HTML use)
-        p.total_expenses = total_expenses
-        p.remaining_fund = p.given_fund - total_expenses
-        
-        # B. Check Deadline Warning
-        if p.request.end_date:
-            days_left = (p.request.end_date - today).days
-            p.days_left = days_left
-            
-            # REMOVED: p.is_overdue = days_left < 0 
-            # The 'Project' model now handles is_overdue automatically as a @property.
-            
-            # Mark as 'Urgent' if ending within 7 days and still Ongoing
-            p.is_urgent = (0 <= days_left <= 7) and (p.current_status == 'Ongoing')
-        else:
-            p.days_left = 999 # Safe fallback if no date set
-            p.is_urgent = False
+    # 1. Fetch My Requests and Active Projects (with their spending) in one query
+    my_requests, my_projects = read_models.associate_dashboard(current_user.user_id)
 
     return render_template('associate/dashboard.html', requests=my_requests, projects=my_projects)
 
@@ -82,58 +56,67 @@ def post_update(project_id, type):
         description = request.form.get('description')
         
         expenses_amount = 0.0
-        
+
+        def reject_expense():
+            remaining_balance = BudgetService.remaining(project.project_id)
+            flash(f'Expense rejected! You only have ₱{remaining_balance:,.2f} remaining.', 'danger')
+
+            # RE-RENDER TEMPLATE (Do not redirect)
+            return render_template('associate/post_update.html',
+                                   project=project,
+                                   type=type,
+                                   error_field='expenses')
+
         # --- BUDGET PROTECTION CHECK ---
         if type == 'expense':
             expenses_amount = float(request.form.get('expenses') or 0.0)
-            
-            # Calculate total previously spent
-            current_spent = db.session.query(func.sum(ProjectUpdate.expenses))\
-                .filter(ProjectUpdate.project_id == project.project_id).scalar() or 0.0
-            
-            # Calculate Remaining Balance
-            remaining_balance = project.given_fund - current_spent
-            
-            # Check if new expense exceeds balance
-            if expenses_amount > remaining_balance:
-                flash(f'Expense rejected! You only have ₱{remaining_balance:,.2f} remaining.', 'danger')
-                
-                # RE-RENDER TEMPLATE (Do not redirect)
-                return render_template('associate/post_update.html', 
-                                     project=project, 
-                                     type=type, 
-                                     error_field='expenses')
+
+            # Early answer from a plain read; the binding check is the debit in step 5
+            if expenses_amount < 0 or BudgetService.remaining(project.project_id) < expenses_amount:
+                return reject_expense()
         # -------------------------------
 
         # 4. File Upload Logic
         receipt_file_name = None
         site_file_name = None
+        final_filename = None
         
+        upload_id = request.form.get('upload_id')
         file = request.files.get('file_upload')
-        if file and allowed_file(file.filename):
+        if upload_id:
+            # Already sent in chunks to /uploads (resumable); just attach it
+            try:
+                final_filename = UploadService.from_app().claim(upload_id, current_user.user_id, type)
+            except UploadError as e:
+                flash(f'Photo upload problem: {e}', 'danger')
+                return render_template('associate/post_update.html', project=project, type=type)
+        elif file and allowed_file(file.filename):
             # Shorten/Secure filename
             ext = file.filename.rsplit('.', 1)[1].lower()
             timestamp = int(time.time())
             # Format: type_timestamp.ext (e.g., site_17000123.jpg)
             final_filename = f"{type}_{timestamp}.{ext}"
             
-            # Decide folder: 'static/project_updates/receipts' OR 'static/project_updates/site_photos'
+            # Decide folder: 'project_updates/receipts' OR 'project_updates/site_photos'
             subfolder = 'receipts' if type == 'expense' else 'site_photos'
-            upload_path = os.path.join(current_app.root_path, 'static', 'project_updates', subfolder)
-            
-            # Create folder if it doesn't exist
-            os.makedirs(upload_path, exist_ok=True)
             
             # Save file
-            file.save(os.path.join(upload_path, final_filename))
+            get_storage().save(f"project_updates/{subfolder}/{final_filename}", file.stream, file.mimetype)
 
-            # Assign to correct DB column variable
-            if type == 'expense':
-                receipt_file_name = final_filename
-            else:
-                site_file_name = final_filename
+        # Assign to correct DB column variable
+        if type == 'expense':
+            receipt_file_name = final_filename
+        else:
+            site_file_name = final_filename
 
         # 5. Save to Database
+        # The debit is one conditional UPDATE, so concurrent posts can't both spend the same
+        # remaining balance. It takes the database's write lock, so it runs only now (after
+        # the upload above, which may go to S3) and is committed together with the update.
+        if type == 'expense' and not BudgetService.debit(project.project_id, expenses_amount):
+            db.session.rollback()
+            return reject_expense()
+
         # We automatically add the type to the title for clarity in the update table
         final_title = f"[{type.upper()}] {title}"
         
@@ -150,19 +133,26 @@ def post_update(project_id, type):
         )
         
         db.session.add(update)
+        db.session.flush() # Assigns update.update_id
+        RollupService.record_expense(update)
         db.session.commit()
         
-        # 6. Log the Action (FORMATTED FOR TRANSPARENCY LOGS)
-        log_details = f"Type: {type.capitalize()} | Title: {title} | Desc: {description}"
-        if expenses_amount > 0:
-            log_details += f" | Expense: {expenses_amount}"
-
+        # 6. Log the Action (structured, so the transparency logs can show it without parsing)
         log = SystemLog(
             actor_id=current_user.user_id,
             action_type='Project Update',
             # We use the Project Title here so it shows up nicely in the logs
             target_change=f'Project: {project.request.project_title}', 
-            details=log_details
+            details=f"{type.capitalize()} update: {title}",
+            entity_type='project',
+            entity_id=project.project_id,
+            amount=expenses_amount,
+            payload={
+                'update_type': type,
+                'update_id': update.update_id,
+                'title': title,
+                'description': description,
+            }
         )
         db.session.add(log)
         db.session.commit()
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from ..models import User, SystemLog  
 from ..database import db
@@ -6,8 +6,8 @@ import string
 import secrets
 from flask_mail import Message
 from .. import mail
+from ..storage import get_storage
 import time
-import os
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -115,16 +115,13 @@ def profile_settings():
             if ext in {'png', 'jpg', 'jpeg', 'gif'}:
                 timestamp = int(time.time())
                 new_filename = f"user_{current_user.user_id}_{timestamp}.{ext}"
-                upload_folder = os.path.join(current_app.root_path, 'static', 'profile_pics')
-                os.makedirs(upload_folder, exist_ok=True)
+                storage = get_storage()
                 
                 # Delete old pic
                 if current_user.pic_path and current_user.pic_path != 'default.png':
-                    old_path = os.path.join(upload_folder, current_user.pic_path)
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
+                    storage.delete(f"profile_pics/{current_user.pic_path}")
 
-                file.save(os.path.join(upload_folder, new_filename))
+                storage.save(f"profile_pics/{new_filename}", file.stream, file.mimetype)
                 current_user.pic_path = new_filename
                 changes.append("Profile Picture")
 
@@ -141,7 +138,10 @@ def profile_settings():
                 actor_id=current_user.user_id,
                 action_type='Update User', 
                 target_change=f'Profile: {current_user.name}',
-                details=log_details
+                details=log_details,
+                entity_type='user',
+                entity_id=current_user.user_id,
+                payload={'changed': changes}
             )
             db.session.add(log)
             db.session.commit()
@@ -175,7 +175,9 @@ def forgot_password():
                 actor_id=user.user_id,
                 action_type='Password Reset',
                 target_change=f'User: {user.username}',
-                details="Password reset via 'Forgot Password'"
+                details="Password reset via 'Forgot Password'",
+                entity_type='user',
+                entity_id=user.user_id
             )
             db.session.add(log)
             db.session.commit()
@@ -200,6 +202,41 @@ def forgot_password():
 
     return render_template('auth/forgot_password.html')
 
+@auth_bp.route('/set-password/<token>', methods=['GET', 'POST'])
+def set_password(token):
+    # One-time link from the welcome email of a bulk user import
+    user = User.from_set_password_token(token, current_app.config['SET_PASSWORD_LINK_HOURS'] * 3600)
+    if user is None:
+        flash('This link has expired or was already used. Use Forgot Password to get into your account.', 'danger')
+        return redirect(url_for('auth.login'))
+
+    if request.method == 'POST':
+        new_password = request.form.get('new_password')
+        confirm_password = request.form.get('confirm_password')
+
+        if not new_password or new_password != confirm_password:
+            flash('Passwords do not match.', 'danger')
+            return render_template('auth/set_password.html', user=user)
+
+        user.set_password(new_password)  # Also makes the link unusable
+
+        log = SystemLog(
+            actor_id=user.user_id,
+            action_type='Update User',
+            target_change=f'Profile: {user.name}',
+            details="Set password via the welcome email link",
+            entity_type='user',
+            entity_id=user.user_id,
+            payload={'changed': ['Password']}
+        )
+        db.session.add(log)
+        db.session.commit()
+
+        flash('Password set. You can now log in.', 'success')
+        return redirect(url_for('auth.login'))
+
+    return render_template('auth/set_password.html', user=user)
+
 @auth_bp.route('/logout')
 @login_required
 def logout():
@@ -208,7 +245,9 @@ def logout():
         actor_id=current_user.user_id,
         action_type='Logout',
         target_change=f'User: {current_user.username}',
-        details="User logged out"
+        details="User logged out",
+        entity_type='user',
+        entity_id=current_user.user_id
     )
     db.session.add(log)
     db.session.commit()
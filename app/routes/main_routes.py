@@ -1,8 +1,15 @@
-from flask import Blueprint, render_template, redirect, url_for, request
+from flask import Blueprint, render_template, redirect, url_for, request, jsonify, current_app, abort
 from flask_login import current_user
 from ..models import SystemLog, User, Project, Request, ProjectUpdate, ProjectComment
-from ..database import db
+from ..database import db, replica_reads, stick_to_primary
+from .. import live_feed, read_models
+from ..services.log_archive_service import LogArchiveService
+from ..services.rollup_service import RollupService
+from ..utils.rate_limit import rate_limited
+from ..utils.streaming import stream_page
+from ..storage import get_storage
 from datetime import datetime
+from math import ceil
 
 main_bp = Blueprint('main', __name__)
 
@@ -20,55 +27,108 @@ def about():
     return render_template('main/about.html')
 
 @main_bp.route('/public-logs')
+@replica_reads
 def public_logs():
+    # Recent logs come from the hot table; '?history=all' also reads the archived months
+    archive = LogArchiveService.from_app()
+    show_history = request.args.get('history') == 'all'
+    start = None if show_history else archive.archived_before
+
     # 1. Staff Updates (User management)
-    user_actions = ['Create User', 'Delete User', 'Deactivate User', 'Update User', 'Register', 'Register Staff']
-    staff_logs = SystemLog.query.filter(SystemLog.action_type.in_(user_actions))\
-                                .order_by(SystemLog.timestamp.desc()).all()
+    staff_logs = archive.iter_fetch(start=start, action_types=SystemLog.PUBLIC_ACTIONS['staff'])
 
     # 2. Fund & Request Updates
-    # Added 'Council Vote' so your votes appear in the public log
-    fund_actions = ['Create Request', 'Vote Cast', 'Council Vote', 'Approve Request', 'Reject Request', 'Finalize Request']
-    fund_logs = SystemLog.query.filter(SystemLog.action_type.in_(fund_actions))\
-                               .order_by(SystemLog.timestamp.desc()).all()
+    fund_logs = archive.iter_fetch(start=start, action_types=SystemLog.PUBLIC_ACTIONS['fund'])
 
     # 3. Project Updates (Site & Expenses)
-    # Checking for both 'Update Project' and 'Project Update' to be safe
-    project_actions = ['Update Project', 'Project Update']
-    project_logs = SystemLog.query.filter(SystemLog.action_type.in_(project_actions))\
-                                  .order_by(SystemLog.timestamp.desc()).all()
+    project_logs = archive.iter_fetch(start=start, action_types=SystemLog.PUBLIC_ACTIONS['project'])
 
-    return render_template('main/public_logs.html', 
-                           staff_logs=staff_logs, 
-                           fund_logs=fund_logs, 
-                           project_logs=project_logs)
+    # The live feed picks up from the newest log on the page
+    latest_log_id = live_feed.latest_log_id()
 
-@main_bp.route('/public-records')
-def public_records():
-    # 1. NEW: Fetch the Captain (Super Admin)
-    captain = User.query.filter_by(role='super_admin').first()
+    # Summed straight from the structured 'amount' column of the logs
+    total_expenses = SystemLog.expense_total()
 
-    # 2. Fetch Members (Existing logic - exclude super_admin)
-    members = User.query.filter(User.role != 'super_admin').all()
-    
-    # 3. Fetch Projects (Existing logic - usually just Ongoing/Completed)
-    projects = Project.query.join(Request).order_by(Project.approval_date.desc()).all()
+    # Streamed: the log lists above are generators, read in batches while the page is sent
+    return stream_page('main/public_logs.html',
+                       staff_logs=staff_logs, 
+                       fund_logs=fund_logs, 
+                       project_logs=project_logs,
+                       total_expenses=total_expenses,
+                       archived_before=archive.archived_before,
+                       show_history=show_history,
+                       latest_log_id=latest_log_id)
 
-    # 4. NEW: Fetch ALL Requests (Pending, Approved, Rejected)
-    # We order by submission date so the newest are first
-    all_requests = Request.query.order_by(Request.submission_date.desc()).all()
+@main_bp.route('/public-logs/stream')
+def public_logs_stream():
+    # Server-Sent Events: new public logs as they are committed. The browser
+    # resumes with Last-Event-ID after a reconnect, so nothing is missed.
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('after', type=int)
+    if last_id is None:
+        last_id = live_feed.latest_log_id()
+    return live_feed.event_stream(last_id)
+
+@main_bp.route('/public-records')
+@replica_reads
+def public_records():
+    # 1-4. Captain, Members, Projects and ALL Requests (with their votes), as
+    # lightweight read-only rows. The optional deadline filter
+    # (?deadline=overdue or ?deadline=urgent) runs in SQL.
+    deadline = request.args.get('deadline')
+    captain, members, projects, all_requests = read_models.public_records(deadline)
 
     # 5. Calculate Total Funds Released (Sum of given_fund for all projects)
     total_released = db.session.query(db.func.sum(Project.given_fund)).scalar() or 0.0
 
-    return render_template('main/public_records.html', 
-                           captain=captain,   # <--- Passed here
-                           members=members, 
-                           projects=projects,
-                           all_requests=all_requests,
-                           total_released=total_released)
+    # Streamed: projects and requests are generators, read in batches while the page is sent
+    return stream_page('main/public_records.html',
+                       captain=captain,   # <--- Passed here
+                       members=members, 
+                       projects=projects,
+                       all_requests=all_requests,
+                       total_released=total_released,
+                       deadline=deadline)
+
+def financial_trends_data():
+    """Chart data read from the rollup tables (cost depends on the number of months only)."""
+    period = request.args.get('period', 'month')
+    if period not in ('day', 'month'):
+        period = 'month'
+    project_id = request.args.get('project_id', type=int)
+
+    spend = RollupService.spend_series(period=period, project_id=project_id)
+    releases = RollupService.release_series()
+    return {
+        'period': period,
+        'project_id': project_id,
+        'spend': [{'period': start.isoformat(), 'total': total} for start, total in spend],
+        'released': {
+            status: [{'month': month.isoformat(), 'total': total} for month, total in rows]
+            for status, rows in releases.items()
+        },
+    }
+
+@main_bp.route('/financial-trends')
+@replica_reads
+def financial_trends():
+    return render_template('main/financial_trends.html', data=financial_trends_data())
+
+@main_bp.route('/api/financial-trends')
+@replica_reads
+def financial_trends_api():
+    return jsonify(financial_trends_data())
+
+@main_bp.route('/media/<path:key>')
+def media(key):
+    if not key.startswith(('profile_pics/', 'project_updates/')):
+        abort(404)
+    # Stable link to an uploaded file: only redirects, the bytes come from the storage itself
+    return redirect(get_storage().url(key))
 
 @main_bp.route('/project/<int:project_id>/history')
+@replica_reads
 def project_history(project_id):
     # Fetch project or return 404 if not found
     project = Project.query.get_or_404(project_id)
@@ -76,10 +136,18 @@ def project_history(project_id):
     # Fetch all updates for this project, sorted by newest first
     updates = ProjectUpdate.query.filter_by(project_id=project_id)\
                                  .order_by(ProjectUpdate.date_posted.desc()).all()
-    
-    return render_template('main/project_history.html', project=project, updates=updates)
+
+    # One page of comments (newest first); the total comes from the cached counter
+    per_page = current_app.config['COMMENTS_PER_PAGE']
+    pages = max(1, ceil(project.comment_count / per_page))
+    page = min(max(request.args.get('page', 1, type=int), 1), pages)
+    comments = project.comments.limit(per_page).offset((page - 1) * per_page).all()
+
+    return render_template('main/project_history.html', project=project, updates=updates,
+                           comments=comments, page=page, pages=pages)
 
 @main_bp.route('/project/<int:project_id>/comment', methods=['POST'])
+@rate_limited('COMMENT_RATE_LIMIT')
 def post_comment(project_id):
     project = Project.query.get_or_404(project_id)
     content = request.form.get('content')
@@ -93,7 +161,12 @@ def post_comment(project_id):
             timestamp=datetime.now()
         )
         db.session.add(comment)
+
+        # Bump the cached count in the same commit (SQL-side, so concurrent posts don't lose updates)
+        Project.query.filter_by(project_id=project.project_id)\
+            .update({Project.comment_count: Project.comment_count + 1}, synchronize_session=False)
         db.session.commit()
+        stick_to_primary()  # The page we redirect to must show the new comment
         
         # Optional: Log this action as "Anonymous Comment"
         # We assign it to system (or null actor if allowed, but strict FK requires actor).
@@ -3,6 +3,8 @@ from flask_login import login_required, current_user
 from datetime import datetime
 from ..models import Request, SystemLog  # <--- Ensure SystemLog is imported
 from ..database import db
+from .. import lifecycle
+from ..services.aggregate_service import AggregateService
 
 request_bp = Blueprint('request', __name__)
 
@@ -54,11 +56,12 @@ def create_request():
             project_partners=partners, # <--- THIS FIXES THE ERROR
             start_date=start_date_obj,
             end_date=end_date_obj,
-            status='Pending',
             submission_date=datetime.utcnow()
         )
         
+        lifecycle.submit(new_request)  # Starts as 'Pending'
         db.session.add(new_request)
+        AggregateService.invalidate('fund_totals') # Pending count changed
         db.session.commit()
 
         # 5. LOGGING
@@ -66,7 +69,11 @@ def create_request():
             actor_id=current_user.user_id,
             action_type='Create Request', 
             target_change=f'Request: {title}',
-            details=f"Amount: ₱{amount_float:,.2f} | Site: {site}"
+            details=f"Amount: ₱{amount_float:,.2f} | Site: {site}",
+            entity_type='request',
+            entity_id=new_request.request_id,
+            amount=amount_float,
+            payload={'site': site}
         )
         db.session.add(log)
         db.session.commit()
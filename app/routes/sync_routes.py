@@ -0,0 +1,24 @@
+"""
+Delta sync for the offline field clients (see SyncService):
+
+    GET /sync?since=<seq>    rows changed after <seq>, and the new seq to store
+"""
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+
+from ..services.sync_service import SyncService
+
+sync_bp = Blueprint('sync', __name__)
+
+
+@sync_bp.route('')
+@login_required
+def changes():
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify({'error': "'since' must be 0 or a seq returned by an earlier sync."}), 400
+
+    response = jsonify(SyncService.from_app(current_user).changes(since))
+    # Per-user data: never kept by a shared cache
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
@@ -0,0 +1,113 @@
+"""
+Resumable uploads, following the tus 1.0 protocol (core + creation, checksum
+and termination extensions), so a photo sent over a weak connection resumes
+where it stopped instead of starting again:
+
+    POST   /uploads            Upload-Length, Upload-Metadata -> 201, Location
+    HEAD   /uploads/<id>       -> Upload-Offset (how much arrived)
+    PATCH  /uploads/<id>       Upload-Offset + one chunk of bytes -> new Upload-Offset
+    DELETE /uploads/<id>       cancel
+
+The finished upload's id is then sent with the project update form (upload_id).
+"""
+import base64
+
+from flask import Blueprint, request, current_app, url_for, make_response
+from flask_login import login_required, current_user
+
+from ..services.upload_service import UploadService, UploadError
+
+upload_bp = Blueprint('upload', __name__)
+
+TUS_VERSION = '1.0.0'
+
+
+def _tus_response(status=204, **headers):
+    response = make_response('', status)
+    response.headers['Tus-Resumable'] = TUS_VERSION
+    response.headers['Cache-Control'] = 'no-store'
+    for name, value in headers.items():
+        response.headers[name.replace('_', '-')] = str(value)
+    return response
+
+
+def _parse_metadata(value):
+    """'filename ZmlsZS5qcGc=,kind ZXhwZW5zZQ==' -> {'filename': 'file.jpg', 'kind': 'expense'}"""
+    metadata = {}
+    for pair in (value or '').split(','):
+        key, _, encoded = pair.strip().partition(' ')
+        if key:
+            try:
+                metadata[key] = base64.b64decode(encoded).decode('utf-8')
+            except (ValueError, UnicodeDecodeError):
+                raise UploadError(f"Upload-Metadata '{key}' is not valid base64.")
+    return metadata
+
+
+def _header_int(name):
+    value = request.headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise UploadError(f"{name} must be a number.")
+
+
+@upload_bp.before_request
+def check_version():
+    if request.method != 'OPTIONS' and request.headers.get('Tus-Resumable', TUS_VERSION) != TUS_VERSION:
+        return _tus_response(412, Tus_Version=TUS_VERSION)
+
+
+@upload_bp.errorhandler(UploadError)
+def upload_error(e):
+    response = _tus_response(e.status)
+    response.set_data(str(e))
+    response.mimetype = 'text/plain'
+    return response
+
+
+@upload_bp.route('', methods=['OPTIONS'])
+def capabilities():
+    return _tus_response(204, Tus_Version=TUS_VERSION,
+                         Tus_Extension='creation,checksum,termination',
+                         Tus_Max_Size=current_app.config['UPLOAD_MAX_SIZE'],
+                         Tus_Checksum_Algorithm=','.join(UploadService.CHUNK_ALGORITHMS))
+
+
+@upload_bp.route('', methods=['POST'])
+@login_required
+def create_upload():
+    upload = UploadService.from_app().create(current_user.user_id, _header_int('Upload-Length'),
+                                             _parse_metadata(request.headers.get('Upload-Metadata')))
+    return _tus_response(201, Location=url_for('upload.upload_status', upload_id=upload['upload_id']),
+                         Upload_Offset=0)
+
+
+@upload_bp.route('/<upload_id>', methods=['HEAD'])
+@login_required
+def upload_status(upload_id):
+    upload = UploadService.from_app().get(upload_id, current_user.user_id)
+    return _tus_response(200, Upload_Offset=upload['offset'], Upload_Length=upload['length'])
+
+
+@upload_bp.route('/<upload_id>', methods=['PATCH'])
+@login_required
+def upload_chunk(upload_id):
+    if request.mimetype != 'application/offset+octet-stream':
+        raise UploadError("Content-Type must be application/offset+octet-stream.", 415)
+
+    service = UploadService.from_app()
+    upload = service.get(upload_id, current_user.user_id)
+    # The body is read straight from the socket into the file: no form parsing, no buffering
+    upload = service.append(upload, _header_int('Upload-Offset'), request.stream,
+                           request.content_length, request.headers.get('Upload-Checksum'))
+    return _tus_response(204, Upload_Offset=upload['offset'])
+
+
+@upload_bp.route('/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_upload(upload_id):
+    UploadService.from_app().delete(upload_id, current_user.user_id)
+    return _tus_response(204)
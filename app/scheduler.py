@@ -0,0 +1,162 @@
+"""
+Small cron-style job runner.
+
+Jobs are plain functions registered with @job('name'). Each one returns a
+short message that is saved to the 'job_runs' table together with its status,
+so every background run leaves an audit trail.
+
+Schedules come from app.config['SCHEDULER_JOBS'] ({'job_name': '<cron>'}) and
+can be overridden by an 'instance/jobs.cron' file with crontab-like lines:
+
+    # minute hour day-of-month month day-of-week  job_name
+    0 1 * * *  overdue_sweep
+"""
+import os
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from .database import db
+
+# name -> function
+JOBS = {}
+
+
+def job(name):
+    """Decorator that registers a function as a schedulable job."""
+    def decorator(f):
+        JOBS[name] = f
+        return f
+    return decorator
+
+
+class CronSchedule:
+    """A parsed 5-field cron expression (minute hour day month weekday)."""
+
+    # (lowest, highest) allowed value for every field (weekday 7 is also Sunday)
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        ]
+        # Cron rule: if both day fields are restricted, either one may match
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step = part.split('/')
+                step = int(step)
+
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = map(int, part.split('-'))
+            else:
+                start = end = int(part)
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field '{field}' is out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, moment):
+        """True if the job should run during the given minute."""
+        weekday = (moment.weekday() + 1) % 7  # cron counts Sunday as 0
+        day_ok = moment.day in self.days
+        weekday_ok = weekday in self.weekdays or (weekday == 0 and 7 in self.weekdays)
+
+        if self.any_day or self.any_weekday:
+            day_match = day_ok and weekday_ok
+        else:
+            day_match = day_ok or weekday_ok
+
+        return (moment.minute in self.minutes and moment.hour in self.hours
+                and moment.month in self.months and day_match)
+
+
+def load_schedule(app):
+    """Returns {job_name: CronSchedule} from the config and 'instance/jobs.cron'."""
+    entries = dict(app.config.get('SCHEDULER_JOBS', {}))
+
+    cron_file = os.path.join(app.instance_path, 'jobs.cron')
+    if os.path.exists(cron_file):
+        with open(cron_file, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                *fields, name = line.split()
+                entries[name] = ' '.join(fields)
+
+    schedule = {}
+    for name, expression in entries.items():
+        if name not in JOBS:
+            raise ValueError(f"Unknown job in schedule: '{name}'")
+        schedule[name] = CronSchedule(expression)
+    return schedule
+
+
+def run_job(name):
+    """Runs one job now and records the run. Returns the JobRun row."""
+    from .models import JobRun
+
+    run = JobRun(job_name=name, status='Running', started_at=datetime.now())
+    db.session.add(run)
+    db.session.commit()
+
+    try:
+        message = JOBS[name]()
+        run.status = 'Success'
+        run.message = (message or '')[:255]
+    except Exception as e:
+        db.session.rollback()
+        traceback.print_exc()
+        run.status = 'Failed'
+        run.message = f"{type(e).__name__}: {e}"[:255]
+
+    run.finished_at = datetime.now()
+    db.session.commit()
+    return run
+
+
+def run_pending(app, moment):
+    """Runs every job whose schedule matches the given minute."""
+    runs = []
+    for name, schedule in load_schedule(app).items():
+        if schedule.matches(moment):
+            runs.append(run_job(name))
+    return runs
+
+
+def run_forever(app):
+    """
+    Standalone scheduler loop: wakes up once a minute and runs due jobs, for the
+    main database and then for each tenant (only TENANT's, if that is set).
+    """
+    from .tenancy import tenant_context
+
+    tenants = [app.config['TENANT']] if app.config.get('TENANT') else [None, *app.config['TENANTS']]
+    print(f"⏰ Scheduler started with jobs: {', '.join(sorted(load_schedule(app)))}")
+    while True:
+        now = datetime.now().replace(second=0, microsecond=0)
+        for tenant in tenants:
+            with tenant_context(app, tenant):
+                for run in run_pending(app, now):
+                    print(f"[{now:%Y-%m-%d %H:%M}]{f' {tenant}:' if tenant else ''} "
+                          f"{run.job_name}: {run.status} - {run.message}")
+                db.session.remove()
+
+        # Sleep until the start of the next minute
+        next_minute = now + timedelta(minutes=1)
+        time.sleep(max(0, (next_minute - datetime.now()).total_seconds()))
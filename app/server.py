@@ -0,0 +1,88 @@
+"""
+Production server for 'flask serve' (see app/commands.py).
+
+Wraps gunicorn's pre-fork model: one master process loads the app, then forks
+worker processes (optionally each with a pool of threads). gunicorn is an
+optional dependency (Linux/macOS only); the dev server in run.py needs nothing.
+
+Signals understood by the master (send them to the PID in --pid):
+    HUP     graceful reload: start fresh workers, let old ones finish their requests
+    TERM    graceful shutdown
+    TTIN / TTOU   add / remove one worker
+"""
+import gc
+import os
+
+
+def default_options(app):
+    """Server settings from app.config (each may be overridden on the command line)."""
+    cfg = app.config
+    return {
+        'bind': cfg['SERVER_BIND'],
+        'workers': cfg['SERVER_WORKERS'],
+        'threads': cfg['SERVER_THREADS'],
+        'max_requests': cfg['SERVER_MAX_REQUESTS'],
+        'max_requests_jitter': cfg['SERVER_MAX_REQUESTS_JITTER'],
+        'timeout': cfg['SERVER_TIMEOUT'],
+        'graceful_timeout': cfg['SERVER_GRACEFUL_TIMEOUT'],
+        'keepalive': cfg['SERVER_KEEPALIVE'],
+        'preload_app': cfg['SERVER_PRELOAD'],
+    }
+
+
+def serve(app, **overrides):
+    """Runs 'app' under gunicorn until the master is stopped."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise RuntimeError("gunicorn is not installed. Run: pip install gunicorn "
+                           "(not available on Windows; use 'python run.py' there).")
+
+    options = default_options(app)
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    # More than one thread per worker needs the threaded worker class
+    options['worker_class'] = 'gthread' if options['threads'] > 1 else 'sync'
+    options.setdefault('accesslog', '-')
+    options.setdefault('errorlog', '-')
+
+    def post_fork(server, worker):
+        # The preloaded app already holds pooled DB connections opened in the
+        # master (create_all() at startup). A socket must never be shared between
+        # processes, so each worker drops the inherited ones (without closing them
+        # for the master) and opens its own on first use.
+        from .database import db
+
+        with app.app_context():
+            for engine in db.engines.values():  # Main database, replica and tenants
+                engine.dispose(close=False)
+
+    if options['preload_app']:
+        options['post_fork'] = post_fork
+
+    class FlaskApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            if self.cfg.preload_app:
+                # Called ONCE in the master before forking: the workers share the
+                # loaded code, templates and config copy-on-write. Moving everything
+                # loaded so far out of the garbage collector's reach stops its scans
+                # from touching (and so copying) those shared pages in every worker.
+                # Every template is loaded first, so no worker compiles one again.
+                from . import template_cache
+                template_cache.warm(app)
+                gc.collect()
+                gc.freeze()
+                return app
+            # Called in each worker: a private app (and engine) per process
+            from . import create_app
+            return create_app()
+
+    FlaskApplication().run()
+
+
+def cpu_default_workers():
+    """gunicorn's usual starting point: (2 x CPUs) + 1."""
+    return (os.cpu_count() or 1) * 2 + 1
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from ..models import CachedAggregate, ReleaseRollup
+from ..database import db
+from .. import lifecycle
+
+class AggregateService:
+    """
+    Stores expensive dashboard numbers in the 'cached_aggregates' table.
+    The scheduler rebuilds them in the background; pages only read them.
+    """
+
+    # How long a cached value may be served; past it, pages compute the value live (without saving it)
+    MAX_AGE = timedelta(minutes=10)
+
+    @staticmethod
+    def compute_fund_totals():
+        """Totals shown on the admin dashboard."""
+        # Counts come from the lifecycle counters and funds from the release rollup,
+        # so this no longer loads every project
+        projects = lifecycle.counts('project')
+        funds = dict(db.session.query(ReleaseRollup.status, db.func.sum(ReleaseRollup.total))
+                     .group_by(ReleaseRollup.status))
+        ongoing_funds = funds.get('Ongoing') or 0
+        completed_funds = funds.get('Completed') or 0
+
+        return {
+            'total_projects': sum(projects.values()),
+            'pending_requests': lifecycle.count('request', 'Pending'),
+            'approved_projects': projects['Ongoing'] + projects['Completed'],
+            'ongoing_funds': ongoing_funds,
+            'completed_funds': completed_funds,
+            'total_funds': ongoing_funds + completed_funds,
+        }
+
+    # Every aggregate the scheduler knows how to rebuild
+    BUILDERS = {
+        'fund_totals': compute_fund_totals,
+    }
+
+    @classmethod
+    def refresh(cls, key):
+        """Recomputes one aggregate and saves it. Returns the new value."""
+        value = cls.BUILDERS[key]()
+        row = db.session.get(CachedAggregate, key)
+        if row:
+            row.value = value
+            row.computed_at = datetime.now()
+        else:
+            db.session.add(CachedAggregate(key=key, value=value, computed_at=datetime.now()))
+        db.session.commit()
+        return value
+
+    @classmethod
+    def get(cls, key):
+        """
+        Returns the cached value. If it is missing or stale (the job has not run),
+        the value is computed for this request only: saving it would commit the
+        page's whole session in the middle of a GET. Only refresh() writes.
+        """
+        row = db.session.get(CachedAggregate, key)
+        if row and datetime.now() - row.computed_at < cls.MAX_AGE:
+            return row.value
+        return cls.BUILDERS[key]()
+
+    @staticmethod
+    def invalidate(key):
+        """Drops a cached value (call this in the same transaction as the change)."""
+        CachedAggregate.query.filter_by(key=key).delete()
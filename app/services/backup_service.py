@@ -0,0 +1,256 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from ..database import db
+from ..tenancy import tenant_config
+
+
+class BackupError(Exception):
+    """A backup that could not be made, or that failed verification."""
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+class BackupService:
+    """
+    Online snapshots of the SQLite database, taken while the site keeps running.
+
+    The copy is made with SQLite's backup API, 'pages_per_step' pages at a time:
+        WAL database (SQLITE_WAL)   the whole copy reads one snapshot while writers
+                                    carry on, never blocked ('wal-snapshot')
+        rollback journal            the source is only locked during a step and the
+                                    copier pauses 'step_sleep' seconds after each, so a
+                                    writer waits at most one step ('paged'). A write
+                                    makes SQLite start the copy over; after
+                                    'max_restarts' of those the rest is copied in one
+                                    step ('single-step').
+    The manifest records the mode and the longest step.
+
+    Layout under the backup folder (default: instance/backups, a tenant's under its own folder):
+        transparansee-20261019-020000.db.gz     the compressed database
+        transparansee-20261019-020000.json      manifest: sha256, sizes, timings, row counts
+    The newest 'keep' snapshots are kept.
+    """
+
+    PREFIX = 'transparansee-'
+    CHUNK = 1024 * 1024
+
+    def __init__(self, backup_folder, keep, pages_per_step, step_sleep, max_restarts):
+        self.backup_folder = backup_folder
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+        os.makedirs(backup_folder, exist_ok=True)
+
+    @classmethod
+    def from_app(cls, app=None):
+        app = app or current_app
+        return cls(tenant_config(app)['BACKUP_DIR'], app.config['BACKUP_KEEP'], app.config['BACKUP_PAGES_PER_STEP'],
+                   app.config['BACKUP_STEP_SLEEP'], app.config['BACKUP_MAX_RESTARTS'])
+
+    # --- FILES ---
+
+    def _path(self, name, suffix):
+        return os.path.join(self.backup_folder, name + suffix)
+
+    def names(self):
+        """Backup names, newest first."""
+        names = [f[:-len('.json')] for f in os.listdir(self.backup_folder)
+                 if f.startswith(self.PREFIX) and f.endswith('.json')]
+        return sorted(names, reverse=True)
+
+    def manifest(self, name):
+        try:
+            with open(self._path(name, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise BackupError(f"No backup named '{name}'.")
+
+    @staticmethod
+    def _table_counts(connection):
+        tables = [name for name, in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        return {table: connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+
+    # --- BACKUP ---
+
+    def _copy(self, source, target):
+        """Paged online copy of 'source' into 'target' (sqlite3 connections). Returns the timings."""
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        stats = {'mode': 'wal-snapshot' if wal else 'paged', 'steps': 0, 'restarts': 0, 'longest_step_ms': 0.0}
+        state = {'remaining': None, 'step_started': time.monotonic()}
+
+        def progress(status, remaining, total):
+            step_ms = (time.monotonic() - state['step_started']) * 1000
+            stats['steps'] += 1
+            stats['longest_step_ms'] = max(stats['longest_step_ms'], step_ms)
+            stats['pages'] = total
+            if state['remaining'] is not None and remaining > state['remaining']:
+                # Someone wrote to the database: SQLite started the copy over
+                stats['restarts'] += 1
+                if stats['restarts'] > self.max_restarts:
+                    raise _TooManyRestarts()
+            state['remaining'] = remaining
+            if remaining and not wal:
+                time.sleep(self.step_sleep)  # Lock released: let waiting writers in
+            state['step_started'] = time.monotonic()
+
+        if wal:
+            # One read transaction for the whole copy: a consistent snapshot, and no restarts
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        try:
+            source.backup(target, pages=self.pages_per_step, progress=progress)
+        except _TooManyRestarts:
+            # Busy database: finish with one step (writers wait for this one copy)
+            started = time.monotonic()
+            source.backup(target)
+            stats.update(mode='single-step', steps=stats['steps'] + 1,
+                         longest_step_ms=max(stats['longest_step_ms'], (time.monotonic() - started) * 1000))
+        finally:
+            if wal:
+                source.rollback()
+        return stats
+
+    def create(self):
+        """Takes a snapshot, compresses it and rotates old ones. Returns its manifest."""
+        engine = db.session.get_bind()  # The current tenant's database, if any
+        if engine.dialect.name != 'sqlite':
+            raise BackupError("Online backups are made for SQLite; back a server database up with its "
+                              "own tools (e.g. pg_dump, or the provider's snapshots).")
+
+        name = f"{self.PREFIX}{datetime.now():%Y%m%d-%H%M%S}"
+        started = time.monotonic()
+        fd, copy_path = tempfile.mkstemp(dir=self.backup_folder, suffix='.db.tmp')
+        os.close(fd)
+        try:
+            # 1. Page-by-page copy of the live database
+            source = engine.raw_connection()
+            target = sqlite3.connect(copy_path)
+            try:
+                stats = self._copy(source.driver_connection, target)
+                check = target.execute("PRAGMA quick_check").fetchone()[0]
+                if check != 'ok':
+                    raise BackupError(f"The copy failed its integrity check: {check}")
+                tables = self._table_counts(target)
+            finally:
+                target.close()
+                source.close()
+            copied = time.monotonic()
+
+            # 2. Compress (checksum computed on the file as stored)
+            digest = hashlib.sha256()
+            gz_path = self._path(name, '.db.gz')
+            with open(copy_path, 'rb') as raw, open(gz_path + '.tmp', 'wb') as out:
+                with gzip.GzipFile(filename=name + '.db', mode='wb', fileobj=_HashingWriter(out, digest)) as gz:
+                    shutil.copyfileobj(raw, gz, self.CHUNK)
+            os.replace(gz_path + '.tmp', gz_path)
+
+            manifest = {
+                'name': name,
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'sha256': digest.hexdigest(),
+                'size': os.path.getsize(gz_path),
+                'database_size': os.path.getsize(copy_path),
+                'copy_seconds': round(copied - started, 3),
+                'total_seconds': round(time.monotonic() - started, 3),
+                **stats,
+                'tables': tables,
+            }
+            # Written last: a backup without a manifest is unfinished and never listed
+            with open(self._path(name, '.json'), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+        finally:
+            if os.path.exists(copy_path):
+                os.remove(copy_path)
+
+        self.rotate()
+        return manifest
+
+    def rotate(self):
+        """Deletes all but the newest 'keep' backups. Returns the names removed."""
+        removed = self.names()[self.keep:]
+        for name in removed:
+            for suffix in ('.db.gz', '.json'):
+                if os.path.exists(self._path(name, suffix)):
+                    os.remove(self._path(name, suffix))
+        return removed
+
+    # --- RESTORE CHECK ---
+
+    def verify(self, name=None, output=None):
+        """
+        Proves a backup can be restored: checksum, decompression, SQLite integrity
+        check and the row count of every table. The restored database is kept at
+        'output' if given (never over the live one). Returns the manifest.
+        """
+        if name is None:
+            names = self.names()
+            if not names:
+                raise BackupError("There are no backups yet.")
+            name = names[0]
+        manifest = self.manifest(name)
+        gz_path = self._path(name, '.db.gz')
+        if output and os.path.abspath(output) == os.path.abspath(db.session.get_bind().url.database or ''):
+            raise BackupError("Refusing to restore over the live database.")
+
+        # 1. Checksum of the stored file
+        digest = hashlib.sha256()
+        with open(gz_path, 'rb') as f:
+            for block in iter(lambda: f.read(self.CHUNK), b''):
+                digest.update(block)
+        if digest.hexdigest() != manifest['sha256']:
+            raise BackupError(f"{name}: checksum mismatch, the file is corrupted.")
+
+        # 2. Restore to a scratch file and open it
+        fd, restored = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            with gzip.open(gz_path, 'rb') as gz, open(restored, 'wb') as out:
+                shutil.copyfileobj(gz, out, self.CHUNK)
+            connection = sqlite3.connect(restored)
+            try:
+                check = connection.execute("PRAGMA integrity_check").fetchone()[0]
+                tables = self._table_counts(connection)
+            finally:
+                connection.close()
+            if check != 'ok':
+                raise BackupError(f"{name}: integrity check failed: {check}")
+            if tables != manifest['tables']:
+                different = sorted(t for t in set(tables) | set(manifest['tables'])
+                                   if tables.get(t) != manifest['tables'].get(t))
+                raise BackupError(f"{name}: row counts differ from the manifest in {', '.join(different)}.")
+            if output:
+                shutil.move(restored, output)
+        finally:
+            if os.path.exists(restored):
+                os.remove(restored)
+        return manifest
+
+
+class _HashingWriter:
+    """File wrapper that feeds everything written through it into a hash."""
+
+    def __init__(self, f, digest):
+        self.f = f
+        self.digest = digest
+
+    def write(self, data):
+        self.digest.update(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
@@ -0,0 +1,74 @@
+from sqlalchemy import func, update
+
+from ..models import Project, ProjectUpdate
+from ..database import db
+
+class BudgetService:
+    """
+    Keeps 'projects.remaining_fund' (the budget ledger) in step with the
+    expenses posted in 'project_updates'.
+
+    Expenses are debited with ONE conditional UPDATE, so two associates posting
+    at the same time can never overspend a project, and the check costs the
+    same no matter how many updates the project already has.
+    """
+
+    BATCH_SIZE = 500
+
+    # Differences smaller than this are float noise, not a broken ledger
+    TOLERANCE = 0.005
+
+    @staticmethod
+    def debit(project_id, amount):
+        """
+        Takes 'amount' from the project's remaining fund if (and only if) enough
+        is left. Returns True on success. Must be committed together with the
+        ProjectUpdate that records the expense.
+        """
+        debited = Project.query\
+            .filter(Project.project_id == project_id, Project.remaining_fund >= amount)\
+            .update({Project.remaining_fund: Project.remaining_fund - amount}, synchronize_session=False)
+        return debited == 1
+
+    @staticmethod
+    def remaining(project_id):
+        return db.session.query(Project.remaining_fund).filter_by(project_id=project_id).scalar()
+
+    # --- RECONCILIATION (safety net) ---
+
+    @classmethod
+    def reconcile(cls):
+        """
+        Recomputes every ledger from the updates table, BATCH_SIZE projects at a
+        time, and corrects the ones that drifted. Returns (checked, corrected ids).
+
+        Each batch is checked and corrected by ONE UPDATE, so a debit committed
+        meanwhile is counted instead of overwritten, and only the batch's own
+        updates are summed.
+        """
+        checked, corrected = 0, []
+        last_id = 0
+
+        while True:
+            ids = [project_id for project_id, in db.session.query(Project.project_id)
+                   .filter(Project.project_id > last_id)
+                   .order_by(Project.project_id).limit(cls.BATCH_SIZE)]
+            if not ids:
+                break
+
+            spent = db.session.query(func.coalesce(func.sum(ProjectUpdate.expenses), 0.0))\
+                .filter(ProjectUpdate.project_id == Project.project_id)\
+                .scalar_subquery()
+            expected = Project.given_fund - spent
+            corrected.extend(project_id for project_id, in db.session.execute(
+                update(Project)
+                .where(Project.project_id.in_(ids),
+                       func.abs(Project.remaining_fund - expected) > cls.TOLERANCE)
+                .values(remaining_fund=expected)
+                .returning(Project.project_id)))
+
+            db.session.commit()
+            checked += len(ids)
+            last_id = ids[-1]
+
+        return checked, corrected
@@ -0,0 +1,176 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from ..models import Project, Request, SystemLog, AdminVote
+from ..database import db, insert_for
+from .. import lifecycle
+from .aggregate_service import AggregateService
+from .rollup_service import RollupService
+
+class CouncilService:
+    """
+    Council votes and the Captain's final decisions, for one request or many.
+
+    Everything for a batch is written with a handful of statements (one vote
+    upsert, one status UPDATE per decision, one Project insert, one log insert)
+    in the caller's transaction. Each method returns one result per item:
+
+        {'request_id': 5, 'ok': True, 'message': 'Vote cast.'}
+    """
+
+    VOTES = ('Approve', 'Reject')
+
+    @staticmethod
+    def _result(request_id, ok, message, **extra):
+        return {'request_id': request_id, 'ok': ok, 'message': message, **extra}
+
+    @staticmethod
+    def _in_order(items, results):
+        """Results in the same order as the items they answer."""
+        return [results[id(item)] for item in items]
+
+    @classmethod
+    def _pending_requests(cls, items, choice_field, results):
+        """
+        Loads the requests named in 'items' with one query. Items that are unknown,
+        no longer pending, repeated or have an invalid choice get a failed result
+        in 'results' (keyed by item). Returns [(item, request)] for the valid ones.
+        """
+        ids = {item['request_id'] for item in items}
+        requests = {r.request_id: r for r in Request.query.filter(Request.request_id.in_(ids))} if ids else {}
+
+        valid, seen = [], set()
+        for item in items:
+            request_id = item['request_id']
+            req = requests.get(request_id)
+            if item.get(choice_field) not in cls.VOTES:
+                results[id(item)] = cls._result(request_id, False, f"Invalid {choice_field}.")
+            elif req is None:
+                results[id(item)] = cls._result(request_id, False, 'Request not found.')
+            elif req.status != 'Pending':
+                results[id(item)] = cls._result(request_id, False, f'Request is already {req.status}.')
+            elif request_id in seen:
+                results[id(item)] = cls._result(request_id, False, 'Listed more than once.')
+            else:
+                seen.add(request_id)
+                valid.append((item, req))
+        return valid
+
+    # --- COUNCIL VOTES ---
+
+    @classmethod
+    def cast_votes(cls, admin, items):
+        """
+        items: [{'request_id': 5, 'vote': 'Approve', 'remarks': '...'}, ...]
+        New votes are inserted and existing ones updated with ONE upsert.
+        """
+        results = {}
+        valid = cls._pending_requests(items, 'vote', results)
+        if not valid:
+            return cls._in_order(items, results)
+
+        # Which of these did this admin already vote on? (only for the messages)
+        already_voted = {request_id for request_id, in db.session.query(AdminVote.request_id).filter(
+            AdminVote.admin_id == admin.user_id,
+            AdminVote.request_id.in_([req.request_id for _, req in valid]))}
+
+        stmt = insert_for(AdminVote).values([
+            {'request_id': req.request_id, 'admin_id': admin.user_id,
+             'vote': item['vote'], 'remarks': item.get('remarks')}
+            for item, req in valid])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['request_id', 'admin_id'],
+            set_={'vote': stmt.excluded.vote, 'remarks': stmt.excluded.remarks})
+        db.session.execute(stmt)
+
+        logs = []
+        for item, req in valid:
+            vote_value, remarks = item['vote'], item.get('remarks')
+            log_details = f"Voted: {vote_value}"
+            if remarks:
+                log_details += f" | Remarks: {remarks}"
+            logs.append({
+                'actor_id': admin.user_id,
+                'action_type': 'Council Vote',
+                'target_change': f'Request: {req.project_title}',
+                'details': log_details,
+                'entity_type': 'request',
+                'entity_id': req.request_id,
+                'payload': {'vote': vote_value, 'remarks': remarks},
+            })
+            updated = req.request_id in already_voted
+            results[id(item)] = cls._result(req.request_id, True, 'Vote updated.' if updated else 'Vote cast.',
+                                            updated=updated)
+        db.session.execute(insert(SystemLog), logs)
+        return cls._in_order(items, results)
+
+    # --- CAPTAIN'S FINAL DECISION ---
+
+    @classmethod
+    def finalize(cls, captain, items):
+        """
+        items: [{'request_id': 5, 'action': 'Approve'}, ...]
+        Approved requests get their Project rows in one batched insert.
+        """
+        results = {}
+        valid = cls._pending_requests(items, 'action', results)
+        if not valid:
+            return cls._in_order(items, results)
+
+        approved = [(item, req) for item, req in valid if item['action'] == 'Approve']
+        rejected = [(item, req) for item, req in valid if item['action'] == 'Reject']
+        now = datetime.utcnow()
+
+        # 1. Statuses (guarded, in case another session finalized them meanwhile) and their counts.
+        # Only the requests this UPDATE moved go on to get a project and a log
+        decided = {}
+        for status, reqs in (('Approved', approved), ('Rejected', rejected)):
+            decided[status] = lifecycle.decide([req.request_id for _, req in reqs], status)
+        for item, req in approved + rejected:
+            if req.request_id not in decided['Approved'] | decided['Rejected']:
+                results[id(item)] = cls._result(req.request_id, False, 'Request was already decided.')
+        approved = [(item, req) for item, req in approved if req.request_id in decided['Approved']]
+        rejected = [(item, req) for item, req in rejected if req.request_id in decided['Rejected']]
+
+        # 2. Projects for the approved ones
+        project_ids = {}
+        if approved:
+            rows = db.session.execute(
+                insert(Project).returning(Project.request_id, Project.project_id, sort_by_parameter_order=True),
+                lifecycle.open_projects([{'request_id': req.request_id, 'given_fund': req.fund_amount,
+                                          'remaining_fund': req.fund_amount, 'approval_date': now}
+                                         for _, req in approved]))
+            project_ids = dict(rows.all())
+            RollupService.record_releases(now, 'Ongoing', [req.fund_amount for _, req in approved])
+
+        # 3. Audit entries
+        logs = []
+        for item, req in approved:
+            logs.append({
+                'actor_id': captain.user_id,
+                'action_type': 'Approve Request',
+                'target_change': f'Request: {req.project_title}',
+                'details': f"Approved ₱{req.fund_amount:,.2f} for implementation.",
+                'entity_type': 'request',
+                'entity_id': req.request_id,
+                'amount': req.fund_amount,
+            })
+            results[id(item)] = cls._result(req.request_id, True, 'Approved. Project created.',
+                                            project_id=project_ids.get(req.request_id))
+        for item, req in rejected:
+            logs.append({
+                'actor_id': captain.user_id,
+                'action_type': 'Reject Request',
+                'target_change': f'Request: {req.project_title}',
+                'details': f"Request rejected by {captain.name}.",
+                'entity_type': 'request',
+                'entity_id': req.request_id,
+                'amount': None,
+            })
+            results[id(item)] = cls._result(req.request_id, True, 'Rejected.')
+        if logs:
+            db.session.execute(insert(SystemLog), logs)
+
+        AggregateService.invalidate('fund_totals')
+        return cls._in_order(items, results)
@@ -0,0 +1,381 @@
+import gzip
+import json
+import os
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, tuple_
+
+from .. import read_models
+from ..models import SystemLog
+from ..database import db
+from ..tenancy import tenant_config
+
+class ArchivedLog:
+    """A system log read back from an archive file. Looks like a SystemLog row to templates."""
+
+    __slots__ = ('log_id', 'actor_id', 'action_type', 'target_change', 'details', 'timestamp',
+                 'entity_type', 'entity_id', 'amount', 'payload', 'actor')
+
+    def __init__(self, data, actor=None):
+        for field in self.__slots__[:-1]:
+            setattr(self, field, data.get(field))
+        self.timestamp = datetime.fromisoformat(data['timestamp'])
+        self.actor = actor
+
+class ArchiveBusy(Exception):
+    """Another archive run (the nightly job, or 'flask jobs run archive_logs') holds the lock."""
+    pass
+
+class LogArchiveService:
+    """
+    Moves old 'system_logs' rows into compressed monthly files and reads them back.
+
+    Layout under the archive folder (default: instance/log_archive):
+        system_logs-2025-12.jsonl.gz   one JSON object per log, one file per month
+        manifest.json                  archived_before cutoff + per-month summaries
+        archive.lock                   held while a run is moving logs
+
+    Each batch is appended to its month file as a new gzip member (gzip readers
+    read members back to back), so a run writes every log once. The manifest
+    records how many bytes of each file are committed: readers stop there, and
+    the next run cuts off whatever a crashed run wrote past it.
+    """
+
+    BATCH_SIZE = 1000
+    LOCK_STALE_SECONDS = 600  # The lock is refreshed after every batch
+    FIELDS = ArchivedLog.__slots__[:-1]
+
+    def __init__(self, archive_folder):
+        self.archive_folder = archive_folder
+
+    @classmethod
+    def from_app(cls, app=None):
+        app = app or current_app
+        return cls(tenant_config(app)['LOG_ARCHIVE_DIR'])
+
+    # --- MANIFEST ---
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.archive_folder, 'manifest.json')
+
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'archived_before': None, 'segments': {}}
+        with open(self.manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        self._atomic_write(self.manifest_path, json.dumps(manifest, indent=2).encode('utf-8'))
+
+    @property
+    def archived_before(self):
+        """Everything older than this timestamp lives in the archive (None = nothing archived)."""
+        value = self.load_manifest()['archived_before']
+        return datetime.fromisoformat(value) if value else None
+
+    # --- SEGMENT FILES ---
+
+    def segment_path(self, month):
+        return os.path.join(self.archive_folder, f'system_logs-{month}.jsonl.gz')
+
+    def read_segment(self, month):
+        path = self.segment_path(month)
+        if not os.path.exists(path):
+            return []
+        # Only the bytes the manifest knows of: an append may be in progress past them
+        size = self.load_manifest()['segments'].get(month, {}).get('bytes')
+        with open(path, 'rb') as f:
+            data = f.read() if size is None else f.read(size)
+        lines = gzip.decompress(data).decode('utf-8').splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def _append_segment(self, month, rows, size):
+        """
+        Adds rows to the month file as one gzip member, after cutting the file back
+        to 'size' (its committed length). Returns the new length.
+        """
+        lines = ''.join(json.dumps(row, default=str) + '\n' for row in rows)
+        with open(self.segment_path(month), 'ab') as f:
+            f.truncate(size)
+            f.write(gzip.compress(lines.encode('utf-8')))
+            return f.tell()
+
+    @staticmethod
+    def _atomic_write(path, data):
+        # Write to a temp file first so readers never see a half-written file
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _summarize(rows, summary):
+        """Adds the rows to a month's summary (count and expenses per project)."""
+        expense_totals = defaultdict(float, summary['expense_totals'])
+        for row in rows:
+            if row['action_type'] == 'Project Update' and row['entity_type'] == 'project' and row['amount']:
+                expense_totals[str(row['entity_id'])] += row['amount']
+        return {**summary, 'count': summary['count'] + len(rows), 'expense_totals': dict(expense_totals)}
+
+    # --- ARCHIVING ---
+
+    def archive(self, retention_days):
+        """Moves every log older than 'retention_days' into its monthly segment. Returns the count."""
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        os.makedirs(self.archive_folder, exist_ok=True)
+        token = self._acquire()
+        try:
+            return self._archive(cutoff, token)
+        finally:
+            self._release(token)
+
+    def _archive(self, cutoff, token):
+        manifest = self.load_manifest()
+
+        # 1. A run that stopped after recording a batch but before deleting it left those
+        #    rows in both places: they are in the files already, only the delete is missing
+        last_batch = manifest.get('last_batch')
+        if last_batch:
+            SystemLog.query.filter(SystemLog.timestamp < datetime.fromisoformat(last_batch['cutoff']),
+                                   SystemLog.log_id <= last_batch['log_id'])\
+                .delete(synchronize_session=False)
+            db.session.commit()
+
+        previous = manifest['archived_before']
+        if previous is None or cutoff.isoformat() > previous:
+            # Readers de-duplicate hot rows older than this against the archive,
+            # so it is safe to publish before the rows leave the hot table
+            manifest['archived_before'] = cutoff.isoformat()
+        moved = 0
+
+        while True:
+            batch = SystemLog.query.filter(SystemLog.timestamp < cutoff)\
+                .order_by(SystemLog.log_id).limit(self.BATCH_SIZE).all()
+            if not batch:
+                break
+            if not self._touch(token):
+                raise ArchiveBusy("The archive lock was taken over by another run; stopping.")
+
+            by_month = defaultdict(list)
+            for log in batch:
+                by_month[log.timestamp.strftime('%Y-%m')].append(
+                    {field: getattr(log, field) for field in self.FIELDS})
+
+            # 2. Append to the month files, past their committed length
+            for month, rows in by_month.items():
+                summary = manifest['segments'].get(month, {'count': 0, 'expense_totals': {}, 'bytes': 0})
+                size = summary.get('bytes')
+                if size is None:  # Recorded before lengths were: the whole file is committed
+                    size = os.path.getsize(self.segment_path(month))
+                summary = self._summarize(rows, summary)
+                summary['bytes'] = self._append_segment(month, rows, size)
+                manifest['segments'][month] = summary
+
+            # 3. Commit the new lengths in the manifest, so readers find them once they leave the hot table
+            manifest['last_batch'] = {'cutoff': cutoff.isoformat(), 'log_id': batch[-1].log_id}
+            self._save_manifest(manifest)
+
+            # 4. Only then remove them from the hot table
+            SystemLog.query.filter(SystemLog.log_id.in_([log.log_id for log in batch]))\
+                .delete(synchronize_session=False)
+            db.session.commit()
+            moved += len(batch)
+
+        self._save_manifest(manifest)
+        return moved
+
+    # --- RUN LOCK ---
+
+    @property
+    def lock_path(self):
+        return os.path.join(self.archive_folder, 'archive.lock')
+
+    def _acquire(self):
+        """Takes the run lock; a lock left by a crashed run is taken over once it is stale."""
+        token = uuid.uuid4().hex
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(self.lock_path) < self.LOCK_STALE_SECONDS:
+                    raise ArchiveBusy("Another archive run is in progress.")
+            except FileNotFoundError:
+                pass  # Just released: take it
+            with open(f"{self.lock_path}.{token}", 'w') as f:
+                f.write(token)
+            os.replace(f"{self.lock_path}.{token}", self.lock_path)
+            if not self._touch(token):
+                raise ArchiveBusy("Another archive run is in progress.")
+            return token
+        with os.fdopen(fd, 'w') as f:
+            f.write(token)
+        return token
+
+    def _touch(self, token):
+        """Refreshes the lock if 'token' still holds it; False if another run took it over."""
+        try:
+            with open(self.lock_path) as f:
+                if f.read() != token:
+                    return False
+            os.utime(self.lock_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _release(self, token):
+        if self._touch(token):
+            os.remove(self.lock_path)
+
+    # --- READ-THROUGH ---
+
+    def _months_between(self, start, end):
+        """Archived months that overlap [start, end] (either side may be None)."""
+        first = start.strftime('%Y-%m') if start else None
+        last = end.strftime('%Y-%m') if end else None
+        return [month for month in sorted(self.load_manifest()['segments'])
+                if (first is None or month >= first) and (last is None or month <= last)]
+
+    def fetch(self, start=None, end=None, action_types=None):
+        """
+        All logs between start and end (newest first), from the hot table AND,
+        when the range reaches back past the archive cutoff, the archive files.
+        Returned as read-only rows (LogRow / ArchivedLog), not ORM entities.
+        """
+        return list(self.iter_fetch(start, end, action_types))
+
+    @staticmethod
+    def _filter_hot(query, start, end, action_types, actor_id=None, target=None, before=None):
+        if start:
+            query = query.filter(SystemLog.timestamp >= start)
+        if end:
+            query = query.filter(SystemLog.timestamp < end)
+        if action_types:
+            query = query.filter(SystemLog.action_type.in_(action_types))
+        if actor_id:
+            query = query.filter(SystemLog.actor_id == actor_id)
+        if target:
+            # Prefix match written as a range, so it can use ix_system_logs_target ('Request: Libreng' ...)
+            query = query.filter(SystemLog.target_change >= target, SystemLog.target_change < target + '\uffff')
+        if before:
+            query = query.filter(tuple_(SystemLog.timestamp, SystemLog.log_id) < before)
+        return query
+
+    def iter_fetch(self, start=None, end=None, action_types=None, actor_id=None, target=None, before=None,
+                   limit=None):
+        """
+        Same as fetch(), but yields the logs one by one: the hot table is read in
+        batches, then the archive one month at a time (newest first), so memory
+        stays bounded however long the range is.
+
+        The audit viewer also narrows by actor and target (a prefix of
+        'target_change'), and pages with a keyset cursor: 'before' is the
+        (timestamp, log_id) of the last log already shown, 'limit' the page size.
+        """
+        query = self._filter_hot(SystemLog.query, start, end, action_types, actor_id, target, before)
+        query = query.order_by(SystemLog.timestamp.desc(), SystemLog.log_id.desc())
+        if limit:
+            query = query.limit(limit)
+
+        sent = 0
+        for log in read_models.iter_system_logs(query):
+            sent += 1
+            yield log
+
+        archived_before = self.archived_before
+        if archived_before and (start is None or start < archived_before) and not (limit and sent >= limit):
+            # A crashed archive run can leave rows in BOTH places; only those old rows need de-duplicating
+            old_hot_ids = {log_id for log_id, in db.session.query(SystemLog.log_id)
+                           .filter(SystemLog.timestamp < archived_before)}
+            for log in self.iter_archived(start, end, action_types, actor_id, target, before):
+                if log.log_id not in old_hot_ids:
+                    yield log
+                    sent += 1
+                    if limit and sent >= limit:
+                        return
+
+    def fetch_archived(self, start=None, end=None, action_types=None):
+        """Only the archived logs between start and end (newest first)."""
+        return list(self.iter_archived(start, end, action_types))
+
+    @staticmethod
+    def _matches(row, timestamp, start, end, action_types, actor_id, target, before):
+        return not ((start and timestamp < start) or (end and timestamp >= end)
+                    or (action_types and row['action_type'] not in action_types)
+                    or (actor_id and row['actor_id'] != actor_id)
+                    or (target and not (row['target_change'] or '').startswith(target))
+                    or (before and (timestamp, row['log_id']) >= before))
+
+    def _iter_archived_rows(self, start, end, action_types, actor_id=None, target=None, before=None):
+        """(month, [row dicts]) for the archived months in range, newest first, rows filtered."""
+        bounds = [bound for bound in (end, before[0] if before else None) if bound]
+        for month in reversed(self._months_between(start, min(bounds) if bounds else None)):
+            rows = []
+            for row in self.read_segment(month):
+                timestamp = datetime.fromisoformat(row['timestamp'])
+                if self._matches(row, timestamp, start, end, action_types, actor_id, target, before):
+                    rows.append(row)
+            yield month, rows
+
+    def iter_archived(self, start=None, end=None, action_types=None, actor_id=None, target=None, before=None):
+        """Archived logs between start and end, newest first, reading one month file at a time."""
+        for month, rows in self._iter_archived_rows(start, end, action_types, actor_id, target, before):
+            rows.sort(key=lambda row: (row['timestamp'], row['log_id']), reverse=True)
+
+            # Resolve the month's actors with one query
+            actors = read_models.users_by_id({row['actor_id'] for row in rows})
+            for row in rows:
+                yield ArchivedLog(row, actors.get(row['actor_id']))
+
+    def facets(self, start=None, end=None, action_type=None, actor_id=None, target=None):
+        """
+        How many logs each action type and each actor has under the current filters,
+        for the audit viewer's sidebar: {'actions': [(action, n)], 'actors': [(UserRow, n)]},
+        largest first. Each facet ignores its own filter, so the other choices stay
+        visible. Counted in SQL on the hot table (covering indexes on action/actor
+        and time); archived months are only read when the range reaches them.
+        """
+        action_types = [action_type] if action_type else None
+        actions = defaultdict(int)
+        actors = defaultdict(int)
+
+        query = db.session.query(SystemLog.action_type, func.count())
+        for action, count in self._filter_hot(query, start, end, None, actor_id, target)\
+                .group_by(SystemLog.action_type):
+            actions[action] += count
+        query = db.session.query(SystemLog.actor_id, func.count())
+        for actor, count in self._filter_hot(query, start, end, action_types, None, target)\
+                .group_by(SystemLog.actor_id):
+            actors[actor] += count
+
+        archived_before = self.archived_before
+        if archived_before and (start is None or start < archived_before):
+            old_hot_ids = {log_id for log_id, in db.session.query(SystemLog.log_id)
+                           .filter(SystemLog.timestamp < archived_before)}
+            for _, rows in self._iter_archived_rows(start, end, None, None, target):
+                for row in rows:
+                    if row['log_id'] in old_hot_ids:
+                        continue
+                    if not actor_id or row['actor_id'] == actor_id:
+                        actions[row['action_type']] += 1
+                    if not action_type or row['action_type'] == action_type:
+                        actors[row['actor_id']] += 1
+
+        users = read_models.users_by_id(actors)
+        return {
+            'actions': sorted(actions.items(), key=lambda item: (-item[1], item[0])),
+            'actors': sorted(((users.get(actor_id), count) for actor_id, count in actors.items()
+                              if actor_id in users), key=lambda item: (-item[1], item[0].username)),
+        }
+
+    def expense_total(self, project_id=None):
+        """Expenses reported in archived 'Project Update' logs (from the manifest, no file reads)."""
+        total = 0.0
+        for summary in self.load_manifest()['segments'].values():
+            totals = summary['expense_totals']
+            total += totals.get(str(project_id), 0.0) if project_id is not None else sum(totals.values())
+        return total
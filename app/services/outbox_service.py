@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from flask_mail import Message
+from sqlalchemy import insert
+
+from .. import mail
+from ..models import EmailOutbox
+from ..database import db
+
+class OutboxService:
+    """
+    Queues emails in 'email_outbox' (in the caller's transaction) and sends
+    them later from the 'send_emails' job over a single SMTP connection.
+    """
+
+    BATCH_SIZE = 50
+    MAX_ATTEMPTS = 5
+
+    @staticmethod
+    def queue(messages):
+        """messages: [{'recipient': ..., 'subject': ..., 'body': ...}, ...] (one batched insert)."""
+        if messages:
+            db.session.execute(insert(EmailOutbox), [
+                {'recipient': m['recipient'], 'subject': m['subject'], 'body': m['body'],
+                 'status': 'Queued', 'attempts': 0, 'created_at': datetime.now()}
+                for m in messages])
+
+    @classmethod
+    def send_pending(cls):
+        """Sends queued emails, BATCH_SIZE at a time. Returns (sent, failed)."""
+        sent = failed = 0
+        last_id = 0  # Each email is tried at most once per run
+        while True:
+            batch = EmailOutbox.query.filter(EmailOutbox.status == 'Queued', EmailOutbox.email_id > last_id)\
+                .order_by(EmailOutbox.email_id).limit(cls.BATCH_SIZE).all()
+            if not batch:
+                break
+            last_id = batch[-1].email_id
+
+            try:
+                with mail.connect() as conn:
+                    for email in batch:
+                        try:
+                            conn.send(Message(email.subject, recipients=[email.recipient], body=email.body))
+                            cls._mark_sent(email)
+                            sent += 1
+                        except Exception as e:
+                            failed += cls._mark_failed(email, e)
+            except Exception as e:
+                # Could not reach the SMTP server at all. The body is never printed:
+                # it may hold a set-password link
+                print(f"EMAIL ERROR: {e}")
+                for email in batch:
+                    if email.status == 'Queued':
+                        print(f"DEV MODE - EMAIL NOT SENT TO {email.recipient}: {email.subject}")
+                        failed += cls._mark_failed(email, e)
+                db.session.commit()
+                break  # Try the rest on the next run
+
+            db.session.commit()
+        return sent, failed
+
+    @staticmethod
+    def _mark_sent(email):
+        email.status = 'Sent'
+        email.sent_at = datetime.now()
+        email.body = ''
+
+    @classmethod
+    def _mark_failed(cls, email, error):
+        """Counts the attempt; gives up after MAX_ATTEMPTS. Returns 1 if it gave up."""
+        email.attempts += 1
+        email.last_error = str(error)[:255]
+        if email.attempts >= cls.MAX_ATTEMPTS:
+            email.status = 'Failed'
+            email.body = ''
+            return 1
+        return 0
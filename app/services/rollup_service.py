@@ -0,0 +1,106 @@
+from ..models import Project, ProjectUpdate, SpendRollup, ReleaseRollup
+from ..database import db, insert_for
+
+class RollupService:
+    """
+    Keeps the spend/release rollup tables in sync, one upsert per change, so the
+    financial trend charts never have to scan 'project_updates' or 'projects'.
+    Call these in the SAME transaction as the change they describe.
+
+    Projects without an approval_date (older rows; the column is nullable) have
+    no month to chart, so they are left out of the release rollup.
+    """
+
+    @staticmethod
+    def _month(moment):
+        return moment.date().replace(day=1) if hasattr(moment, 'date') else moment.replace(day=1)
+
+    @staticmethod
+    def _add_spend(project_id, period, period_start, amount, count):
+        stmt = insert_for(SpendRollup).values(
+            project_id=project_id, period=period, period_start=period_start,
+            total=amount, update_count=count)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['project_id', 'period', 'period_start'],
+            set_={'total': SpendRollup.total + stmt.excluded.total,
+                  'update_count': SpendRollup.update_count + stmt.excluded.update_count})
+        db.session.execute(stmt)
+
+    @staticmethod
+    def _add_release(month, status, amount, count):
+        stmt = insert_for(ReleaseRollup).values(month=month, status=status, total=amount, project_count=count)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['month', 'status'],
+            set_={'total': ReleaseRollup.total + stmt.excluded.total,
+                  'project_count': ReleaseRollup.project_count + stmt.excluded.project_count})
+        db.session.execute(stmt)
+
+    # --- INCREMENTAL UPDATES ---
+
+    @classmethod
+    def record_expense(cls, update):
+        """A new ProjectUpdate was posted."""
+        posted = update.date_posted
+        cls._add_spend(update.project_id, 'day', posted.date(), update.expenses, 1)
+        cls._add_spend(update.project_id, 'month', cls._month(posted), update.expenses, 1)
+
+    @classmethod
+    def record_release(cls, project):
+        """A request was approved and its project created."""
+        if project.approval_date is None:
+            return
+        cls._add_release(cls._month(project.approval_date), project.current_status, project.given_fund, 1)
+
+    @classmethod
+    def record_releases(cls, approval_date, status, funds):
+        """Several requests approved together (one upsert for the whole batch)."""
+        if funds:
+            cls._add_release(cls._month(approval_date), status, sum(funds), len(funds))
+
+    @classmethod
+    def move_release(cls, project, old_status, new_status):
+        """A project changed status (e.g. Ongoing -> Completed)."""
+        if project.approval_date is None:
+            return
+        month = cls._month(project.approval_date)
+        cls._add_release(month, old_status, -project.given_fund, -1)
+        cls._add_release(month, new_status, project.given_fund, 1)
+
+    # --- FULL REBUILD (backfill / safety net) ---
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes both rollup tables from scratch. Returns the number of rows written."""
+        SpendRollup.query.delete()
+        ReleaseRollup.query.delete()
+
+        rows = 0
+        for update in ProjectUpdate.query.yield_per(1000):
+            cls.record_expense(update)
+            rows += 1
+        for project in Project.query.filter(Project.approval_date.isnot(None)).yield_per(1000):
+            cls.record_release(project)
+            rows += 1
+        db.session.commit()
+        return rows
+
+    # --- READS (size depends on the number of months, not on the history) ---
+
+    @staticmethod
+    def spend_series(period='month', project_id=None):
+        """[(period_start, total), ...] oldest first, for all projects or one."""
+        query = db.session.query(SpendRollup.period_start, db.func.sum(SpendRollup.total))\
+            .filter(SpendRollup.period == period)
+        if project_id is not None:
+            query = query.filter(SpendRollup.project_id == project_id)
+        return query.group_by(SpendRollup.period_start).order_by(SpendRollup.period_start).all()
+
+    @staticmethod
+    def release_series():
+        """{status: [(month, total), ...]} oldest first."""
+        series = {}
+        rows = ReleaseRollup.query.filter(ReleaseRollup.project_count > 0)\
+            .order_by(ReleaseRollup.month).all()
+        for row in rows:
+            series.setdefault(row.status, []).append((row.month, row.total))
+        return series
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+from datetime import date, datetime
+from math import ceil
+from urllib.parse import urlsplit
+
+from flask import current_app, url_for
+from sqlalchemy import and_, func
+
+from ..models import User, Project, ProjectUpdate, ProjectComment, SystemLog, ChangeLog
+from ..database import db
+from ..tenancy import tenant_config, tenant_environ
+from .log_archive_service import LogArchiveService
+
+class StaticPublisher:
+    """
+    Renders the public (logged-out) pages into plain HTML files so a reverse
+    proxy can serve them without touching Flask or the database.
+
+    Each page has a fingerprint built from cheap change markers: the change_log
+    seq of the last write to the rows it displays (see changes()), the member
+    list, the date or the newest log. A page is only re-rendered when its
+    fingerprint changed since the last publish (or the templates changed).
+    Files are laid out by URL:
+
+        /public-records                  -> public-records/index.html
+        /public-logs?history=all         -> public-logs/history=all.html
+
+    Example nginx rule (fall back to Flask for anything not published):
+
+        location / {
+            try_files /snapshot$uri/$args.html /snapshot$uri/index.html @flask;
+        }
+    """
+
+    def __init__(self, output_folder, app=None):
+        self.output_folder = output_folder
+        self.app = app or current_app._get_current_object()
+        os.makedirs(output_folder, exist_ok=True)
+
+    @classmethod
+    def from_app(cls, app=None):
+        app = app or current_app._get_current_object()
+        return cls(tenant_config(app)['STATIC_SNAPSHOT_DIR'], app)
+
+    # --- FINGERPRINTS ---
+
+    @staticmethod
+    def _digest(*queries):
+        """Hash of every row returned by the given (small, column-only) queries."""
+        h = hashlib.sha1()
+        for query in queries:
+            for row in query:
+                h.update(repr(tuple(row)).encode('utf-8'))
+            h.update(b'|')
+        return h.hexdigest()
+
+    def _template_version(self):
+        """Changes whenever a template file is edited, forcing a full re-render."""
+        h = hashlib.sha1()
+        template_root = os.path.join(self.app.root_path, 'templates')
+        for folder, _, files in sorted(os.walk(template_root)):
+            for name in sorted(files):
+                path = os.path.join(folder, name)
+                h.update(f"{path}:{os.path.getmtime(path)}".encode('utf-8'))
+        return h.hexdigest()
+
+    # --- CHANGE MARKERS ---
+
+    @staticmethod
+    def _touched_projects(since):
+        """
+        Ids of the projects whose history page shows a row written after the
+        change_log seq 'since', or None when a deleted update or comment can no
+        longer be traced back to its project.
+        """
+        q = db.session.query
+        recent = ChangeLog.seq > since
+        if q(ChangeLog.seq).filter(recent, ChangeLog.op == 'delete',
+                                   ChangeLog.entity_type.in_(['project_update', 'project_comment'])).first():
+            return None
+
+        def via(entity, project_id, key):
+            return q(project_id).join(ChangeLog, and_(ChangeLog.entity_type == entity, ChangeLog.entity_id == key))\
+                .filter(recent)
+
+        touched = q(ChangeLog.entity_id).filter(recent, ChangeLog.entity_type == 'project').union(
+            via('request', Project.project_id, Project.request_id),
+            via('project_update', ProjectUpdate.project_id, ProjectUpdate.update_id),
+            via('project_comment', ProjectComment.project_id, ProjectComment.comment_id),
+        )
+        return {project_id for project_id, in touched}
+
+    def changes(self, previous):
+        """
+        What was written since the previous publish, read from 'change_log' (see
+        change_feed.py) instead of the tables themselves:
+
+            {'change_seq': newest seq,
+             'versions': {'records': seq, 'trends': seq},   # seq of their last change
+             'projects': {'<project_id>': [seq, number of comment pages]}}
+
+        Groups nothing was written to keep the previous publish's values, so an
+        idle minute costs a handful of index lookups. Everything counts as changed
+        on the first publish, after a restore (the seq went back) and on databases
+        without the change_log triggers (not SQLite).
+        """
+        q = db.session.query
+        if db.session.get_bind().dialect.name != 'sqlite':
+            seq, since = datetime.now().isoformat(), None
+        else:
+            seq = q(func.max(ChangeLog.seq)).scalar() or 0
+            since = previous.get('change_seq')
+            if since is not None and seq < since:
+                since = None
+
+        if since is None:
+            versions, projects, touched = {'records': seq, 'trends': seq}, {}, None
+        else:
+            versions, projects = dict(previous['versions']), dict(previous['projects'])
+            changed = {entity for entity, in q(ChangeLog.entity_type).filter(ChangeLog.seq > since).distinct()}
+            if changed & {'request', 'project', 'admin_vote'}:
+                versions['records'] = seq
+            if changed & {'project', 'project_update'}:
+                versions['trends'] = seq
+            touched = self._touched_projects(since) if changed else set()
+            if touched is None:
+                projects = {}
+
+        # Only the touched projects are read again (all of them when that is unknown)
+        if touched is None or touched:
+            query = q(Project.project_id, Project.comment_count)
+            if touched is not None:
+                query = query.filter(Project.project_id.in_(touched))
+                for project_id in touched:
+                    projects.pop(str(project_id), None)  # Deleted ones stay out
+            per_page = self.app.config['COMMENTS_PER_PAGE']
+            for project_id, comment_count in query:
+                projects[str(project_id)] = [seq, max(1, ceil(comment_count / per_page))]
+        return {'change_seq': seq, 'versions': versions, 'projects': projects}
+
+    def pages(self, changes):
+        """Yields (url, fingerprint) for every public page, given changes(previous)."""
+        q = db.session.query
+        # The users table is small and not in change_log: hashed once, shared by the pages showing names
+        members = self._digest(q(User.user_id, User.name, User.role, User.occupation, User.address,
+                                 User.pic_path, User.is_active).order_by(User.user_id))
+        versions = changes['versions']
+
+        yield url_for('main.index'), 'static'
+        yield url_for('main.about'), 'static'
+
+        # The deadline filters and badges move with the date, even when no row changes
+        records = self._digest([(members, date.today(), versions['records'])])
+        yield url_for('main.public_records'), records
+        yield url_for('main.public_records', deadline='overdue'), records
+        yield url_for('main.public_records', deadline='urgent'), records
+
+        # Logs are only ever appended, or moved to the archive (which moves 'archived_before')
+        archive = LogArchiveService.from_app(self.app)
+        logs = self._digest(
+            [(members, archive.load_manifest().get('archived_before'))],
+            q(func.max(SystemLog.log_id)),
+        )
+        yield url_for('main.public_logs'), logs
+        yield url_for('main.public_logs', history='all'), logs
+
+        trends = self._digest([(versions['trends'],)])
+        yield url_for('main.financial_trends'), trends
+        yield url_for('main.financial_trends', period='day'), trends
+        yield url_for('main.financial_trends_api'), trends
+        yield url_for('main.financial_trends_api', period='day'), trends
+
+        for project_id, (version, pages) in sorted(changes['projects'].items(), key=lambda item: int(item[0])):
+            history = self._digest([(members, version)])
+            yield url_for('main.project_history', project_id=int(project_id)), history
+            # A new comment shifts every page, so they all share one fingerprint
+            for page in range(2, pages + 1):
+                yield url_for('main.project_history', project_id=int(project_id), page=page), history
+
+    # --- OUTPUT ---
+
+    def file_for(self, url):
+        """'/public-logs?history=all' -> '<output>/public-logs/history=all.html'"""
+        parts = urlsplit(url)
+        folder = os.path.join(self.output_folder, *[p for p in parts.path.split('/') if p])
+        name = f"{parts.query}.html" if parts.query else 'index.html'
+        return os.path.join(folder, name)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.output_folder, 'manifest.json')
+
+    def publish(self, force=False):
+        """Renders changed pages. Returns (rendered, skipped, removed) counts."""
+        previous = {}
+        if os.path.exists(self.manifest_path) and not force:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                previous = json.load(f)
+        if 'pages' not in previous:
+            previous = {}  # Written by an older version: publish everything once
+        manifest = previous.get('pages', {})
+
+        template_version = self._template_version()
+        client = self.app.test_client()
+        new_manifest = {}
+        rendered = skipped = 0
+
+        # Pages are rendered as the current tenant (if any), from its database
+        environ = tenant_environ()
+        with self.app.test_request_context(environ_overrides=environ):
+            changes = self.changes(previous)
+            pages = list(self.pages(changes))
+
+        for url, fingerprint in pages:
+            fingerprint = f"{template_version}:{fingerprint}"
+            new_manifest[url] = fingerprint
+            if manifest.get(url) == fingerprint and os.path.exists(self.file_for(url)):
+                skipped += 1
+                continue
+
+            # Saved pages must not embed links that expire (see app/storage.py)
+            response = client.get(url, environ_overrides={'transparansee.snapshot': True, **environ})
+            if response.status_code != 200:
+                raise RuntimeError(f"Publishing {url} failed with HTTP {response.status_code}")
+
+            path = self.file_for(url)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(response.get_data())
+            os.replace(path + '.tmp', path)  # Never serve a half-written page
+            rendered += 1
+
+        # Pages that no longer exist (e.g. a deleted project)
+        removed = 0
+        for url in set(manifest) - set(new_manifest):
+            if os.path.exists(self.file_for(url)):
+                os.remove(self.file_for(url))
+                removed += 1
+
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({**changes, 'pages': new_manifest}, f, indent=2)
+        return rendered, skipped, removed
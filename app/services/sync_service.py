@@ -0,0 +1,126 @@
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from ..models import ChangeLog, Request, Project, ProjectUpdate, AdminVote, ProjectComment
+from ..database import db
+from ..storage import media_url
+
+class SyncService:
+    """
+    Incremental download for the offline field clients: the rows changed since
+    the client's last sync, read from 'change_log' (see change_feed.py).
+
+    Associates only receive their own requests and what hangs off them (the
+    projects, updates, votes and comments); council members receive everything.
+    A response looks like:
+
+        {"since": 120, "seq": 131, "more": false,
+         "changes": {"project": [{...}], "project_update": [{...}]},
+         "deleted": {"project_comment": [7]}, "reset": false}
+
+    The client stores 'seq' and sends it as the next 'since' (0 = full download);
+    while 'more' is true it asks again straight away. 'reset' true means its copy
+    is from another database and must be downloaded again from 0.
+    """
+
+    # Columns sent for each entity type
+    COLUMNS = {
+        'request': (Request.request_id, Request.requested_by_user_id, Request.project_title, Request.reason,
+                    Request.fund_amount, Request.start_date, Request.end_date, Request.project_site,
+                    Request.project_partners, Request.submission_date, Request.status),
+        'project': (Project.project_id, Project.request_id, Project.current_status, Project.given_fund,
+                    Project.remaining_fund, Project.approval_date, Project.overdue_since, Project.comment_count),
+        'project_update': (ProjectUpdate.update_id, ProjectUpdate.project_id, ProjectUpdate.posted_by,
+                           ProjectUpdate.update_title, ProjectUpdate.description, ProjectUpdate.expenses,
+                           ProjectUpdate.receipt_picture, ProjectUpdate.site_picture, ProjectUpdate.date_posted),
+        'admin_vote': (AdminVote.vote_id, AdminVote.request_id, AdminVote.admin_id, AdminVote.vote, AdminVote.remarks),
+        'project_comment': (ProjectComment.comment_id, ProjectComment.project_id, ProjectComment.content,
+                            ProjectComment.timestamp),
+    }
+
+    # Where uploaded pictures are stored (sent as links the client can fetch)
+    PICTURES = {'receipt_picture': 'project_updates/receipts/', 'site_picture': 'project_updates/site_photos/'}
+
+    def __init__(self, user, page_size):
+        self.user = user
+        self.page_size = page_size
+
+    @classmethod
+    def from_app(cls, user, app=None):
+        app = app or current_app
+        return cls(user, app.config['SYNC_PAGE_SIZE'])
+
+    def _scope(self, entity):
+        """WHERE clause limiting 'entity' rows to what this user may see (None = everything)."""
+        if self.user.role in ('admin', 'super_admin'):
+            return None
+        own_requests = select(Request.request_id).where(Request.requested_by_user_id == self.user.user_id)
+        own_projects = select(Project.project_id).where(Project.request_id.in_(own_requests))
+        return {
+            'request': Request.requested_by_user_id == self.user.user_id,
+            'project': Project.request_id.in_(own_requests),
+            'project_update': ProjectUpdate.project_id.in_(own_projects),
+            'admin_vote': AdminVote.request_id.in_(own_requests),
+            'project_comment': ProjectComment.project_id.in_(own_projects),
+        }[entity]
+
+    @staticmethod
+    def _json_value(value):
+        return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+    def _load(self, entity, ids):
+        """The current rows (as dicts) for the given ids, in one query."""
+        columns = self.COLUMNS[entity]
+        query = select(*columns).where(columns[0].in_(ids)).order_by(columns[0])
+        scope = self._scope(entity)
+        if scope is not None:
+            query = query.where(scope)
+
+        rows = []
+        for row in db.session.execute(query):
+            data = {key: self._json_value(value) for key, value in row._mapping.items()}
+            for field, folder in self.PICTURES.items():
+                if field in data:
+                    data[field + '_url'] = media_url(folder + data[field]) if data[field] else None
+            rows.append(data)
+        return rows
+
+    def changes(self, since):
+        """Up to page_size changes with seq > since (see the class docstring)."""
+        entries = db.session.query(ChangeLog.seq, ChangeLog.entity_type, ChangeLog.entity_id, ChangeLog.op)\
+            .filter(ChangeLog.seq > since)\
+            .order_by(ChangeLog.seq)\
+            .limit(self.page_size + 1).all()
+        more = len(entries) > self.page_size
+        entries = entries[:self.page_size]
+
+        # 1. Group the ids per entity type and operation
+        upserts, deletes = {}, {}
+        for entry in entries:
+            if entry.entity_type in self.COLUMNS:
+                target = deletes if entry.op == 'delete' else upserts
+                target.setdefault(entry.entity_type, []).append(entry.entity_id)
+
+        # 2. One query per entity type. Rows outside the user's scope are simply left out,
+        #    but still move 'seq' forward so they are not looked at again.
+        changes = {}
+        for entity, ids in upserts.items():
+            rows = self._load(entity, ids)
+            if rows:
+                changes[entity] = rows
+
+        # A 'since' beyond the newest seq comes from another database (e.g. restored from a backup):
+        # the client has to throw its copy away and download everything again (since=0)
+        reset = not entries and since > (db.session.query(func.max(ChangeLog.seq)).scalar() or 0)
+
+        return {
+            'since': since,
+            'seq': entries[-1].seq if entries else since,
+            'more': more,
+            'changes': changes,
+            # Only ids: a deleted row's contents are gone, and ids say nothing private
+            'deleted': deletes,
+            'reset': reset,
+        }
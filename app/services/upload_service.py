@@ -0,0 +1,277 @@
+import base64
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from flask import current_app
+
+from ..storage import get_storage
+from ..tenancy import tenant_config
+
+
+class UploadError(Exception):
+    """A rejected upload request; 'status' is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class UploadService:
+    """
+    Resumable uploads (a subset of the tus 1.0 protocol, see upload_routes.py).
+
+    Each upload lives in the upload folder (default: instance/uploads) until it is complete:
+        <id>.part    the bytes received so far (its size IS the upload offset)
+        <id>.json    owner, kind, declared length and checksum, status
+        <id>.lock    exists only while a chunk is being written
+
+    When the last byte arrives the file is checked against the declared SHA-256
+    and handed to the media storage as project_updates/<receipts|site_photos>/... A project
+    update then claims it by id (claim()), once.
+    """
+
+    CHUNK_READ = 64 * 1024
+    # A lock older than this was left by a worker that died mid-chunk
+    LOCK_STALE_SECONDS = 120
+    KINDS = {'expense': 'receipts', 'site': 'site_photos'}
+    EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    # Per-chunk checksums a client may send in 'Upload-Checksum'
+    CHUNK_ALGORITHMS = {'sha256': hashlib.sha256, 'sha1': hashlib.sha1, 'md5': hashlib.md5}
+
+    def __init__(self, upload_folder, storage, max_size):
+        self.upload_folder = upload_folder
+        self.storage = storage
+        self.max_size = max_size
+        os.makedirs(upload_folder, exist_ok=True)
+
+    @classmethod
+    def from_app(cls, app=None):
+        app = app or current_app
+        return cls(tenant_config(app)['UPLOAD_TEMP_DIR'], get_storage(app), app.config['UPLOAD_MAX_SIZE'])
+
+    # --- STATE FILES ---
+
+    def _path(self, upload_id, suffix):
+        return os.path.join(self.upload_folder, f"{upload_id}.{suffix}")
+
+    def get(self, upload_id, owner_id=None):
+        """The upload's state (with its current 'offset'), or UploadError 404."""
+        # Ids are uuid4 hex: anything else cannot name a file in the folder
+        if len(upload_id) != 32 or not all(c in '0123456789abcdef' for c in upload_id):
+            raise UploadError("Unknown upload.", 404)
+        try:
+            with open(self._path(upload_id, 'json'), encoding='utf-8') as f:
+                upload = json.load(f)
+        except FileNotFoundError:
+            raise UploadError("Unknown upload.", 404)
+        if owner_id is not None and upload['owner_id'] != owner_id:
+            raise UploadError("Unknown upload.", 404)
+
+        if upload['status'] == 'complete':
+            upload['offset'] = upload['length']
+        else:
+            part = self._path(upload_id, 'part')
+            upload['offset'] = os.path.getsize(part) if os.path.exists(part) else 0
+        return upload
+
+    def _media_key(self, kind, filename):
+        return f"project_updates/{self.KINDS[kind]}/{filename}"
+
+    def _save(self, upload):
+        data = {key: value for key, value in upload.items() if key != 'offset'}
+        path = self._path(upload['upload_id'], 'json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+
+    # --- PROTOCOL STEPS ---
+
+    def create(self, owner_id, length, metadata):
+        """Registers a new upload. 'metadata' needs filename and kind; sha256 (hex) is optional."""
+        if length is None or length <= 0:
+            raise UploadError("Upload-Length must be a positive number of bytes.")
+        if length > self.max_size:
+            raise UploadError(f"Files may be at most {self.max_size // 2**20} MB.", 413)
+
+        filename = metadata.get('filename') or ''
+        ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        if ext not in self.EXTENSIONS:
+            raise UploadError("Only PNG, JPG and GIF images can be uploaded.")
+        if metadata.get('kind') not in self.KINDS:
+            raise UploadError("Upload kind must be 'expense' or 'site'.")
+
+        upload = {
+            'upload_id': uuid.uuid4().hex,
+            'owner_id': owner_id,
+            'kind': metadata['kind'],
+            'ext': ext,
+            'length': length,
+            'sha256': (metadata.get('sha256') or '').lower() or None,
+            'status': 'uploading',
+            'filename': None,
+            'created_at': time.time(),
+        }
+        open(self._path(upload['upload_id'], 'part'), 'wb').close()
+        self._save(upload)
+        upload['offset'] = 0
+        return upload
+
+    def append(self, upload, offset, stream, chunk_length, checksum=None):
+        """
+        Writes one chunk (read from 'stream') at 'offset', which must be the current
+        offset. A chunk whose 'Upload-Checksum' does not match is thrown away.
+        Returns the upload with its new offset.
+        """
+        chunk_hash = None
+        if checksum:
+            algorithm, _, expected = checksum.partition(' ')
+            if algorithm not in self.CHUNK_ALGORITHMS:
+                raise UploadError(f"Unsupported checksum algorithm '{algorithm}'.", 400)
+            chunk_hash = self.CHUNK_ALGORITHMS[algorithm]()
+
+        # One writer at a time (two tabs resuming the same upload, a retried request...)
+        lock = self._path(upload['upload_id'], 'lock')
+        token = self._acquire(lock)
+        part = self._path(upload['upload_id'], 'part')
+        try:
+            # Checked only now: 'upload' was read before the lock, maybe while another chunk was written
+            upload = self.get(upload['upload_id'])
+            if upload['status'] != 'uploading':
+                raise UploadError("This upload is already complete.", 403)
+            if offset != upload['offset']:
+                raise UploadError(f"Upload-Offset must be {upload['offset']}.", 409)
+            if chunk_length is None or offset + chunk_length > upload['length']:
+                raise UploadError("Chunk would exceed Upload-Length.", 413)
+
+            written = 0
+            with open(part, 'ab') as f:
+                while written < chunk_length:
+                    data = stream.read(min(self.CHUNK_READ, chunk_length - written))
+                    if not data:
+                        break  # Connection dropped: keep what arrived, the client resumes from HEAD
+                    if not self._touch(lock, token):
+                        # Silent for LOCK_STALE_SECONDS and taken over: the new writer owns the file now
+                        raise UploadError("This chunk took too long; resume the upload.", 409)
+                    f.write(data)
+                    if chunk_hash:
+                        chunk_hash.update(data)
+                    written += len(data)
+
+            if chunk_hash and (written != chunk_length
+                               or base64.b64encode(chunk_hash.digest()).decode() != expected.strip()):
+                # Drop the whole chunk; the client sends it again
+                with open(part, 'ab') as f:
+                    f.truncate(offset)
+                raise UploadError("Checksum Mismatch", 460)
+
+            upload['offset'] = offset + written
+            if upload['offset'] == upload['length']:
+                self._finish(upload)
+        finally:
+            self._release(lock, token)
+        return upload
+
+    # --- CHUNK LOCK ---
+    # The lock file holds its writer's token. The writer touches it after every
+    # block it receives, so only a writer silent for LOCK_STALE_SECONDS loses it.
+
+    def _acquire(self, lock):
+        token = uuid.uuid4().hex
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) < self.LOCK_STALE_SECONDS:
+                    raise UploadError("Another chunk of this upload is being written.", 409)
+            except FileNotFoundError:
+                pass  # Just released: take it
+            # Take over the stale lock (if two requests do at once, the last rename wins)
+            with open(f"{lock}.{token}", 'w') as f:
+                f.write(token)
+            os.replace(f"{lock}.{token}", lock)
+            if not self._touch(lock, token):
+                raise UploadError("Another chunk of this upload is being written.", 409)
+            return token
+        with os.fdopen(fd, 'w') as f:
+            f.write(token)
+        return token
+
+    @staticmethod
+    def _touch(lock, token):
+        """Refreshes the lock if 'token' still holds it; False if another writer took it over."""
+        try:
+            with open(lock) as f:
+                if f.read() != token:
+                    return False
+            os.utime(lock)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _release(self, lock, token):
+        if self._touch(lock, token):
+            os.remove(lock)
+
+    def _finish(self, upload):
+        """Verifies the whole file and moves it where the site serves it from."""
+        part = self._path(upload['upload_id'], 'part')
+        digest = hashlib.sha256()
+        with open(part, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        if upload['sha256'] and digest.hexdigest() != upload['sha256']:
+            # Nothing usable was received: start over
+            open(part, 'wb').close()
+            upload['offset'] = 0
+            raise UploadError("Checksum Mismatch: the file was corrupted in transit; upload it again.", 460)
+
+        filename = f"{upload['kind']}_{int(time.time())}_{upload['upload_id'][:8]}.{upload['ext']}"
+        # Local storage: an atomic rename; S3: uploaded, then the temp file is removed
+        self.storage.save_file(self._media_key(upload['kind'], filename), part)
+
+        upload.update(status='complete', filename=filename, sha256=digest.hexdigest())
+        self._save(upload)
+
+    def claim(self, upload_id, owner_id, kind):
+        """Attaches a finished upload to a project update. Returns its file name (each upload can be claimed once)."""
+        upload = self.get(upload_id, owner_id)
+        if upload['status'] != 'complete':
+            raise UploadError("The file has not finished uploading.", 409)
+        if upload['kind'] != kind:
+            raise UploadError("This file was uploaded for a different kind of update.", 400)
+        os.remove(self._path(upload_id, 'json'))
+        return upload['filename']
+
+    def delete(self, upload_id, owner_id):
+        """Cancels an unfinished upload (tus 'termination')."""
+        upload = self.get(upload_id, owner_id)
+        if upload['status'] == 'complete':
+            raise UploadError("A finished upload cannot be cancelled.", 403)
+        for suffix in ('part', 'json'):
+            if os.path.exists(self._path(upload_id, suffix)):
+                os.remove(self._path(upload_id, suffix))
+
+    def purge(self, max_age_seconds):
+        """Removes uploads older than max_age that were never finished or never claimed. Returns how many."""
+        removed = 0
+        cutoff = time.time() - max_age_seconds
+        for name in os.listdir(self.upload_folder):
+            if not name.endswith('.json'):
+                continue
+            upload_id = name[:-5]
+            try:
+                upload = self.get(upload_id)
+            except UploadError:
+                continue
+            if upload['created_at'] > cutoff:
+                continue
+            if upload['status'] == 'complete':
+                self.storage.delete(self._media_key(upload['kind'], upload['filename']))
+            for suffix in ('part', 'json', 'lock'):
+                if os.path.exists(self._path(upload_id, suffix)):
+                    os.remove(self._path(upload_id, suffix))
+            removed += 1
+        return removed
@@ -0,0 +1,139 @@
+import csv
+import re
+from datetime import datetime
+
+from flask import current_app, url_for
+from sqlalchemy import insert
+
+from ..models import User, SystemLog
+from ..database import db
+from .outbox_service import OutboxService
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+class UserImportService:
+    """
+    Onboards many users from one CSV file (columns: name, role, occupation, address, email).
+
+    Usernames are derived from the email address. No password is made up (or
+    hashed) for anyone: each welcome email carries a one-time link where the
+    user sets their own, so no password ever sits in the outbox, the backups or
+    a console. Users and their 'Create User' logs are inserted in batches, and
+    one welcome email per user is queued in the outbox.
+    """
+
+    COLUMNS = ('name', 'role', 'occupation', 'address', 'email')
+    BATCH_SIZE = 200
+
+    def __init__(self, actor, link_hours=72):
+        self.actor = actor
+        self.link_hours = link_hours
+
+    @classmethod
+    def from_app(cls, actor, app=None):
+        app = app or current_app
+        return cls(actor, app.config['SET_PASSWORD_LINK_HOURS'])
+
+    def allowed_roles(self):
+        # Same rules as the single-user forms: only the Captain registers officials
+        return {'admin', 'associate'} if self.actor.role == 'super_admin' else {'associate'}
+
+    # --- 1. PARSING & VALIDATION ---
+
+    def parse(self, stream):
+        """Returns (valid rows as dicts, ['Line 3: reason', ...])."""
+        reader = csv.DictReader(stream)
+        header = [(field or '').strip().lower() for field in (reader.fieldnames or [])]
+        missing = [column for column in self.COLUMNS if column not in header]
+        if missing:
+            return [], [f"Missing column(s): {', '.join(missing)}"]
+        reader.fieldnames = header
+
+        rows, errors, seen_emails = [], [], set()
+        allowed_roles = self.allowed_roles()
+        existing_emails = {email.lower() for email, in db.session.query(User.email)}
+
+        for line, raw in enumerate(reader, start=2):
+            row = {column: (raw.get(column) or '').strip() for column in self.COLUMNS}
+            row['role'] = row['role'].lower()
+            email = row['email'].lower()
+
+            if not all(row.values()):
+                errors.append(f"Line {line}: every column is required.")
+            elif row['role'] not in allowed_roles:
+                errors.append(f"Line {line}: role must be one of {', '.join(sorted(allowed_roles))}.")
+            elif not EMAIL_PATTERN.match(row['email']):
+                errors.append(f"Line {line}: invalid email format.")
+            elif email in existing_emails or email in seen_emails:
+                errors.append(f"Line {line}: {row['email']} is already registered.")
+            else:
+                seen_emails.add(email)
+                rows.append(row)
+        return rows, errors
+
+    @staticmethod
+    def _usernames(rows):
+        """'juan.dela.cruz@x.gov' -> 'juan.dela.cruz' (or 'juan.dela.cruz2', ... if taken)."""
+        taken = {username for username, in db.session.query(User.username)}
+        usernames = []
+        for row in rows:
+            base = re.sub(r'[^a-zA-Z0-9._-]', '', row['email'].split('@')[0])[:45] or 'user'
+            username, n = base, 1
+            while username in taken:
+                n += 1
+                username = f"{base}{n}"
+            taken.add(username)
+            usernames.append(username)
+        return usernames
+
+    # --- 2. IMPORT ---
+
+    def run(self, stream):
+        """
+        Validates and imports the CSV in ONE transaction (the caller commits).
+        Must run in a request: the emailed links point at this site.
+        Returns (number of users created, list of skipped-line messages).
+        """
+        rows, errors = self.parse(stream)
+        if not rows:
+            return 0, errors
+
+        records = list(zip(rows, self._usernames(rows)))
+        for start in range(0, len(records), self.BATCH_SIZE):
+            batch = records[start:start + self.BATCH_SIZE]
+
+            created = db.session.execute(
+                insert(User).returning(User.user_id, sort_by_parameter_order=True),
+                [{'username': username, 'password_hash': User.UNUSABLE_PASSWORD, 'email': row['email'],
+                  'role': row['role'], 'name': row['name'], 'occupation': row['occupation'],
+                  'address': row['address'], 'is_active': True, 'pic_path': 'default.png',
+                  'relation_to_admin': f"Staff of {self.actor.name}" if row['role'] == 'associate' else None}
+                 for row, username in batch]).scalars().all()
+
+            now = datetime.now()
+            db.session.execute(insert(SystemLog), [
+                {'actor_id': self.actor.user_id,
+                 'action_type': 'Create User' if row['role'] == 'admin' else 'Register Staff',
+                 'target_change': f"{'Official' if row['role'] == 'admin' else 'Staff'}: {row['name']}"[:50],
+                 'details': f"Imported from CSV by {self.actor.name}",
+                 'timestamp': now,
+                 'entity_type': 'user',
+                 'entity_id': user_id,
+                 'payload': {'role': row['role'], 'occupation': row['occupation'], 'source': 'csv'}}
+                for (row, _), user_id in zip(batch, created)])
+
+            OutboxService.queue([
+                {'recipient': row['email'],
+                 'subject': 'Welcome to TransparanSee',
+                 'body': (f"Hello {row['name']},\n\nAn account has been created for you.\n\n"
+                          f"Username: {username}\n\n"
+                          f"Set your password here (the link works once and expires in {self.link_hours} hours):\n"
+                          f"{self._link(user_id)}\n")}
+                for (row, username), user_id in zip(batch, created)])
+
+        return len(rows), errors
+
+    @staticmethod
+    def _link(user_id):
+        token = User.set_password_token(user_id, User.UNUSABLE_PASSWORD)
+        return url_for('auth.set_password', token=token, _external=True)
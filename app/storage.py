@@ -0,0 +1,173 @@
+"""
+Where uploaded media (profile pictures, receipts, site photos) is kept.
+
+Files are addressed by a key such as 'profile_pics/user_2_1765998088.jpg' or
+'project_updates/receipts/expense_1765998088.jpg'. Two drivers:
+
+    local   files under MEDIA_ROOT (default: app/static, or app/static/tenants/<slug>
+            for a tenant), served by the web server at MEDIA_URL (default: Flask's /static URL)
+    s3      any S3-compatible bucket (AWS, MinIO, R2...), needs 'pip install boto3'.
+            Browsers fetch files straight from the bucket, through MEDIA_PUBLIC_URL
+            (public bucket / CDN) or short-lived presigned links.
+
+Either way the bytes never pass through a Flask worker: templates build links
+with media_url(key) and the browser goes to the storage directly.
+"""
+import os
+import shutil
+import tempfile
+
+from flask import current_app, has_request_context, request, url_for
+
+from .tenancy import tenant_cache, tenant_config
+
+
+class LocalStorage:
+    # Links to local files never expire
+    stable_urls = True
+
+    def __init__(self, root, base_url=None):
+        self.root = root
+        self.base_url = base_url
+
+    def _path(self, key):
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid media key: {key}")
+        return path
+
+    def save(self, key, stream, content_type=None):
+        """Copies a file-like object to 'key' in pieces; readers never see a half-written file."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(stream, f, 64 * 1024)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def save_file(self, key, local_path):
+        """Moves a finished local file (e.g. a resumable upload) to 'key'."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(local_path, path)
+        except OSError:
+            # Source on another filesystem: copy (atomically), then remove it
+            with open(local_path, 'rb') as f:
+                self.save(key, f)
+            os.remove(local_path)
+
+    def open(self, key):
+        return open(self._path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def delete(self, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def keys(self, prefix=''):
+        """Every stored key under 'prefix'."""
+        for folder, _, files in os.walk(self._path(prefix) if prefix else self.root):
+            for name in files:
+                if not name.endswith('.tmp'):
+                    yield os.path.relpath(os.path.join(folder, name), self.root).replace(os.sep, '/')
+
+    def url(self, key):
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{key}"
+        # MEDIA_ROOT may be a folder inside app/static (a tenant's static/tenants/<slug>)
+        folder = os.path.relpath(self.root, current_app.static_folder).replace(os.sep, '/')
+        return url_for('static', filename=key if folder == '.' else f"{folder}/{key}")
+
+
+class S3Storage:
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, public_url=None, url_expires=3600):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("MEDIA_STORAGE is 's3' but boto3 is not installed. Run: pip install boto3")
+
+        # Credentials come from the usual AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY (or an instance role)
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.public_url = public_url
+        self.url_expires = url_expires
+        # Presigned links expire, so pages that are saved (static snapshot) must not embed them
+        self.stable_urls = bool(public_url)
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def save(self, key, stream, content_type=None):
+        """Streams a file-like object to the bucket (multipart for large files)."""
+        extra = {'ContentType': content_type} if content_type else {}
+        self.client.upload_fileobj(stream, self.bucket, self._key(key), ExtraArgs=extra)
+
+    def save_file(self, key, local_path):
+        self.client.upload_file(local_path, self.bucket, self._key(key))
+        os.remove(local_path)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError:
+            return False
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def keys(self, prefix=''):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get('Contents', []):
+                yield item['Key'][len(self.prefix):]
+
+    def url(self, key):
+        if self.public_url:
+            return f"{self.public_url.rstrip('/')}/{self._key(key)}"
+        # Signed locally (no request to S3)
+        return self.client.generate_presigned_url('get_object', Params={'Bucket': self.bucket, 'Key': self._key(key)},
+                                                  ExpiresIn=self.url_expires)
+
+
+def create_storage(config):
+    driver = config['MEDIA_STORAGE']
+    if driver == 'local':
+        return LocalStorage(config['MEDIA_ROOT'], config['MEDIA_URL'])
+    if driver == 's3':
+        return S3Storage(config['MEDIA_S3_BUCKET'], config['MEDIA_S3_PREFIX'], config['MEDIA_S3_ENDPOINT'],
+                         config['MEDIA_S3_REGION'], config['MEDIA_PUBLIC_URL'], config['MEDIA_URL_EXPIRES'])
+    raise ValueError(f"Unknown MEDIA_STORAGE '{driver}' (use 'local' or 's3')")
+
+
+def get_storage(app=None):
+    """The storage driver of the app, or of the current tenant (created once per process)."""
+    app = app or current_app._get_current_object()
+    return tenant_cache('media_storage', lambda: create_storage(tenant_config(app)), app)
+
+
+def media_url(key):
+    """Link to a stored file, for templates: {{ media_url('profile_pics/' ~ user.pic_path) }}"""
+    storage = get_storage()
+    if not storage.stable_urls and has_request_context() and request.environ.get('transparansee.snapshot'):
+        # A page saved by the static publisher outlives presigned links: go through /media/ instead
+        return url_for('main.media', key=key)
+    return storage.url(key)
+
+
+def profile_pic_url(pic_path):
+    """Link to a user's picture (or the default one)."""
+    return media_url('profile_pics/' + (pic_path or 'default.png'))
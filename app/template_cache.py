@@ -0,0 +1,47 @@
+"""
+Compiled templates that outlive the process.
+
+Jinja turns each template into Python code the first time a process renders
+it, so every new worker used to pay for compiling base.html and the page on
+its first hits. With a FileSystemBytecodeCache under TEMPLATE_CACHE_DIR
+(default: instance/jinja_cache) a worker only loads code compiled earlier:
+
+    flask templates warm     compiles every template at deploy time
+    flask templates clear    empties the cache
+
+'flask serve' also loads every template in the master before forking, so
+preloaded workers start with them in memory. Cache entries are keyed by the
+template's source checksum: an edited template is simply compiled again.
+"""
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+
+def init_app(app):
+    folder = app.config['TEMPLATE_CACHE_DIR']
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(folder)
+
+
+def warm(app):
+    """
+    Loads every template (compiling those not in the bytecode cache yet).
+    Returns (templates loaded, seconds, [(name, error)]).
+    """
+    started = time.perf_counter()
+    loaded, errors = 0, []
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        try:
+            app.jinja_env.get_template(name)
+            loaded += 1
+        except TemplateSyntaxError as e:
+            errors.append((name, f"line {e.lineno}: {e.message}"))
+    return loaded, time.perf_counter() - started, errors
+
+
+def clear(app):
+    if app.jinja_env.bytecode_cache is not None:
+        app.jinja_env.bytecode_cache.clear()
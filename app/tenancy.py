@@ -0,0 +1,218 @@
+"""
+Several barangays on one deployment, each with its own database and files.
+
+Tenants are listed in app.config['TENANTS'], or in 'instance/tenants.json':
+
+    {"san-isidro": {"name": "Barangay San Isidro"},
+     "poblacion":  {"name": "Barangay Poblacion",
+                    "DATABASE_URL": "sqlite:////mnt/disk2/poblacion/transparansee.db",
+                    "MEDIA_ROOT": "/mnt/disk2/poblacion/media", "MEDIA_URL": "https://media.example.org/poblacion"}}
+
+TenantMiddleware finds the tenant of each request by subdomain
+(san-isidro.example.org, TENANT_RESOLUTION='subdomain') or by path prefix
+(/san-isidro/public-logs, 'path'). A request that matches no tenant uses the
+main database, as before.
+
+Each tenant has:
+    a database     its own SQLite file (default: <TENANTS_ROOT>/<slug>/transparansee.db),
+                   the SQLAlchemy bind 'tenant:<slug>'; db.session sends every statement there
+    folders        uploads, log archive, backups and static snapshot under <TENANTS_ROOT>/<slug>/,
+                   media under app/static/tenants/<slug>/ (each can be set in its entry, e.g. on another disk)
+    caches         media storage driver, live feed hub, rate limit buckets
+    a login        its own session cookie
+
+Outside a request (CLI, scheduler) the tenant comes from tenant_context(), or
+from TENANT=<slug> in the environment (e.g. 'TENANT=poblacion flask backup create').
+"""
+import json
+import os
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask.sessions import SecureCookieSessionInterface
+from werkzeug.exceptions import NotFound
+
+ENVIRON_KEY = 'transparansee.tenant'
+
+# Settings that are separate per tenant, and their default folder under the tenant's root
+FOLDERS = {
+    'UPLOAD_TEMP_DIR': 'uploads',
+    'LOG_ARCHIVE_DIR': 'log_archive',
+    'BACKUP_DIR': 'backups',
+    'STATIC_SNAPSHOT_DIR': 'static_site',
+}
+
+
+def bind_key(tenant):
+    return f"tenant:{tenant}"
+
+
+def current_tenant():
+    """Slug of the tenant being served (None = the main database)."""
+    if has_request_context() and ENVIRON_KEY in request.environ:
+        return request.environ[ENVIRON_KEY]
+    if has_app_context():
+        return g.get('tenant') or current_app.config.get('TENANT')
+    return None
+
+
+@contextmanager
+def tenant_context(app, tenant):
+    """App context working on one tenant's database and files (None = the main ones)."""
+    with app.app_context():
+        g.tenant = tenant
+        yield
+
+
+def tenant_root(app, tenant):
+    return app.config['TENANTS'][tenant].get('ROOT') or os.path.join(app.config['TENANTS_ROOT'], tenant)
+
+
+class TenantConfig:
+    """
+    app.config as seen by the current tenant: its own entry first, then its
+    default folders, then the shared settings. Services read their settings
+    through this (tenant_config(app)['UPLOAD_TEMP_DIR']).
+    """
+
+    def __init__(self, app, tenant):
+        self.app = app
+        self.tenant = tenant
+
+    def __getitem__(self, key):
+        if self.tenant is None:
+            return self.app.config[key]
+        entry = self.app.config['TENANTS'][self.tenant]
+        if key in entry:
+            return entry[key]
+        if key in FOLDERS:
+            return os.path.join(tenant_root(self.app, self.tenant), FOLDERS[key])
+        if key == 'MEDIA_ROOT':
+            return os.path.join(self.app.static_folder, 'tenants', self.tenant)
+        if key == 'MEDIA_S3_PREFIX':
+            return '/'.join(part for part in (self.app.config[key].strip('/'), self.tenant) if part)
+        return self.app.config[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+def tenant_config(app=None):
+    app = app or current_app._get_current_object()
+    return TenantConfig(app, current_tenant())
+
+
+def tenant_cache(name, factory, app=None):
+    """Per-tenant object kept in app.extensions[name] (e.g. the media storage driver), made once by factory()."""
+    app = app or current_app._get_current_object()
+    per_tenant = app.extensions.setdefault(name, {})
+    tenant = current_tenant()
+    if tenant not in per_tenant:
+        per_tenant[tenant] = factory()
+    return per_tenant[tenant]
+
+
+def tenant_environ():
+    """environ_overrides that make a test-client request run as the current tenant."""
+    tenant = current_tenant()
+    return {ENVIRON_KEY: tenant} if tenant else {}
+
+
+# --- REQUESTS ---
+
+class TenantMiddleware:
+    """
+    Sets environ['transparansee.tenant'] from the Host or the first path
+    segment. In path mode the prefix moves to SCRIPT_NAME, so url_for()
+    keeps links inside the tenant. An unknown subdomain is a 404.
+    """
+
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.config = config
+
+    def __call__(self, environ, start_response):
+        tenants = self.config['TENANTS']
+        if not tenants:
+            return self.wsgi_app(environ, start_response)
+
+        if self.config['TENANT_RESOLUTION'] == 'subdomain':
+            host = (environ.get('HTTP_HOST') or environ.get('SERVER_NAME') or '').split(':')[0].lower()
+            base = self.config['TENANT_BASE_DOMAIN']
+            if base and host.endswith('.' + base) and host[:-len(base) - 1] not in ('', 'www'):
+                tenant = host[:-len(base) - 1]
+                if tenant not in tenants:
+                    return NotFound(f"No barangay '{tenant}' is hosted here.")(environ, start_response)
+                environ[ENVIRON_KEY] = tenant
+        else:
+            path = environ.get('PATH_INFO', '')
+            tenant, _, rest = path.lstrip('/').partition('/')
+            if tenant in tenants:
+                environ[ENVIRON_KEY] = tenant
+                environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + '/' + tenant
+                environ['PATH_INFO'] = '/' + rest
+        return self.wsgi_app(environ, start_response)
+
+
+class TenantSessionInterface(SecureCookieSessionInterface):
+    """
+    One session cookie per tenant: a login in one barangay means nothing in another.
+    The tenant is also part of the signing salt, so a cookie copied from one
+    barangay into another's cookie name fails the signature check (user ids are
+    per-database: user 1 in one barangay is not user 1 in the next).
+    """
+
+    def get_cookie_name(self, app):
+        tenant = current_tenant()
+        name = super().get_cookie_name(app)
+        return f"{name}_{tenant}" if tenant else name
+
+    def get_signing_serializer(self, app):
+        serializer = super().get_signing_serializer(app)
+        tenant = current_tenant()
+        if serializer is not None and tenant:
+            serializer.salt = f"{self.salt}:{tenant}"
+        return serializer
+
+
+# --- SETUP ---
+
+def load_tenants(app):
+    """TENANTS from the config, plus 'instance/tenants.json' if present."""
+    tenants = dict(app.config.get('TENANTS') or {})
+    tenants_file = os.path.join(app.instance_path, 'tenants.json')
+    if os.path.exists(tenants_file):
+        with open(tenants_file, encoding='utf-8') as f:
+            tenants.update(json.load(f))
+    for slug in tenants:
+        if not slug.replace('-', '').isalnum() or slug != slug.lower():
+            raise ValueError(f"Tenant '{slug}': use lowercase letters, digits and '-' only.")
+    return tenants
+
+
+def init_app(app):
+    """Registers every tenant's database as a bind. Call before db.init_app(app)."""
+    app.config['TENANTS'] = tenants = load_tenants(app)
+    if not tenants:
+        return
+
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for slug, entry in tenants.items():
+        root = tenant_root(app, slug)
+        os.makedirs(root, exist_ok=True)
+        binds[bind_key(slug)] = entry.get('DATABASE_URL') or 'sqlite:///' + os.path.join(root, 'transparansee.db')
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+    app.session_interface = TenantSessionInterface()
+    app.wsgi_app = TenantMiddleware(app.wsgi_app, app.config)
+
+
+def create_tenant_tables(app):
+    """db.create_all() for every tenant's database."""
+    from .database import db
+
+    for slug in app.config['TENANTS']:
+        db.metadata.create_all(bind=db.engines[bind_key(slug)])
@@ -0,0 +1,174 @@
+"""
+Response compression (gzip, or brotli when the 'brotli' package is installed).
+
+Wraps the WSGI app, so it works the same for normal and streamed responses
+(stream_page): a streamed body is compressed chunk by chunk and each chunk is
+flushed at once, so the browser still gets the top of the page early.
+"""
+import zlib
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli  # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+
+class _Gzip:
+    def __init__(self, level):
+        # wbits 16 + MAX_WBITS = gzip header and trailer
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data, flush):
+        out = self._z.compress(data)
+        return out + self._z.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self):
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._b = brotli.Compressor(quality=quality)
+
+    def compress(self, data, flush):
+        out = self._b.process(data)
+        return out + self._b.flush() if flush else out
+
+    def finish(self):
+        return self._b.finish()
+
+
+class CompressionMiddleware:
+    """
+    Settings (read from app.config on every request):
+        COMPRESS_RESPONSES  False turns the layer off (e.g. when nginx compresses)
+        COMPRESS_MIN_SIZE   bodies smaller than this many bytes are sent as they are
+        COMPRESS_TYPES      {mimetype: (gzip level 1-9, brotli quality 0-11)};
+                            other content types are never compressed
+    """
+
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.config = config
+
+    def __call__(self, environ, start_response):
+        if not self.config.get('COMPRESS_RESPONSES') or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.wsgi_app(environ, start_response)
+
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        if brotli is not None and accepted.quality('br') > 0:
+            encoding = 'br'
+        elif accepted.quality('gzip') > 0:
+            encoding = 'gzip'
+        else:
+            encoding = None
+        response = _CompressedResponse(self, environ, start_response, encoding)
+        if response.pass_through():
+            # Untouched body: keeps wsgi.file_wrapper (sendfile) for static files
+            return response.app_iter
+        return response
+
+
+class _CompressedResponse:
+    """Iterable body of one response; decides whether to compress once the headers (and size) are known."""
+
+    def __init__(self, middleware, environ, start_response, encoding):
+        self.config = middleware.config
+        self.encoding = encoding
+        self.real_start_response = start_response
+        self.status = self.headers = self.exc_info = None
+        self.written = []
+        self.app_iter = middleware.wsgi_app(environ, self.start_response)
+
+    def start_response(self, status, headers, exc_info=None):
+        self.status, self.headers, self.exc_info = status, headers, exc_info
+        return self.written.append  # Legacy write(): sent before the body, as WSGI requires
+
+    def _header(self, name):
+        name = name.lower()
+        return next((value for key, value in self.headers if key.lower() == name), None)
+
+    def _levels(self):
+        """(gzip level, brotli quality) if this response may be compressed at all, else None."""
+        if not self.status.startswith('200') or self._header('Content-Encoding'):
+            return None
+        if 'no-transform' in (self._header('Cache-Control') or ''):
+            return None
+        mimetype = (self._header('Content-Type') or '').split(';')[0].strip().lower()
+        return self.config['COMPRESS_TYPES'].get(mimetype)
+
+    def _send_headers(self, compressor_name=None):
+        headers = list(self.headers)
+        if compressor_name:
+            headers = [(k, v) for k, v in headers if k.lower() not in ('content-length', 'vary', 'etag')]
+            headers.append(('Content-Encoding', compressor_name))
+            # Same resource, different bytes: a strong ETag would no longer be true
+            etag = self._header('ETag')
+            if etag:
+                headers.append(('ETag', etag if etag.startswith('W/') else 'W/' + etag))
+        if self._levels() is not None:
+            vary = self._header('Vary')
+            if vary and 'accept-encoding' not in vary.lower():
+                vary += ', Accept-Encoding'
+            headers = [(k, v) for k, v in headers if k.lower() != 'vary']
+            headers.append(('Vary', vary or 'Accept-Encoding'))
+        self.real_start_response(self.status, headers, self.exc_info)
+
+    def pass_through(self):
+        """Sends the headers now if the body will not be compressed (known as soon as Flask started the response)."""
+        if self.status is None or self.written or (self.encoding is not None and self._levels() is not None):
+            return False
+        self._send_headers()
+        return True
+
+    def close(self):
+        # Called by the server even if the client went away mid-stream (ends the DB session etc.)
+        if hasattr(self.app_iter, 'close'):
+            self.app_iter.close()
+
+    def __iter__(self):
+        chunks = iter(self.app_iter)
+        # Some apps only call start_response once the first chunk is produced
+        first = next(chunks, None)
+        levels = self._levels()
+        if levels is None or self.encoding is None:
+            self._send_headers()
+            yield from self.written
+            if first is not None:
+                yield first
+            yield from chunks
+            return
+
+        # Hold the body back until it is known to be worth compressing
+        min_size = self.config['COMPRESS_MIN_SIZE']
+        length = self._header('Content-Length')
+        pending = self.written + ([first] if first is not None else [])
+        size = sum(map(len, pending))
+        if length is not None:
+            size = int(length)
+        else:
+            for chunk in chunks:
+                pending.append(chunk)
+                size += len(chunk)
+                if size >= min_size:
+                    break
+
+        if size < min_size:
+            self._send_headers()
+            yield from pending
+            yield from chunks
+            return
+
+        # A streamed page (no Content-Length) is flushed chunk by chunk
+        streamed = length is None
+        gzip_level, brotli_quality = levels
+        compressor = _Brotli(brotli_quality) if self.encoding == 'br' else _Gzip(gzip_level)
+        self._send_headers(self.encoding)
+        yield compressor.compress(b''.join(pending), flush=streamed)
+        for chunk in chunks:
+            out = compressor.compress(chunk, flush=streamed)
+            if out:
+                yield out
+        yield compressor.finish()
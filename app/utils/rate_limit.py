@@ -0,0 +1,106 @@
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, request, render_template
+
+from ..tenancy import current_tenant
+
+
+class TokenBucket:
+    """Holds up to 'capacity' tokens and regains 'refill_rate' tokens per second."""
+
+    __slots__ = ('capacity', 'refill_rate', 'tokens', 'updated')
+
+    def __init__(self, capacity, refill_rate):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self, now=None):
+        """Uses one token. Returns False (and uses nothing) if the bucket is empty."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_token(self):
+        return max(0.0, (1 - self.tokens) / self.refill_rate)
+
+
+class MemoryBucketStore:
+    """
+    Default bucket store: one bucket per key, kept in this process's memory.
+    Each gunicorn worker has its own, so a client may get up to 'capacity'
+    x workers before being limited (requests land on different workers).
+    Any object with the same take(key, capacity, refill_rate) -> (allowed, retry_after)
+    method (e.g. one backed by Redis) can be set as app.config['RATE_LIMIT_STORE'].
+    """
+
+    # Forget buckets that have been full (idle) for this long
+    IDLE_SECONDS = 600
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def take(self, key, capacity, refill_rate):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_prune > self.IDLE_SECONDS:
+                self._prune(now)
+
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(capacity, refill_rate)
+            allowed = bucket.take(now)
+            return allowed, bucket.seconds_until_token()
+
+    def _prune(self, now):
+        self._buckets = {key: bucket for key, bucket in self._buckets.items()
+                         if now - bucket.updated < self.IDLE_SECONDS}
+        self._last_prune = now
+
+
+def get_store():
+    store = current_app.config.get('RATE_LIMIT_STORE')
+    if store is None:
+        store = current_app.extensions.setdefault('rate_limit_store', MemoryBucketStore())
+    return store
+
+
+def rate_limited(config_key):
+    """
+    Per-IP limit read from app.config[config_key] = (capacity, per_seconds):
+    each client may send a burst of 'capacity' requests, refilled at 'capacity'
+    per 'per_seconds'. Extra requests get HTTP 429 before the view (and the
+    database) is touched. A value of None disables the limit.
+
+    The client is request.remote_addr: behind a reverse proxy, set TRUSTED_PROXIES
+    so it is the visitor's address rather than the proxy's.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            limit = current_app.config.get(config_key)
+            if not limit:
+                return f(*args, **kwargs)
+            capacity, per_seconds = limit
+
+            # Buckets are per tenant too: one barangay's visitors don't use up another's limit
+            key = f"{config_key}:{current_tenant() or ''}:{request.remote_addr}"
+            allowed, retry_after = get_store().take(key, capacity, capacity / per_seconds)
+            if not allowed:
+                response = current_app.make_response((
+                    render_template('error.html', error_code='429', error_message='Too Many Requests'),
+                    429))
+                response.headers['Retry-After'] = str(int(retry_after) + 1)
+                return response
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
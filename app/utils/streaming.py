@@ -0,0 +1,35 @@
+from flask import Response, render_template, stream_template
+
+from ..database import readers_block_writers
+
+
+def stream_page(template_name, buffer_size=8192, **context):
+    """
+    Renders a template as a streamed response: the browser gets the <head> and
+    the first rows while the rest of the page (and its queries) is still running.
+
+    Jinja yields one tiny string per template tag, so the output is regrouped
+    into ~buffer_size pieces before it goes to the socket.
+
+    On a SQLite database outside WAL mode the page is rendered in full instead:
+    the streamed queries would keep their read lock while a slow client downloads,
+    and every writer's commit would fail with "database is locked" meanwhile.
+    """
+    if readers_block_writers():
+        return Response(render_template(template_name, **context), mimetype='text/html')
+
+    def buffered(chunks):
+        pending, size = [], 0
+        for chunk in chunks:
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= buffer_size:
+                yield ''.join(pending)
+                pending, size = [], 0
+        if pending:
+            yield ''.join(pending)
+
+    response = Response(buffered(stream_template(template_name, **context)), mimetype='text/html')
+    # Ask nginx not to buffer the whole page before passing it on
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,123 @@
+"""
+Cost of an online backup for the rest of the site: how long writers wait
+while 'flask backup create' copies the database, on a synthetic database.
+
+A writer thread commits one small row every --write-interval seconds (its own
+connection, like another worker) while each backup setting runs. Compared:
+no backup, paged copies of several step sizes and one single-step copy, then
+the same database in WAL mode (SQLITE_WAL=1), where the copy reads a snapshot.
+
+    python benchmarks/backup_impact.py                    # 20,000 requests / 200,000 logs
+    python benchmarks/backup_impact.py --logs 500000 --write-interval 0.02
+
+Runs against a throw-away SQLite file in a temp folder (never instance/).
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import read_models as dataset  # noqa: E402 (sets DATABASE_URL to a throw-away file)
+
+from app.database import db  # noqa: E402
+from app.services.backup_service import BackupService  # noqa: E402
+
+
+class Writer(threading.Thread):
+    """Commits one row at a time and records how long each commit took."""
+
+    def __init__(self, path, interval):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.latencies = []
+        self.running = True
+
+    def run(self):
+        connection = sqlite3.connect(self.path, timeout=60)
+        while self.running:
+            started = time.perf_counter()
+            connection.execute("INSERT INTO system_logs (actor_id, action_type, details, timestamp) "
+                               "VALUES (1, 'Login', 'benchmark', CURRENT_TIMESTAMP)")
+            connection.commit()
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(self.interval)
+        connection.close()
+
+
+def run_case(path, interval, action):
+    writer = Writer(path, interval)
+    writer.start()
+    time.sleep(0.5)  # Writer warmed up
+    writer.latencies.clear()
+    result = action()
+    writer.running = False
+    writer.join()
+    latencies = sorted(writer.latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if len(latencies) >= 100 else latencies[-1]
+    return result, statistics.median(latencies), p99, latencies[-1], len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--logs', type=int, default=200000)
+    parser.add_argument('--write-interval', type=float, default=0.05, help='Seconds between writer commits.')
+    args = parser.parse_args()
+
+    app = dataset.create_app()
+    backup_dir = tempfile.mkdtemp()
+    with app.app_context():
+        print(f"Seeding {args.requests:,} requests and {args.logs:,} logs...")
+        dataset.seed(args.requests, args.logs)
+        db.session.remove()
+        path = db.engine.url.database
+        print(f"Database: {os.path.getsize(path) / 2**20:.1f} MiB; a commit every {args.write_interval * 1000:.0f} ms\n")
+
+        def idle():
+            time.sleep(3)
+            return None
+
+        def backup(pages_per_step):
+            def action():
+                return BackupService(backup_dir, keep=3, pages_per_step=pages_per_step, step_sleep=0.01,
+                                     max_restarts=10).create()
+            return action
+
+        def wal_mode():
+            db.engine.dispose()
+            connection = sqlite3.connect(path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.close()
+
+        cases = [('no backup', idle)] + [(f'paged, {pages} pages/step', backup(pages)) for pages in (64, 256, 1024)]
+        cases += [('one step (pages=-1)', backup(-1)), (None, wal_mode),
+                  ('WAL: no backup', idle), ('WAL: 256 pages/step', backup(256))]
+
+        print(f"{'case':<26}{'backup s':>9}{'steps':>7}{'restarts':>9}{'step ms':>9}"
+              f"{'write p50':>11}{'p99':>8}{'max ms':>8}{'writes':>8}")
+        for name, action in cases:
+            if name is None:
+                action()
+                continue
+            result, p50, p99, worst, writes = run_case(path, args.write_interval, action)
+            if result:
+                print(f"{name:<26}{result['total_seconds']:>9.2f}{result['steps']:>7}{result['restarts']:>9}"
+                      f"{result['longest_step_ms']:>9.0f}{p50:>11.1f}{p99:>8.1f}{worst:>8.0f}{writes:>8}")
+            else:
+                print(f"{name:<26}{'-':>9}{'-':>7}{'-':>9}{'-':>9}{p50:>11.1f}{p99:>8.1f}{worst:>8.0f}{writes:>8}")
+
+        latest = BackupService(backup_dir, 3, 256, 0.01, 10).verify()
+        print(f"\nNewest backup verified: {latest['name']} ({latest['size'] / 2**20:.1f} MiB compressed, "
+              f"{latest['database_size'] / 2**20:.1f} MiB database)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Memory and latency of the list pages: full ORM entities vs the read models
+in app/read_models.py, on a synthetic database.
+
+    python benchmarks/read_models.py                 # 20,000 requests / 50,000 logs
+    python benchmarks/read_models.py --requests 50000 --logs 200000
+
+Runs against a throw-away SQLite file in a temp folder (never instance/).
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.database import db  # noqa: E402
+from app.models import User, Request, Project, AdminVote, SystemLog  # noqa: E402
+from app import read_models  # noqa: E402
+
+
+def seed(n_requests, n_logs):
+    rnd = random.Random(42)
+    today = date.today()
+    users = [{'user_id': i, 'username': f'user{i}', 'password_hash': 'x', 'email': f'user{i}@x.gov',
+              'role': 'super_admin' if i == 1 else ('admin' if i <= 10 else 'associate'),
+              'name': f'User {i}', 'occupation': 'Staff', 'address': 'Barangay Hall', 'pic_path': 'default.png',
+              'is_active': True} for i in range(1, 201)]
+    db.session.execute(insert(User), users)
+
+    requests, projects, votes = [], [], []
+    for i in range(1, n_requests + 1):
+        status = rnd.choice(['Pending', 'Approved', 'Approved', 'Rejected'])
+        requests.append({'request_id': i, 'requested_by_user_id': rnd.randint(11, 200),
+                         'project_title': f'Project {i}', 'reason': 'Lorem ipsum dolor sit amet ' * 4,
+                         'fund_amount': rnd.randint(1, 500) * 1000.0, 'start_date': today,
+                         'end_date': today + timedelta(days=rnd.randint(-30, 90)),
+                         'project_site': f'Purok {i % 7}', 'project_partners': 'None', 'status': status,
+                         'submission_date': datetime.now() - timedelta(minutes=i)})
+        if status == 'Approved':
+            projects.append({'request_id': i, 'current_status': rnd.choice(['Ongoing', 'Completed']),
+                             'given_fund': requests[-1]['fund_amount'], 'remaining_fund': 0.0,
+                             'approval_date': datetime.now()})
+        for admin_id in rnd.sample(range(2, 11), 3):
+            votes.append({'request_id': i, 'admin_id': admin_id, 'vote': rnd.choice(['Approve', 'Reject']),
+                          'remarks': 'Looks fine'})
+    db.session.execute(insert(Request), requests)
+    db.session.execute(insert(Project), projects)
+    db.session.execute(insert(AdminVote), votes)
+
+    actions = ['Login', 'Council Vote', 'Approve Request', 'Project Update', 'Register Staff']
+    db.session.execute(insert(SystemLog), [
+        {'actor_id': rnd.randint(1, 200), 'action_type': rnd.choice(actions), 'target_change': f'Request: Project {i}',
+         'details': 'Something happened', 'timestamp': datetime.now() - timedelta(seconds=i),
+         'entity_type': 'request', 'entity_id': i, 'payload': {'k': i}} for i in range(n_logs)])
+    db.session.commit()
+
+
+# --- THE TWO PATHS FOR EACH PAGE ---
+
+def orm_public_records():
+    # What the page did before: entities, plus lazy loads for votes and voters
+    User.query.all()
+    projects = Project.query.join(Request).all()
+    for p in projects:
+        p.request.project_title
+    requests = Request.query.order_by(Request.submission_date.desc()).all()
+    for r in requests:
+        for v in r.votes:
+            v.admin.name
+    return len(requests)
+
+def rows_public_records():
+    _, _, projects, requests = read_models.public_records()
+    return sum(1 for p in projects if p.request.project_title) + sum(1 for r in requests)
+
+def orm_system_logs():
+    logs = SystemLog.query.order_by(SystemLog.timestamp.desc()).all()
+    for log in logs:
+        log.actor.username
+    return len(logs)
+
+def rows_system_logs():
+    return len(read_models.system_logs(SystemLog.query.order_by(SystemLog.timestamp.desc())))
+
+def orm_requests_list():
+    requests = Request.query.filter_by(status='Pending').all()
+    for req in requests:
+        AdminVote.query.filter_by(request_id=req.request_id, vote='Approve').count()
+        AdminVote.query.filter_by(request_id=req.request_id, vote='Reject').count()
+        AdminVote.query.filter_by(request_id=req.request_id, admin_id=2).first()
+        req.requester.name
+    return len(requests)
+
+def rows_requests_list():
+    return len(read_models.pending_requests(2))
+
+def orm_export_csv():
+    return sum(1 for p in Project.query.join(Request).all() if p.request.project_title)
+
+def rows_export_csv():
+    return sum(1 for row in read_models.project_export_rows() if row.project_title)
+
+
+def measure(fn):
+    """(seconds, peak MiB) of one run, from a fresh session."""
+    db.session.remove()
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--logs', type=int, default=50000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        print(f"Seeding {args.requests:,} requests and {args.logs:,} logs...")
+        seed(args.requests, args.logs)
+
+        pages = [('public_records', orm_public_records, rows_public_records),
+                 ('system_logs', orm_system_logs, rows_system_logs),
+                 ('requests_list', orm_requests_list, rows_requests_list),
+                 ('export_csv', orm_export_csv, rows_export_csv)]
+
+        print(f"\n{'page':<16}{'ORM s':>9}{'rows s':>9}{'ORM MiB':>10}{'rows MiB':>10}{'RAM':>8}")
+        for name, orm_fn, rows_fn in pages:
+            orm_time, orm_mem = measure(orm_fn)
+            rows_time, rows_mem = measure(rows_fn)
+            print(f"{name:<16}{orm_time:>9.2f}{rows_time:>9.2f}{orm_mem:>10.1f}{rows_mem:>10.1f}"
+                  f"{rows_mem / orm_mem:>8.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Throughput, latency and memory of 'flask serve' under different worker/thread
+settings, on a synthetic database. Each configuration is started as a real
+gunicorn master and hammered by concurrent HTTP clients.
+
+    python benchmarks/serve_load.py                       # the standard matrix
+    python benchmarks/serve_load.py --clients 32 --seconds 30
+    python benchmarks/serve_load.py --hup                 # also: SIGHUP during load
+
+Linux only (memory is read from /proc). Results: benchmarks/serve_tuning.md
+"""
+import argparse
+import http.client
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import read_models as dataset  # noqa: E402 (sets DATABASE_URL to a throw-away file)
+
+PORT = 8765
+URLS = ['/', '/public-records?deadline=urgent', '/public-logs', '/project/1/history', '/financial-trends']
+
+# name, CLI options
+CONFIGS = [
+    ('sync  1x1', ['--workers', '1', '--threads', '1']),
+    ('sync  3x1', ['--workers', '3', '--threads', '1']),
+    ('gthread 1x8', ['--workers', '1', '--threads', '8']),
+    ('gthread 3x4', ['--workers', '3', '--threads', '4']),
+    ('gthread 3x4 no-preload', ['--workers', '3', '--threads', '4', '--no-preload']),
+]
+
+
+# --- SERVER PROCESS ---
+
+def start_server(options, max_requests=0):
+    env = dict(os.environ, FLASK_APP='run.py', SERVER_MAX_REQUESTS=str(max_requests))
+    cmd = [sys.executable, '-m', 'flask', 'serve', '--bind', f'127.0.0.1:{PORT}', *options]
+    server = subprocess.Popen(cmd, cwd=os.path.dirname(HERE), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    log = []
+    threading.Thread(target=lambda: log.extend(server.stderr), daemon=True).start()
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            get('/')
+            return server, log
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Server did not start:\n" + ''.join(log))
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    server.wait(timeout=60)
+
+
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def pss_mib(pid):
+    """Proportional set size: shared (copy-on-write) pages are split between the processes sharing them."""
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def total_pss(master_pid):
+    return sum(pss_mib(pid) for pid in [master_pid, *worker_pids(master_pid)])
+
+
+# --- LOAD ---
+
+def get(url):
+    conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+    try:
+        conn.request('GET', url)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def load(clients, seconds, during=None):
+    """Runs 'clients' threads for 'seconds'. Returns (requests/s, p50 ms, p95 ms, errors)."""
+    latencies, errors = [], []
+    stop = time.time() + seconds
+
+    def client(n):
+        i = n
+        while time.time() < stop:
+            url = URLS[i % len(URLS)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                status = get(url)
+                if status != 200:
+                    errors.append(status)
+            except OSError as e:
+                errors.append(type(e).__name__)
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    if during:
+        during()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+    return len(latencies) / seconds, statistics.median(latencies) * 1000, p95 * 1000, errors
+
+
+# --- SCENARIOS ---
+
+def matrix(clients, seconds):
+    print(f"\n{'config':<24}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}{'PSS MiB':>10}")
+    for name, options in CONFIGS:
+        server, _ = start_server(options)
+        try:
+            load(clients, 2)  # Warm up (templates compiled, connections opened)
+            rate, p50, p95, errors = load(clients, seconds)
+            print(f"{name:<24}{rate:>8.1f}{p50:>9.1f}{p95:>9.1f}{len(errors):>8}{total_pss(server.pid):>10.1f}")
+        finally:
+            stop_server(server)
+
+
+def recycling(clients, seconds):
+    """Memory of the workers after the same load, with and without max_requests."""
+    print(f"\n{'max_requests':<24}{'req/s':>8}{'restarts':>10}{'PSS MiB':>10}")
+    for max_requests in (0, 50):
+        server, log = start_server(['--workers', '3', '--threads', '4'], max_requests=max_requests)
+        try:
+            rate, _, _, errors = load(clients, seconds)
+            restarts = sum('Autorestarting worker' in line for line in log)
+            print(f"{max_requests or 'off':<24}{rate:>8.1f}{restarts:>10}{total_pss(server.pid):>10.1f}"
+                  + (f"  ({len(errors)} errors)" if errors else ''))
+        finally:
+            stop_server(server)
+
+
+def hup(clients, seconds):
+    """Sends SIGHUP halfway through the load: no request should fail."""
+    server, log = start_server(['--workers', '3', '--threads', '4'])
+    try:
+        before = worker_pids(server.pid)
+
+        def reload():
+            time.sleep(seconds / 2)
+            server.send_signal(signal.SIGHUP)
+
+        rate, p50, p95, errors = load(clients, seconds, during=reload)
+        after = worker_pids(server.pid)
+        replaced = len(set(before) - set(after))
+        print(f"\nSIGHUP under load: {rate:.1f} req/s, p95 {p95:.1f} ms, "
+              f"{replaced}/{len(before)} workers replaced, {len(errors)} failed request(s)")
+    finally:
+        stop_server(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=int, default=15)
+    parser.add_argument('--requests', type=int, default=500, help='Synthetic requests in the database.')
+    parser.add_argument('--logs', type=int, default=2000, help='Synthetic system logs in the database.')
+    parser.add_argument('--hup', action='store_true', help='Also test a graceful reload under load.')
+    args = parser.parse_args()
+
+    app = dataset.create_app()
+    with app.app_context():
+        dataset.seed(args.requests, args.logs)
+    print(f"{os.cpu_count()} CPU(s), {args.clients} clients, {args.seconds}s per run, "
+          f"{args.requests:,} requests / {args.logs:,} logs")
+
+    matrix(args.clients, args.seconds)
+    recycling(args.clients, args.seconds)
+    if args.hup:
+        hup(args.clients, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
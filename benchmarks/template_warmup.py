@@ -0,0 +1,108 @@
+"""
+First-request latency of a fresh worker: templates compiled on first hit vs
+loaded from the bytecode cache ('flask templates warm') vs already in memory
+(preloaded master, see app/server.py), on a synthetic database.
+
+Each measurement is a new Python process (like a new worker) that requests
+every page once (first hit) and then again (steady state):
+
+    cold          no bytecode cache: every template is compiled on its first hit
+    empty cache   bytecode cache on but empty (first worker after a deploy without warm-up)
+    warm cache    after 'flask templates warm'
+    preloaded     warm cache, every template loaded before the first request, then gc.freeze()
+
+    python benchmarks/template_warmup.py                  # 5 runs of each
+    python benchmarks/template_warmup.py --runs 10
+
+Runs against a throw-away SQLite file in a temp folder (never instance/).
+Results: benchmarks/template_warmup.md
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+URLS = ['/', '/public-records', '/public-logs', '/financial-trends', '/project/1/history', '/auth/login']
+
+
+def child(preload):
+    """Runs in the fresh process: prints {url: [first ms, second ms]} as the last line."""
+    sys.path.insert(0, ROOT)
+    from app import create_app, template_cache
+
+    app = create_app()
+    if preload:
+        # What the preloading master does before forking (app/server.py)
+        template_cache.warm(app)
+        gc.collect()
+        gc.freeze()
+    client = app.test_client()
+    timings = {}
+    for url in URLS:
+        hits = []
+        for _ in range(2):
+            started = time.perf_counter()
+            response = client.get(url)
+            hits.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, (url, response.status_code)
+        timings[url] = hits
+    print(json.dumps(timings))
+
+
+def run_child(cache_dir, preload):
+    env = dict(os.environ, TEMPLATE_CACHE_DIR=cache_dir)
+    args = [sys.executable, __file__, '--child'] + (['--preload'] if preload else [])
+    output = subprocess.run(args, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--logs', type=int, default=10000)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--preload', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.preload)
+
+    sys.path.insert(0, HERE)
+    import read_models as dataset  # (sets DATABASE_URL to a throw-away file)
+    from app import template_cache
+
+    scratch = tempfile.mkdtemp()
+    warm_dir = os.path.join(scratch, 'warm')
+    os.environ['TEMPLATE_CACHE_DIR'] = warm_dir
+    app = dataset.create_app()
+    with app.app_context():
+        print(f"Seeding {args.requests:,} requests and {args.logs:,} logs...")
+        dataset.seed(args.requests, args.logs)
+    loaded, seconds, _ = template_cache.warm(app)
+    print(f"'flask templates warm': {loaded} templates compiled in {seconds * 1000:.0f} ms\n")
+
+    cases = [
+        ('cold', lambda run: ('', False)),
+        ('empty cache', lambda run: (os.path.join(scratch, f'empty-{run}'), False)),
+        ('warm cache', lambda run: (warm_dir, False)),
+        ('preloaded', lambda run: (warm_dir, True)),
+    ]
+    print(f"Median of {args.runs} fresh processes, ms:")
+    print(f"{'case':<14}" + ''.join(f"{url:>20}" for url in URLS) + f"{'first hits':>12}{'steady':>9}")
+    for name, setup in cases:
+        runs = [run_child(*setup(run)) for run in range(args.runs)]
+        first = {url: statistics.median(r[url][0] for r in runs) for url in URLS}
+        total = statistics.median(sum(r[url][0] for url in URLS) for r in runs)
+        steady = statistics.median(sum(r[url][1] for url in URLS) for r in runs)
+        print(f"{name:<14}" + ''.join(f"{first[url]:>20.1f}" for url in URLS) + f"{total:>12.1f}{steady:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from app.tenancy import bind_key, current_tenant
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -16,6 +18,10 @@ logger = logging.getLogger('alembic.env')
 
 
 def get_engine():
+    # A tenant's own database ('flask tenants upgrade', or TENANT=<slug> flask db upgrade)
+    tenant = current_tenant()
+    if tenant:
+        return current_app.extensions['migrate'].db.engines[bind_key(tenant)]
     try:
         # this works with Flask-SQLAlchemy<3 and Alchemical
         return current_app.extensions['migrate'].db.get_engine()
@@ -0,0 +1,34 @@
+"""Heartbeat for measuring read replica lag
+
+Revision ID: 1e7a4c9d2f60
+Revises: 6b3d9f1c8e25
+Create Date: 2026-10-19 22:08:31.940217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1e7a4c9d2f60'
+down_revision = '6b3d9f1c8e25'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # create_app() runs db.create_all(), so new tables may already exist (empty)
+    return name in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if not _has_table('replica_heartbeat'):
+        op.create_table('replica_heartbeat',
+        sa.Column('heartbeat_id', sa.Integer(), nullable=False),
+        sa.Column('beat_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('heartbeat_id')
+        )
+
+
+def downgrade():
+    op.drop_table('replica_heartbeat')
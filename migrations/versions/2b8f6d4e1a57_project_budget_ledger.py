@@ -0,0 +1,31 @@
+"""Remaining-fund ledger on projects
+
+Revision ID: 2b8f6d4e1a57
+Revises: 7e4c2a9b5d31
+Create Date: 2026-10-19 14:22:09.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8f6d4e1a57'
+down_revision = '7e4c2a9b5d31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('remaining_fund', sa.Float(), nullable=False, server_default='0'))
+
+    op.execute(
+        'UPDATE projects SET remaining_fund = given_fund - COALESCE(('
+        'SELECT SUM(u.expenses) FROM project_updates u WHERE u.project_id = projects.project_id), 0)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('remaining_fund')
@@ -0,0 +1,53 @@
+"""Scheduler: job run history, cached aggregates, project overdue marker
+
+Revision ID: 3c9e1f7a2b44
+Revises: 596730d29f70
+Create Date: 2026-10-19 09:12:41.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e1f7a2b44'
+down_revision = '596730d29f70'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # create_app() runs db.create_all(), so new tables may already exist (empty)
+    return name in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if not _has_table('job_runs'):
+        op.create_table('job_runs',
+        sa.Column('run_id', sa.Integer(), nullable=False),
+        sa.Column('job_name', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('message', sa.String(length=255), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('run_id')
+        )
+        op.create_index(op.f('ix_job_runs_job_name'), 'job_runs', ['job_name'], unique=False)
+    if not _has_table('cached_aggregates'):
+        op.create_table('cached_aggregates',
+        sa.Column('key', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.JSON(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+        )
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('overdue_since', sa.Date(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('overdue_since')
+
+    op.drop_table('cached_aggregates')
+    op.drop_index(op.f('ix_job_runs_job_name'), table_name='job_runs')
+    op.drop_table('job_runs')
@@ -0,0 +1,43 @@
+"""Email outbox for queued (background) emails
+
+Revision ID: 4f6a8c2e9b13
+Revises: 9c1d5e7f3a86
+Create Date: 2026-10-19 17:10:55.381264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f6a8c2e9b13'
+down_revision = '9c1d5e7f3a86'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # create_app() runs db.create_all(), so new tables may already exist (empty)
+    return name in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if not _has_table('email_outbox'):
+        op.create_table('email_outbox',
+        sa.Column('email_id', sa.Integer(), nullable=False),
+        sa.Column('recipient', sa.String(length=50), nullable=False),
+        sa.Column('subject', sa.String(length=100), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('email_id')
+        )
+        op.create_index(op.f('ix_email_outbox_status'), 'email_outbox', ['status'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_email_outbox_status'), table_name='email_outbox')
+    op.drop_table('email_outbox')
@@ -0,0 +1,67 @@
+"""Spend and release rollup tables for the financial trend charts
+
+Revision ID: 5a7b3e9d0c12
+Revises: 8d2f4b6c1e90
+Create Date: 2026-10-19 11:40:02.871356
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7b3e9d0c12'
+down_revision = '8d2f4b6c1e90'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # create_app() runs db.create_all(), so new tables may already exist (empty)
+    return name in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if not _has_table('spend_rollups'):
+        op.create_table('spend_rollups',
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(length=5), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('update_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.project_id'], ),
+        sa.PrimaryKeyConstraint('project_id', 'period', 'period_start')
+        )
+    if not _has_table('release_rollups'):
+        op.create_table('release_rollups',
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('project_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('month', 'status')
+        )
+
+    # Backfill from the existing history
+    op.execute("DELETE FROM spend_rollups")
+    op.execute("DELETE FROM release_rollups")
+    op.execute("""
+        INSERT INTO spend_rollups (project_id, period, period_start, total, update_count)
+        SELECT project_id, 'day', date(date_posted), SUM(expenses), COUNT(*)
+        FROM project_updates GROUP BY project_id, date(date_posted)
+    """)
+    op.execute("""
+        INSERT INTO spend_rollups (project_id, period, period_start, total, update_count)
+        SELECT project_id, 'month', date(date_posted, 'start of month'), SUM(expenses), COUNT(*)
+        FROM project_updates GROUP BY project_id, date(date_posted, 'start of month')
+    """)
+    op.execute("""
+        INSERT INTO release_rollups (month, status, total, project_count)
+        SELECT date(approval_date, 'start of month'), current_status, SUM(given_fund), COUNT(*)
+        FROM projects WHERE approval_date IS NOT NULL
+        GROUP BY date(approval_date, 'start of month'), current_status
+    """)
+
+
+def downgrade():
+    op.drop_table('release_rollups')
+    op.drop_table('spend_rollups')
@@ -0,0 +1,41 @@
+"""Per-status counters kept by app/lifecycle.py
+
+Revision ID: 5a8e2c6f1b93
+Revises: 9f3b7d1a4c28
+Create Date: 2026-10-19 23:58:12.604731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a8e2c6f1b93'
+down_revision = '9f3b7d1a4c28'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # create_app() runs db.create_all(), so new tables may already exist
+    return name in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if not _has_table('status_counts'):
+        op.create_table('status_counts',
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('entity', 'status')
+        )
+    # Count the existing rows (create_all() may already have done it)
+    if not op.get_bind().execute(sa.text("SELECT 1 FROM status_counts LIMIT 1")).first():
+        op.execute("INSERT INTO status_counts (entity, status, count) "
+                   "SELECT 'request', status, COUNT(*) FROM requests GROUP BY status")
+        op.execute("INSERT INTO status_counts (entity, status, count) "
+                   "SELECT 'project', current_status, COUNT(*) FROM projects GROUP BY current_status")
+
+
+def downgrade():
+    op.drop_table('status_counts')
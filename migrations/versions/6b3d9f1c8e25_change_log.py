@@ -0,0 +1,45 @@
+"""Change log for delta sync (filled by triggers)
+
+Revision ID: 6b3d9f1c8e25
+Revises: 4f6a8c2e9b13
+Create Date: 2026-10-19 20:42:13.508170
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app import change_feed
+
+
+# revision identifiers, used by Alembic.
+revision = '6b3d9f1c8e25'
+down_revision = '4f6a8c2e9b13'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # create_app() runs db.create_all(), so new tables may already exist (and be backfilled)
+    return name in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    created = not _has_table('change_log')
+    if created:
+        op.create_table('change_log',
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(length=6), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+        sa.UniqueConstraint('entity_type', 'entity_id', name='uq_change_log_entity'),
+        sqlite_autoincrement=True
+        )
+    # Existing rows are recorded once, so a client's first sync (since=0) gets everything
+    change_feed.install(op.get_bind(), backfill=created)
+
+
+def downgrade():
+    change_feed.uninstall(op.get_bind())
+    op.drop_table('change_log')
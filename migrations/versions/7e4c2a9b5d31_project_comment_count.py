@@ -0,0 +1,31 @@
+"""Cached comment count on projects
+
+Revision ID: 7e4c2a9b5d31
+Revises: 5a7b3e9d0c12
+Create Date: 2026-10-19 13:05:47.220914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e4c2a9b5d31'
+down_revision = '5a7b3e9d0c12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute(
+        'UPDATE projects SET comment_count = ('
+        'SELECT COUNT(*) FROM project_comments c WHERE c.project_id = projects.project_id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('comment_count')
@@ -0,0 +1,118 @@
+"""Structured system_logs columns (entity, amount, JSON payload) with backfill
+
+Revision ID: 8d2f4b6c1e90
+Revises: 3c9e1f7a2b44
+Create Date: 2026-10-19 10:03:17.554102
+
+"""
+import json
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f4b6c1e90'
+down_revision = '3c9e1f7a2b44'
+branch_labels = None
+depends_on = None
+
+
+USER_ACTIONS = ('Create User', 'Register Staff', 'Deactivate User', 'Update User',
+                'Password Reset', 'Logout', 'Login')
+
+
+def _money(text):
+    """'₱50,000.00' / '1500.0' -> 50000.0 / 1500.0"""
+    match = re.search(r'([\d,]+(?:\.\d+)?)', text or '')
+    return float(match.group(1).replace(',', '')) if match else None
+
+
+def _pipe_fields(details):
+    """'Type: Site | Title: Foo | Desc: Bar' -> {'Type': 'Site', 'Title': 'Foo', 'Desc': 'Bar'}"""
+    fields = {}
+    for part in (details or '').split('|'):
+        if ':' in part:
+            key, value = part.split(':', 1)
+            fields[key.strip()] = value.strip()
+    return fields
+
+
+def _backfill(conn):
+    logs = sa.table('system_logs',
+                    sa.column('log_id'), sa.column('action_type'), sa.column('target_change'),
+                    sa.column('details'), sa.column('entity_type'), sa.column('entity_id'),
+                    sa.column('amount'), sa.column('payload'))
+
+    # Look-ups for turning titles/usernames in 'target_change' back into ids
+    request_ids = dict(conn.execute(sa.text('SELECT project_title, request_id FROM requests')).fetchall())
+    project_ids = dict(conn.execute(sa.text(
+        'SELECT r.project_title, p.project_id FROM projects p JOIN requests r ON r.request_id = p.request_id'
+    )).fetchall())
+    user_ids = dict(conn.execute(sa.text('SELECT username, user_id FROM users')).fetchall())
+    user_ids.update(conn.execute(sa.text('SELECT name, user_id FROM users')).fetchall())
+
+    rows = conn.execute(sa.select(logs.c.log_id, logs.c.action_type,
+                                  logs.c.target_change, logs.c.details)).fetchall()
+    for log_id, action, target, details in rows:
+        target_name = (target or '').split(':', 1)[-1].strip()
+        values = {}
+
+        if action in ('Project Update', 'Update Project'):
+            fields = _pipe_fields(details)
+            values['entity_type'] = 'project'
+            values['entity_id'] = project_ids.get(target_name)
+            if target and target.startswith('Project ID:'):
+                values['entity_id'] = int(target_name)
+            if 'Type' in fields:
+                values['amount'] = _money(fields.get('Expense')) or 0.0
+                values['payload'] = {
+                    'update_type': fields['Type'].lower(),
+                    'title': fields.get('Title'),
+                    'description': fields.get('Desc'),
+                }
+                values['details'] = f"{fields['Type']} update: {fields.get('Title')}"
+
+        elif action == 'Council Vote':
+            fields = _pipe_fields(details)
+            values['entity_type'] = 'request'
+            values['entity_id'] = request_ids.get(target_name)
+            values['payload'] = {'vote': fields.get('Voted'), 'remarks': fields.get('Remarks')}
+
+        elif action in ('Create Request', 'Approve Request', 'Reject Request'):
+            values['entity_type'] = 'request'
+            values['entity_id'] = request_ids.get(target_name)
+            if action != 'Reject Request':
+                values['amount'] = _money(details)
+
+        elif action in USER_ACTIONS:
+            values['entity_type'] = 'user'
+            values['entity_id'] = user_ids.get(target_name)
+
+        if values:
+            if 'payload' in values:
+                values['payload'] = json.dumps(values['payload'])
+            conn.execute(logs.update().where(logs.c.log_id == log_id).values(**values))
+
+
+def upgrade():
+    with op.batch_alter_table('system_logs', schema=None) as batch_op:
+        batch_op.alter_column('details', existing_type=sa.String(length=50), type_=sa.String(length=255))
+        batch_op.add_column(sa.Column('entity_type', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('entity_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('amount', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('payload', sa.JSON(), nullable=True))
+        batch_op.create_index('ix_system_logs_entity', ['entity_type', 'entity_id'], unique=False)
+
+    _backfill(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table('system_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_system_logs_entity')
+        batch_op.drop_column('payload')
+        batch_op.drop_column('amount')
+        batch_op.drop_column('entity_id')
+        batch_op.drop_column('entity_type')
+        batch_op.alter_column('details', existing_type=sa.String(length=255), type_=sa.String(length=50))
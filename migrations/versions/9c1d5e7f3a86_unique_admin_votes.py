@@ -0,0 +1,39 @@
+"""One vote per council member per request
+
+Revision ID: 9c1d5e7f3a86
+Revises: 2b8f6d4e1a57
+Create Date: 2026-10-19 15:48:31.604127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1d5e7f3a86'
+down_revision = '2b8f6d4e1a57'
+branch_labels = None
+depends_on = None
+
+
+def _has_unique(table, columns):
+    # create_app() runs db.create_all(), so a fresh table may already have it
+    return any(sorted(c['column_names']) == sorted(columns)
+               for c in sa.inspect(op.get_bind()).get_unique_constraints(table))
+
+
+def upgrade():
+    # Keep only the latest vote of each admin on each request
+    op.execute(
+        'DELETE FROM admin_votes WHERE vote_id NOT IN ('
+        'SELECT MAX(vote_id) FROM admin_votes GROUP BY request_id, admin_id)'
+    )
+
+    if not _has_unique('admin_votes', ['request_id', 'admin_id']):
+        with op.batch_alter_table('admin_votes', schema=None) as batch_op:
+            batch_op.create_unique_constraint('uq_admin_votes_request_admin', ['request_id', 'admin_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('admin_votes', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_admin_votes_request_admin', type_='unique')
@@ -0,0 +1,37 @@
+"""Indexes for the filtered, keyset-paged audit log viewer
+
+Revision ID: 9f3b7d1a4c28
+Revises: 1e7a4c9d2f60
+Create Date: 2026-10-19 23:41:05.318260
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f3b7d1a4c28'
+down_revision = '1e7a4c9d2f60'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    'ix_system_logs_time': ['timestamp', 'log_id'],
+    'ix_system_logs_action_time': ['action_type', 'timestamp', 'log_id'],
+    'ix_system_logs_actor_time': ['actor_id', 'timestamp', 'log_id'],
+    'ix_system_logs_target': ['target_change', 'timestamp'],
+}
+
+
+def upgrade():
+    # A database made by create_all() after this change already has them
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('system_logs')}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'system_logs', columns, unique=False)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name='system_logs')
@@ -3,4 +3,5 @@ from app import create_app
 app = create_app()
 
 if __name__ == '__main__':
+    # Development server only. In production use 'flask serve' (see benchmarks/serve_tuning.md)
     app.run(debug=True)
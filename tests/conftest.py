@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Builds the app on a throw-away SQLite database (never instance/transparansee.db)."""
+    from app import create_app, db
+
+    apps = []
+
+    def make_app(**environ):
+        monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / f'test{len(apps)}.db'}")
+        monkeypatch.setenv('TEMPLATE_CACHE_DIR', '')
+        monkeypatch.setenv('BACKUP_DIR', str(tmp_path / 'backups'))
+        monkeypatch.setenv('STATIC_SNAPSHOT_DIR', str(tmp_path / 'static_site'))
+        monkeypatch.delenv('SQLITE_WAL', raising=False)  # the shipped default unless a test sets it
+        for name, value in environ.items():
+            monkeypatch.setenv(name, value)
+        app = create_app()
+        app.config.update(TESTING=True, LOG_ARCHIVE_DIR=str(tmp_path / 'log_archive'))
+        apps.append(app)
+        return app
+
+    yield make_app
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def make_user(app):
+    from app import db
+    from app.models import User
+
+    def make_user(username, role='associate'):
+        with app.app_context():
+            user = User(username=username, email=f'{username}@example.gov', role=role, name=username.title(),
+                        occupation='Clerk', address='Poblacion', pic_path='default.png')
+            user.set_password('pw')
+            db.session.add(user)
+            db.session.commit()
+            return user.user_id
+    return make_user
+
+
+@pytest.fixture
+def login(app):
+    def login(client, username):
+        response = client.post('/auth/login', data={'username': username, 'password': 'pw'})
+        assert response.status_code == 302
+    return login
+
+
+@pytest.fixture
+def add_requests(app):
+    def add_requests(user_id, count, with_projects=True, updates_per_project=0):
+        """'count' requests for the user; approved ones get a project and expense updates."""
+        from app import db
+        from app.models import Request, Project, ProjectUpdate
+
+        today = date.today()
+        with app.app_context():
+            for i in range(count):
+                req = Request(requested_by_user_id=user_id, project_title=f'Project {i}', reason='Needed',
+                              fund_amount=1000.0, start_date=today, end_date=today + timedelta(days=i + 1),
+                              project_site='Site', project_partners='None',
+                              status='Approved' if with_projects else 'Pending')
+                db.session.add(req)
+                db.session.flush()
+                if with_projects:
+                    project = Project(request_id=req.request_id, current_status='Ongoing', given_fund=1000.0,
+                                      remaining_fund=1000.0)
+                    db.session.add(project)
+                    db.session.flush()
+                    for n in range(updates_per_project):
+                        db.session.add(ProjectUpdate(project_id=project.project_id, posted_by=user_id,
+                                                     update_title=f'[EXPENSE] {n}', description='Spent',
+                                                     expenses=10.0))
+            db.session.commit()
+    return add_requests
@@ -0,0 +1,81 @@
+"""
+The associate dashboard is built from one query however many projects the
+associate has (read_models.associate_dashboard). These tests count the SQL
+statements actually sent, so a lazy load or per-project query creeping back
+into the page or its template fails here.
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+
+@contextmanager
+def count_statements(app):
+    from app import db
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def dashboard_statements(app, login, username):
+    client = app.test_client()
+    login(client, username)
+    with count_statements(app) as statements:
+        response = client.get('/associate/dashboard')
+    assert response.status_code == 200
+    return statements
+
+
+@pytest.mark.parametrize('projects', [1, 5, 25])
+def test_associate_dashboard_is_one_query(app, make_user, add_requests, projects):
+    from app import read_models
+
+    user_id = make_user('researcher')
+    add_requests(user_id, projects, updates_per_project=3)
+    add_requests(user_id, 2, with_projects=False)
+
+    with app.app_context():
+        with count_statements(app) as statements:
+            requests, project_rows = read_models.associate_dashboard(user_id)
+            # Everything the template reads, including the helpers and the joined request
+            for project in project_rows:
+                project.request.project_title, project.total_expenses, project.days_left, project.is_overdue
+
+    assert len(statements) == 1
+    assert len(requests) == projects + 2
+    assert len(project_rows) == projects
+    assert all(project.total_expenses == 30.0 for project in project_rows)
+
+
+def test_associate_dashboard_page_query_count_does_not_grow(app, make_user, add_requests, login):
+    user_id = make_user('researcher')
+    add_requests(user_id, 1, updates_per_project=1)
+    baseline = dashboard_statements(app, login, 'researcher')
+
+    add_requests(user_id, 30, updates_per_project=4)
+    add_requests(user_id, 10, with_projects=False)
+    assert len(dashboard_statements(app, login, 'researcher')) == len(baseline)
+
+
+def test_associate_dashboard_only_counts_own_expenses(app, make_user, add_requests):
+    from app import read_models
+
+    mine, theirs = make_user('researcher'), make_user('other')
+    add_requests(mine, 2, updates_per_project=2)
+    add_requests(theirs, 3, updates_per_project=5)
+
+    with app.app_context():
+        requests, projects = read_models.associate_dashboard(mine)
+    assert len(requests) == 2
+    assert sorted(project.total_expenses for project in projects) == [20.0, 20.0]
@@ -0,0 +1,21 @@
+from datetime import date, timedelta
+
+import pytest
+
+
+@pytest.mark.parametrize('status', ['Ongoing', 'Completed'])
+@pytest.mark.parametrize('days', [None, -1, 0, 7, 8])
+def test_project_row_matches_project(app, status, days):
+    from app.models import Project, Request, URGENT_WINDOW_DAYS
+    from app.read_models import ProjectRow, RequestRow
+
+    end_date = None if days is None else date.today() + timedelta(days=days)
+    with app.app_context():
+        project = Project(current_status=status, given_fund=1000.0, request=Request(end_date=end_date))
+        row = ProjectRow(current_status=status, request=RequestRow(end_date=end_date))
+
+        for helper in ('days_left', 'is_overdue', 'is_urgent'):
+            assert getattr(row, helper) == getattr(project, helper), helper
+    assert Project.URGENT_WINDOW_DAYS == URGENT_WINDOW_DAYS
+    assert row.is_overdue == (status == 'Ongoing' and days == -1)
+    assert row.is_urgent == (status == 'Ongoing' and days in (0, 7))
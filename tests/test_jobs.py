@@ -0,0 +1,39 @@
+from datetime import date, datetime, timedelta
+
+
+def test_stale_aggregate_is_computed_without_writing(app):
+    from app import db
+    from app.models import CachedAggregate
+    from app.services.aggregate_service import AggregateService
+
+    with app.app_context():
+        db.session.add(CachedAggregate(key='fund_totals', value={'total_projects': -1},
+                                       computed_at=datetime.now() - AggregateService.MAX_AGE * 2))
+        db.session.commit()
+
+        assert AggregateService.get('fund_totals')['total_projects'] == 0
+        assert not db.session.dirty and not db.session.new
+        db.session.rollback()
+        assert db.session.get(CachedAggregate, 'fund_totals').value == {'total_projects': -1}
+
+
+def test_overdue_sweep_marks_and_clears(app, make_user, add_requests):
+    from app import db
+    from app.jobs import overdue_sweep
+    from app.models import Project, Request
+
+    add_requests(make_user('assoc'), 3)
+    with app.app_context():
+        for req in Request.query:
+            req.end_date = date.today() - timedelta(days=2)
+        db.session.commit()
+        assert overdue_sweep() == "Marked 3 project(s) as overdue, cleared 0."
+
+        # Project 1 gets more time, project 2 is completed, project 3 stays overdue
+        db.session.get(Request, 1).end_date = date.today() + timedelta(days=30)
+        db.session.get(Project, 2).current_status = 'Completed'
+        db.session.commit()
+        assert overdue_sweep() == "Marked 0 project(s) as overdue, cleared 2."
+
+        marks = dict(db.session.query(Project.project_id, Project.overdue_since))
+    assert marks == {1: None, 2: None, 3: date.today()}
@@ -0,0 +1,103 @@
+"""
+LogArchiveService.archive() appends each batch to its month file once, never
+re-reading what is already archived, and one run at a time holds the lock.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def old_logs(app, make_user):
+    """25 logs from one month, well past the retention window."""
+    from app import db
+    from app.models import SystemLog
+
+    actor_id = make_user('officer', role='admin')
+    month_start = (datetime.now() - timedelta(days=400)).replace(day=1, hour=8)
+    with app.app_context():
+        for i in range(25):
+            db.session.add(SystemLog(actor_id=actor_id, action_type='Login', details=f'old {i}',
+                                     timestamp=month_start + timedelta(hours=i)))
+        db.session.commit()
+    return month_start.strftime('%Y-%m')
+
+
+@pytest.fixture
+def archive(app):
+    from app.services.log_archive_service import LogArchiveService
+
+    service = LogArchiveService(app.config['LOG_ARCHIVE_DIR'])
+    service.BATCH_SIZE = 10
+    return service
+
+
+def archived_ids(archive, month):
+    return [row['log_id'] for row in archive.read_segment(month)]
+
+
+def test_batches_are_appended_without_rereading_the_month(app, old_logs, archive, monkeypatch):
+    from app.models import SystemLog
+
+    with app.app_context():
+        with monkeypatch.context() as m:
+            m.setattr(type(archive), 'read_segment', lambda self, month: pytest.fail('segment re-read'))
+            assert archive.archive(30) == 25
+        assert SystemLog.query.count() == 0
+
+    assert sorted(archived_ids(archive, old_logs)) == list(range(1, 26))
+    assert archive.load_manifest()['segments'][old_logs]['count'] == 25
+    assert not os.path.exists(archive.lock_path)
+
+
+def test_a_crashed_run_leaves_no_duplicates(app, old_logs, archive, monkeypatch):
+    from app import db
+    from app.models import SystemLog
+
+    with app.app_context():
+        # Stop after the second batch was recorded in the manifest, before its rows were deleted
+        commit, commits = db.session.commit, []
+
+        def crash():
+            commits.append(1)
+            if len(commits) == 2:
+                db.session.rollback()
+                raise RuntimeError('killed')
+            commit()
+
+        monkeypatch.setattr(db.session, 'commit', crash)
+        with pytest.raises(RuntimeError):
+            archive.archive(30)
+        monkeypatch.setattr(db.session, 'commit', commit)
+        assert SystemLog.query.count() == 15
+
+        # A half-written append past the committed length is ignored, then cut off
+        with open(archive.segment_path(old_logs), 'ab') as f:
+            f.write(b'\x1f\x8b partial')
+        assert len(archive.read_segment(old_logs)) == 20
+
+        archive.archive(30)
+        assert SystemLog.query.count() == 0
+        assert len(archive.fetch()) == 25
+
+    assert sorted(archived_ids(archive, old_logs)) == list(range(1, 26))
+    assert archive.load_manifest()['segments'][old_logs]['count'] == 25
+
+
+def test_one_run_at_a_time(app, old_logs, archive):
+    from app.models import SystemLog
+    from app.services.log_archive_service import ArchiveBusy
+
+    os.makedirs(archive.archive_folder, exist_ok=True)
+    token = archive._acquire()
+    with app.app_context():
+        with pytest.raises(ArchiveBusy):
+            archive.archive(30)
+        assert SystemLog.query.count() == 25
+
+        # A lock left behind by a killed run is taken over once it is stale
+        stale = datetime.now().timestamp() - archive.LOCK_STALE_SECONDS - 1
+        os.utime(archive.lock_path, (stale, stale))
+        assert archive.archive(30) == 25
+    assert not archive._touch(token)
@@ -0,0 +1,66 @@
+"""
+'publish_static' runs every minute, so a publish where nothing changed must
+not read the tables behind the pages: it only looks at change_log
+(StaticPublisher.changes), the member list and the newest log.
+"""
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def publisher(app, tmp_path):
+    from app.services.static_publisher import StaticPublisher
+
+    with app.app_context():
+        return StaticPublisher(str(tmp_path / 'site'), app)
+
+
+def publish(app, publisher):
+    """Publishes; returns the counts and the SQL statements sent."""
+    from app import db
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            counts = publisher.publish()
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return counts, statements
+
+
+@pytest.mark.parametrize('projects', [1, 20])
+def test_idle_publish_reads_no_project_rows(app, make_user, add_requests, publisher, projects):
+    add_requests(make_user('assoc'), projects, updates_per_project=2)
+    publish(app, publisher)
+
+    (rendered, skipped, removed), statements = publish(app, publisher)
+
+    assert (rendered, removed) == (0, 0)
+    assert skipped == 11 + projects
+    for table in ('FROM requests', 'FROM projects', 'FROM project_updates', 'FROM admin_votes'):
+        assert not [sql for sql in statements if table in sql], table
+    assert len(statements) < 10
+
+
+def test_only_the_changed_project_is_rendered_again(app, make_user, add_requests, publisher):
+    from app import db
+    from app.models import ProjectComment
+
+    add_requests(make_user('assoc'), 3)
+    publish(app, publisher)
+
+    with app.app_context():
+        db.session.add(ProjectComment(project_id=2, content='Thank you'))
+        db.session.commit()
+    (rendered, skipped, removed), _ = publish(app, publisher)
+
+    # Project 2's history page only: comments are not on the records, logs or trends pages
+    assert (rendered, removed) == (1, 0)
+    with open(publisher.file_for('/project/2/history'), encoding='utf-8') as f:
+        assert 'Thank you' in f.read()
@@ -0,0 +1,27 @@
+import pytest
+
+
+def dispatch(app, path):
+    """The view's own Response, before the WSGI middleware (compression) wraps its body."""
+    with app.test_request_context(path):
+        return app.full_dispatch_request()
+
+
+@pytest.mark.parametrize('path', ['/public-logs', '/public-records'])
+def test_public_pages_stream_by_default(app, path):
+    response = dispatch(app, path)
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers['X-Accel-Buffering'] == 'no'
+    assert '</html>' in ''.join(response.response)
+
+
+def test_rollback_journal_renders_in_full(make_app):
+    # SQLITE_WAL=0: a streamed read would hold its lock while the client downloads
+    app = make_app(SQLITE_WAL='0')
+
+    response = dispatch(app, '/public-logs')
+
+    assert response.status_code == 200
+    assert not response.is_streamed